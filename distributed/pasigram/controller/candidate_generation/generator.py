@@ -1,9 +1,15 @@
 import pandas as pd
 import numpy as np
 from distributed.pasigram.service.edges_service import get_frequent_edges
-from distributed.pasigram.controller.candidate_generation.utils import create_initial_patterns, generate_new_subgraphs
+from distributed.pasigram.controller.candidate_generation.utils import create_initial_patterns, generate_new_subgraphs, \
+    add_candidate, candidate_set_to_frame
+from distributed.pasigram.controller.candidate_generation.projection import project_initial_patterns, \
+    generate_projected_subgraphs
+from distributed.pasigram.model.csp_graph import CSPGraph
+from distributed.pasigram.model.edge_index import EdgeIndex
 from distributed.pasigram.model.graph import Graph
-from pyspark import SparkContext
+from pyspark import SparkContext, Broadcast
+from typing import Union
 
 
 class Generator:
@@ -74,32 +80,82 @@ class Generator:
 
         return initial_patterns
 
-    def generate_new_subgraphs(self, candidates: pd.DataFrame, sc: SparkContext, num_workers: int) -> pd.DataFrame:
+    def generate_new_subgraphs(self, candidates: pd.DataFrame, sc: SparkContext, num_workers: int,
+                               support_measure: str = 'first_edge') -> pd.DataFrame:
         """Method for generating new n+1-size graphs out of n-size frequent graphs
 
         :param candidates:
         :param sc:
         :param num_workers:
         :param local_distributed:
+        :param str support_measure: The support measure ('first_edge' or 'mni', with 'mni' only the canonical
+            candidates are generated)
         :return: The set of n+1 size candidate graphs
         :rtype: pd.DataFrame
         """
-        # initialize a DataFrame to save all new candidates
-        new_candidates = pd.DataFrame(columns=['graph', 'size'])
-
-
         # get all frequent edges to initialize graph objects
         candidates_chunks: list = np.array_split(candidates, num_workers)
         candidates_rdd = sc.parallelize(candidates_chunks, num_workers)
         new_candidates_list: list = candidates_rdd.map(
-            generate_new_subgraphs(self.frequent_edges)).collect()
+            generate_new_subgraphs(self.frequent_edges, support_measure=support_measure)).collect()
 
+        # merge the candidates of all workers (the same candidate can be generated by different workers)
+        candidate_set = {}
         for i in range(0, len(new_candidates_list)):
-            new_candidates = new_candidates.append(new_candidates_list[i])
-
-        # eliminate duplicated candidates
-        new_candidates = new_candidates.loc[~new_candidates.index.duplicated(keep='first')]
+            for new_pattern in new_candidates_list[i]['graph']:
+                add_candidate(candidate_set, new_pattern)
+        new_candidates = candidate_set_to_frame(candidate_set)
 
         self.__current_max_size += 1
 
         return new_candidates
+
+    def project_initial_candidates(self, initial_candidates: pd.DataFrame,
+                                   input_csp_graph: Union[Broadcast, CSPGraph],
+                                   input_graph_edges: Union[Broadcast, pd.DataFrame, EdgeIndex]) -> None:
+        """Method to compute the instances of the initial candidates, which are needed to mine the next sizes by
+        projection (see 'generate_projected_subgraphs').
+
+        :param pd.DataFrame initial_candidates: The set of initial candidates of size 1
+        :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+        :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+        :return:
+        """
+        project_initial_patterns(initial_candidates, input_csp_graph, input_graph_edges)
+
+    def generate_projected_subgraphs(self, candidates: pd.DataFrame, min_support: int, sc: SparkContext,
+                                     num_workers: int, input_csp_graph: Union[Broadcast, CSPGraph],
+                                     input_graph_edges: Union[Broadcast, pd.DataFrame, EdgeIndex],
+                                     support_measure: str = 'first_edge') -> pd.DataFrame:
+        """Method for mining the frequent n+1-size graphs out of the instances of the n-size frequent graphs. The
+        extensions are counted in one scan of the instances of their parent, only the frequent ones are built.
+
+        :param pd.DataFrame candidates: The n-size frequent graphs (with their instances)
+        :param int min_support: The minimum support the new graphs have to meet
+        :param SparkContext sc: The SparkContext to use
+        :param int num_workers: The number of workers which are used by Spark
+        :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+        :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+        :param str support_measure: The support measure ('first_edge' or 'mni')
+        :return: The set of n+1 size frequent graphs
+        :rtype: pd.DataFrame
+        """
+        # initialize a DataFrame to save all new frequent graphs
+        new_frequent_subgraphs = pd.DataFrame(columns=['graph', 'size', 'frequency'])
+
+        candidates_chunks: list = np.array_split(candidates, num_workers)
+        candidates_rdd = sc.parallelize(candidates_chunks, num_workers)
+        new_frequent_subgraphs_list: list = candidates_rdd.map(
+            generate_projected_subgraphs(self.frequent_edges, min_support, input_csp_graph,
+                                         input_graph_edges, support_measure=support_measure)).collect()
+
+        for i in range(0, len(new_frequent_subgraphs_list)):
+            new_frequent_subgraphs = new_frequent_subgraphs.append(new_frequent_subgraphs_list[i])
+
+        # eliminate duplicated graphs (the same graph can be an extension of different parents), all isomorphic graphs
+        # have the same support (see 'count_support') -> it doesn't matter which of them is kept
+        new_frequent_subgraphs = new_frequent_subgraphs.loc[~new_frequent_subgraphs.index.duplicated(keep='first')]
+
+        self.__current_max_size += 1
+
+        return new_frequent_subgraphs
@@ -0,0 +1,394 @@
+import pandas as pd
+import numpy as np
+from distributed.pasigram.model.pattern import Pattern
+from distributed.pasigram.model.csp_graph import CSPGraph
+from distributed.pasigram.model.edge_index import EdgeIndex
+from distributed.pasigram.controller.candidate_generation.utils import compute_relevant_forward_edges, \
+    compute_relevant_backward_edges, add_new_forward_edge, add_new_backward_edge, get_backward_edge_nodes
+from distributed.pasigram.controller.csp.evaluator_utils import compute_potential_assigments, compute_domain
+from distributed.pasigram.controller.csp.matcher import match_instances, count_support
+from toolz import curry
+from pyspark import Broadcast
+from typing import Union
+
+########################################################################################################################
+"""This block includes the methods to compute the instances of the initial patterns (size-1 patterns), which are the
+projected databases the extensions of the first level are counted in.
+"""
+
+
+def project_initial_patterns(initial_patterns: pd.DataFrame, input_csp_graph: Union[Broadcast, CSPGraph],
+                             input_graph_edges: Union[Broadcast, pd.DataFrame, EdgeIndex]) -> None:
+    """Method to compute and store the instances of the initial patterns.
+
+    :param pd.DataFrame initial_patterns: The initial patterns (size-1 patterns)
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+    :return:
+    """
+    if type(input_csp_graph) == Broadcast:
+        input_csp_graph, input_graph_edges = input_csp_graph.value, input_graph_edges.value
+    edge_index = get_edge_index(input_graph_edges)
+
+    for i in range(0, len(initial_patterns)):
+        current_pattern: Pattern = initial_patterns.iloc[i]['graph']
+        # the instances were already matched (e.g. to compute the minimum images of the initial patterns)
+        if len(current_pattern.instances) > 0 and current_pattern.complete_instances:
+            continue
+        potential_assignments = compute_potential_assigments(current_pattern.labels, current_pattern.edge_list,
+                                                             current_pattern.instances,
+                                                             current_pattern.new_added_edge, input_csp_graph,
+                                                             edge_index)
+        current_pattern.instances = match_instances(potential_assignments, current_pattern.edge_list, input_csp_graph,
+                                                    edge_index)
+
+
+def get_edge_index(input_graph_edges: Union[pd.DataFrame, EdgeIndex]) -> EdgeIndex:
+    """Method to get the edge index of the input graph (it's built, if only the edges set is given).
+
+    :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+    :return: The edge index of the input graph
+    :rtype: EdgeIndex
+    """
+    if isinstance(input_graph_edges, EdgeIndex):
+        return input_graph_edges
+    return EdgeIndex(input_graph_edges)
+
+
+########################################################################################################################
+"""This block includes all methods to mine the next level of frequent subgraphs by projection. Instead of generating
+all candidates of the next level and evaluating each of them against the input graph, the instances of every frequent
+subgraph (its projected database) are scanned once: all right most extensions are counted in this scan and only the
+extensions with at least min_support instances are built as Pattern objects (their support is counted on the first
+edge of their canonical code). It includes two parts:
+1. Method for the projection of a chunk of frequent subgraphs on a cluster node.
+2. The logic to count the forward and backward extensions of a frequent subgraph.
+"""
+
+
+@curry
+def generate_projected_subgraphs(frequent_edges: pd.DataFrame, min_support: int,
+                                 input_csp_graph: Union[Broadcast, CSPGraph],
+                                 input_graph_edges: Union[Broadcast, pd.DataFrame, EdgeIndex],
+                                 candidates: pd.DataFrame, support_measure: str = 'first_edge') -> pd.DataFrame:
+    """Method to compute all frequent n+1-size subgraphs out of the instances of the n-size frequent subgraphs.
+
+    :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
+    :param int min_support: The minimum support the subgraphs have to meet
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+    :param pd.DataFrame candidates: The frequent subgraphs (with their instances) we want to expand
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :return: The set of new frequent subgraphs
+    :rtype: pd.DataFrame
+    """
+    if type(input_csp_graph) == Broadcast:
+        input_csp_graph, input_graph_edges = input_csp_graph.value, input_graph_edges.value
+
+    new_frequent_subgraphs = project_candidates(candidates, frequent_edges, min_support, input_csp_graph,
+                                                get_edge_index(input_graph_edges), support_measure)
+
+    # eliminate duplicated subgraphs (the same subgraph can be an extension of different parents), all isomorphic
+    # subgraphs have the same support (see 'count_support') -> it doesn't matter which of them is kept
+    new_frequent_subgraphs = new_frequent_subgraphs.loc[~new_frequent_subgraphs.index.duplicated(keep='first')]
+
+    return new_frequent_subgraphs
+
+
+def project_candidates(candidates: pd.DataFrame, frequent_edges: pd.DataFrame, min_support: int,
+                       input_csp_graph: CSPGraph, edge_index: EdgeIndex,
+                       support_measure: str = 'first_edge') -> pd.DataFrame:
+    """Method to compute the frequent extensions of all subgraphs of a given set.
+
+    :param pd.DataFrame candidates: The frequent subgraphs (with their instances) we want to expand
+    :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
+    :param int min_support: The minimum support the extensions have to meet
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :return: The set of frequent extensions
+    :rtype: pd.DataFrame
+    """
+    # the frequent extensions of all candidates are collected and concatenated once at the end (the empty DataFrame
+    # keeps the columns, if there are no candidates)
+    new_frequent_subgraphs: list = [pd.DataFrame(columns=['graph', 'size', 'frequency'])]
+    for i in range(0, len(candidates)):
+        current_candidate: Pattern = candidates.iloc[i]['graph']
+
+        # count all forward extensions of current_candidate
+        new_frequent_subgraphs.append(
+            project_forward_extensions(current_candidate, frequent_edges, min_support, input_csp_graph, edge_index,
+                                       support_measure))
+
+        # count all backward extensions of current_candidate
+        new_frequent_subgraphs.append(
+            project_backward_extensions(current_candidate, frequent_edges, min_support, input_csp_graph, edge_index,
+                                        support_measure))
+
+    return pd.concat(new_frequent_subgraphs)
+
+
+def project_forward_extensions(candidate: Pattern, frequent_edges: pd.DataFrame, min_support: int,
+                               input_csp_graph: CSPGraph, edge_index: EdgeIndex,
+                               support_measure: str = 'first_edge') -> pd.DataFrame:
+    """Method to count all forward extensions of a frequent subgraph in its instances. For every node of the
+    right-most-path the neighbours of its assignments are collected once (both directions, together with the edge
+    and node labels); every relevant forward edge is then only a filter of these neighbours.
+
+    :param Pattern candidate: The frequent subgraph we want to expand
+    :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
+    :param int min_support: The minimum support the extensions have to meet
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :return: The set of frequent forward extensions
+    :rtype: pd.DataFrame
+    """
+    # the rows of the frequent extensions (canonical code -> graph, size, frequency), the DataFrame is built once
+    frequent_extensions = {}
+
+    instances = np.asarray(candidate.instances, dtype=np.int32)
+    candidate_csp_graph = candidate.csp_graph
+    new_node_id = len(candidate.labels)
+
+    # iterate over all nodes of right_most_path
+    for current_node_id in candidate.right_most_path:
+        current_node_label = candidate.labels[current_node_id]
+
+        # get the relevant forward edges for current_node
+        relevant_forward_edges = compute_relevant_forward_edges(current_node_label, frequent_edges)
+        if len(relevant_forward_edges) == 0:
+            continue
+
+        # collect the neighbours of all assignments of current_node (one scan per direction)
+        projections = {outgoing: project_neighbours(instances, int(current_node_id), outgoing, input_csp_graph,
+                                                    edge_index) for outgoing in [True, False]}
+
+        # iterate over all edges of relevant_forward_edges
+        for k in range(len(relevant_forward_edges)):
+            current_relevant_forward_edge = relevant_forward_edges.iloc[k]
+            edge_label = int(current_relevant_forward_edge.at['label'])
+
+            # the edge is outgoing of current_node, iff current_node has the label of its source
+            outgoing = current_node_label == current_relevant_forward_edge.at['source']
+            new_node_label = int(current_relevant_forward_edge.at['target'] if outgoing else
+                                 current_relevant_forward_edge.at['source'])
+            rows, node_assignments, neighbours, edge_labels, neighbour_labels, label_set_ids = projections[outgoing]
+
+            # the new node is connected to current_node by exactly the new edge
+            valid = (edge_labels == edge_label) & (neighbour_labels == new_node_label) & \
+                    (label_set_ids == edge_index.label_set_id([edge_label]))
+            if not valid.any():
+                continue
+
+            # the assignments of both nodes of the new edge have to be in their domains of the extension
+            current_node_domain, new_node_domain = compute_forward_domains(
+                candidate_csp_graph.loc[current_node_id], current_node_label, edge_label, new_node_label, new_node_id,
+                outgoing, input_csp_graph)
+            valid &= current_node_domain[node_assignments] & new_node_domain[neighbours]
+
+            # the instances of the extension (the same neighbour can be reached over several edges -> unique)
+            extension_instances = np.unique(np.column_stack((instances[rows[valid]], neighbours[valid]))
+                                            .astype(np.int32), axis=0)
+
+            # the support can't be larger than the number of instances -> only build the other extensions, their
+            # support is counted on the canonical first edge (see 'Pattern.first_edge_nodes')
+            if len(extension_instances) < min_support:
+                continue
+            new_pattern = add_new_forward_edge(candidate, current_relevant_forward_edge, current_node_id)
+            extension_frequency = count_support(extension_instances, new_pattern.first_edge_nodes, support_measure)
+
+            # only keep the extensions which meet the min_support
+            if extension_frequency >= min_support:
+                new_pattern.instances = extension_instances
+                frequent_extensions[new_pattern.canonical_code] = [new_pattern, new_pattern.size, extension_frequency]
+
+    return pd.DataFrame.from_dict(frequent_extensions, orient='index', columns=['graph', 'size', 'frequency'])
+
+
+def project_backward_extensions(candidate: Pattern, frequent_edges: pd.DataFrame, min_support: int,
+                                input_csp_graph: CSPGraph, edge_index: EdgeIndex,
+                                support_measure: str = 'first_edge') -> pd.DataFrame:
+    """Method to count all backward extensions of a frequent subgraph in its instances. The labels of the edges
+    between the assignments of the right-most-node and the nodes of the right-most-path are looked up once per node;
+    every relevant backward edge is then only a filter of the instances.
+
+    :param Pattern candidate: The frequent subgraph we want to expand
+    :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
+    :param int min_support: The minimum support the extensions have to meet
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :return: The set of frequent backward extensions
+    :rtype: pd.DataFrame
+    """
+    # the rows of the frequent extensions (canonical code -> graph, size, frequency), the DataFrame is built once
+    frequent_extensions = {}
+
+    instances = np.asarray(candidate.instances, dtype=np.int32)
+    candidate_csp_graph = candidate.csp_graph
+    right_most_node = int(candidate.right_most_node)
+    right_most_node_label = candidate.labels[right_most_node]
+
+    # get the relevant backward edges for current_candidate
+    relevant_backward_edges = compute_relevant_backward_edges(right_most_node_label,
+                                                              candidate.right_most_path_labels,
+                                                              frequent_edges)
+
+    # the labels of the edges between the assignments of the node pairs (looked up once per pair)
+    label_set_ids = {}
+
+    # iterate over all edges in relevant_backward_edges
+    for j in range(0, len(relevant_backward_edges)):
+        current_relevant_backward_edge = relevant_backward_edges.iloc[j]
+        edge_label = int(current_relevant_backward_edge.at['label'])
+
+        # get the nodes of the new edge (like 'add_new_backward_edge')
+        source_node_id, target_node_id = get_backward_edge_nodes(candidate, current_relevant_backward_edge)
+        for pair in [(source_node_id, target_node_id), (target_node_id, source_node_id)]:
+            if pair not in label_set_ids:
+                label_set_ids[pair] = edge_index.lookup(instances[:, pair[0]], instances[:, pair[1]])
+
+        # the assignments of both nodes have to be connected by exactly the edges of the extension
+        forward_labels, backward_labels = get_edge_labels(candidate.edges, source_node_id, target_node_id)
+        valid = label_set_ids[(source_node_id, target_node_id)] == \
+            edge_index.label_set_id(forward_labels + [edge_label])
+        if len(backward_labels) > 0:
+            valid &= label_set_ids[(target_node_id, source_node_id)] == edge_index.label_set_id(backward_labels)
+        if not valid.any():
+            continue
+
+        # the assignments of both nodes of the new edge have to be in their domains of the extension
+        source_node_domain, target_node_domain = compute_backward_domains(
+            candidate_csp_graph, source_node_id, target_node_id, edge_label, input_csp_graph)
+        valid &= source_node_domain[instances[:, source_node_id]] & target_node_domain[instances[:, target_node_id]]
+
+        extension_instances = instances[valid]
+
+        # the support can't be larger than the number of instances -> only build the other extensions, their support
+        # is counted on the canonical first edge (see 'Pattern.first_edge_nodes')
+        if len(extension_instances) < min_support:
+            continue
+        new_pattern = add_new_backward_edge(candidate, current_relevant_backward_edge)
+        extension_frequency = count_support(extension_instances, new_pattern.first_edge_nodes, support_measure)
+
+        # only keep the extensions which meet the min_support
+        if extension_frequency >= min_support:
+            new_pattern.instances = extension_instances
+            frequent_extensions[new_pattern.canonical_code] = [new_pattern, new_pattern.size, extension_frequency]
+
+    return pd.DataFrame.from_dict(frequent_extensions, orient='index', columns=['graph', 'size', 'frequency'])
+
+
+def project_neighbours(instances: np.ndarray, node: int, outgoing: bool, input_csp_graph: CSPGraph,
+                       edge_index: EdgeIndex) -> list:
+    """Method to collect the neighbours of all assignments of a node in the instances, which aren't already assigned to
+    another node of the same instance.
+
+    :param np.ndarray instances: The instances of the subgraph (row = instance, column = node)
+    :param int node: The id of the node
+    :param bool outgoing: Collect the outgoing (True) or the ingoing (False) neighbours
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return: The row of the instance, the assignment of the node, the neighbour, the edge label, the neighbour label
+        and the label set id of the edges between assignment and neighbour (in direction of the neighbours)
+    :rtype: list[np.ndarray]
+    """
+    positions = input_csp_graph.positions(instances[:, node])
+    _, neighbours, edge_labels, neighbour_labels = input_csp_graph.neighbour_pairs(positions, outgoing, labels=True)
+    # the pairs are grouped by the given positions -> map them back to the rows of the instances
+    degrees = input_csp_graph.outdegree if outgoing else input_csp_graph.indegree
+    rows = np.repeat(np.arange(len(instances)), degrees[positions])
+    node_assignments = instances[rows, node].astype(np.int64)
+
+    # injectivity: the neighbour mustn't be assigned to another node of the instance
+    valid = ~np.any(instances[rows] == neighbours[:, None], axis=1)
+    rows, node_assignments = rows[valid], node_assignments[valid]
+    neighbours, edge_labels, neighbour_labels = neighbours[valid], edge_labels[valid], neighbour_labels[valid]
+
+    if outgoing:
+        label_set_ids = edge_index.lookup(node_assignments, neighbours)
+    else:
+        label_set_ids = edge_index.lookup(neighbours, node_assignments)
+
+    return [rows, node_assignments, neighbours, edge_labels, neighbour_labels, label_set_ids]
+
+
+def compute_forward_domains(current_node: pd.Series, current_node_label: int, edge_label: int, new_node_label: int,
+                            new_node_id: int, outgoing: bool, input_csp_graph: CSPGraph) -> list:
+    """Method to compute the domains of the nodes of a new forward edge in the extension (the csp graph rows of the
+    extension are derived like 'build_pattern_csp_graph', without building the extension).
+
+    :param pd.Series current_node: The csp graph row of the node of the right-most-path
+    :param int current_node_label: The label of the node of the right-most-path
+    :param int edge_label: The label of the new edge
+    :param int new_node_label: The label of the new node
+    :param int new_node_id: The id of the new node
+    :param bool outgoing: The new edge is outgoing (True) or ingoing (False) for the node of the right-most-path
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :return: The domains (bitsets) of the node of the right-most-path and of the new node
+    :rtype: list[np.ndarray, np.ndarray]
+    """
+    ingoing_neighbours = list(current_node['ingoing_neighbours'])
+    outgoing_neighbours = list(current_node['outgoing_neighbours'])
+    if outgoing:
+        outgoing_neighbours.append([edge_label, new_node_label, new_node_id])
+    else:
+        ingoing_neighbours.append([edge_label, new_node_label, new_node_id])
+
+    current_node_domain = compute_domain(current_node_label, current_node['indegree'] + int(not outgoing),
+                                         current_node['outdegree'] + int(outgoing), sorted(ingoing_neighbours),
+                                         sorted(outgoing_neighbours), input_csp_graph)
+
+    current_node_neighbour = [[edge_label, current_node_label, int(current_node.name)]]
+    new_node_domain = compute_domain(new_node_label, int(outgoing), int(not outgoing),
+                                     current_node_neighbour if outgoing else [],
+                                     [] if outgoing else current_node_neighbour, input_csp_graph)
+
+    return [current_node_domain, new_node_domain]
+
+
+def compute_backward_domains(candidate_csp_graph: pd.DataFrame, source_node_id: int, target_node_id: int,
+                             edge_label: int, input_csp_graph: CSPGraph) -> list:
+    """Method to compute the domains of the nodes of a new backward edge in the extension (the csp graph rows of the
+    extension are derived like 'build_pattern_csp_graph', without building the extension).
+
+    :param pd.DataFrame candidate_csp_graph: The csp graph of the subgraph
+    :param int source_node_id: The id of the source node of the new edge
+    :param int target_node_id: The id of the target node of the new edge
+    :param int edge_label: The label of the new edge
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :return: The domains (bitsets) of the source and the target node
+    :rtype: list[np.ndarray, np.ndarray]
+    """
+    source_node = candidate_csp_graph.loc[source_node_id]
+    target_node = candidate_csp_graph.loc[target_node_id]
+
+    outgoing_neighbours = sorted(list(source_node['outgoing_neighbours']) +
+                                 [[edge_label, target_node['label'], target_node_id]])
+    source_node_domain = compute_domain(source_node['label'], source_node['indegree'], source_node['outdegree'] + 1,
+                                        source_node['ingoing_neighbours'], outgoing_neighbours, input_csp_graph)
+
+    ingoing_neighbours = sorted(list(target_node['ingoing_neighbours']) +
+                                [[edge_label, source_node['label'], source_node_id]])
+    target_node_domain = compute_domain(target_node['label'], target_node['indegree'] + 1, target_node['outdegree'],
+                                        ingoing_neighbours, target_node['outgoing_neighbours'], input_csp_graph)
+
+    return [source_node_domain, target_node_domain]
+
+
+def get_edge_labels(edges: pd.DataFrame, source_node_id: int, target_node_id: int) -> list:
+    """Method to get the labels of the edges between two nodes (in both directions).
+
+    :param pd.DataFrame edges: The set of all edges of the subgraph
+    :param int source_node_id: The id of the first node
+    :param int target_node_id: The id of the second node
+    :return: The labels of the edges from the first to the second node and from the second to the first node
+    :rtype: list[list, list]
+    """
+    forward_labels = [int(label) for source, target, label in zip(edges['source'], edges['target'], edges['label'])
+                      if source == source_node_id and target == target_node_id]
+    backward_labels = [int(label) for source, target, label in zip(edges['source'], edges['target'], edges['label'])
+                       if source == target_node_id and target == source_node_id]
+    return [forward_labels, backward_labels]
+
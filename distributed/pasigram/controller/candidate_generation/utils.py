@@ -1,9 +1,11 @@
 import pandas as pd
-import copy
 import multiprocessing as mp
 import numpy as np
-from distributed.pasigram.model.graph import Graph
+from distributed.pasigram.model.pattern import Pattern
 from distributed.pasigram.controller.candidate_generation.bfs import find_right_most_path
+from distributed.pasigram.service.graph_service import build_canonical_embedding_from_state, \
+    extend_canonical_state, compute_wl_hash, compute_minimum_dfs_embedding, compute_dfs_code_right_most_path, \
+    is_minimum_dfs_code, normalize_label
 from functools import partial
 from toolz import curry
 
@@ -20,6 +22,8 @@ def create_initial_patterns(frequent_edges: pd.DataFrame) -> pd.DataFrame:
 
     new_candidates = get_initial_patterns(frequent_edges)
 
+    # eliminate duplicated patterns (same canonical code), the support measures are invariant under isomorphism -> it
+    # doesn't matter which of them is kept
     new_candidates = new_candidates.loc[~new_candidates.index.duplicated(keep='first')]
 
     return new_candidates
@@ -31,7 +35,8 @@ def get_initial_patterns(frequent_edges: pd.DataFrame) -> pd.DataFrame:
     :param pd.DataFrame frequent_edges:
     :return:
     """
-    new_candidates = pd.DataFrame(columns=['graph', 'size', 'frequency'])
+    # the rows of the candidates (canonical code -> graph, size, frequency), the DataFrame is built once at the end
+    new_candidates = {}
     for i in range(0, len(frequent_edges)):
         # get id and label of edges and nodes
         source_node_label = frequent_edges.iloc[i]['source']
@@ -40,15 +45,9 @@ def get_initial_patterns(frequent_edges: pd.DataFrame) -> pd.DataFrame:
         target_node_id = 1
         edge_label = frequent_edges.iloc[i]['label']
 
-        # initialize DataFrames for the input nodes and edges
-        nodes = pd.DataFrame(data=[source_node_label, target_node_label], columns=['label'],
-                             index=[source_node_id, target_node_id])
-        edges = pd.DataFrame.from_dict({0: [source_node_id, target_node_id, edge_label]}, orient='index',
-                                       columns=['source', 'target', 'label'])
-
-        # initialize graph object for every candidate
-        current_candidate = Graph(nodes, edges)
-        current_candidate.create_initial_csp_graph()
+        # initialize pattern object for every candidate
+        current_candidate = Pattern((source_node_label, target_node_label),
+                                    ((source_node_id, target_node_id, edge_label),))
         current_candidate.build_canonical_smallest_code()
 
         # set root node, right most node and right most path for the graph
@@ -56,11 +55,11 @@ def get_initial_patterns(frequent_edges: pd.DataFrame) -> pd.DataFrame:
         current_candidate.right_most_node = target_node_id
         current_candidate.right_most_path = [source_node_id, target_node_id]
 
-        # add graph object (candidate) to the candidate DataFrame
+        # add graph object (candidate) to the candidate rows
         current_candidate_frequency = frequent_edges.iloc[i]['frequency']
-        new_candidates.at[current_candidate.canonical_code] = [current_candidate, 1, current_candidate_frequency]
+        new_candidates[current_candidate.canonical_code] = [current_candidate, 1, current_candidate_frequency]
 
-    return new_candidates
+    return pd.DataFrame.from_dict(new_candidates, orient='index', columns=['graph', 'size', 'frequency'])
 
 
 ########################################################################################################################
@@ -71,35 +70,261 @@ def get_initial_patterns(frequent_edges: pd.DataFrame) -> pd.DataFrame:
 
 
 @curry
-def generate_new_subgraphs(frequent_edges: pd.DataFrame, candidates: pd.DataFrame) -> pd.DataFrame:
-
-    new_candidates = generate_new_subgraph(candidates, frequent_edges)
+def generate_new_subgraphs(frequent_edges: pd.DataFrame, candidates: pd.DataFrame,
+                           support_measure: str = 'first_edge') -> pd.DataFrame:
 
-    # eliminate duplicated candidates
-    new_candidates = new_candidates.loc[~new_candidates.index.duplicated(keep='first')]
-
-    return new_candidates
+    return candidate_set_to_frame(generate_new_subgraph(candidates, frequent_edges, support_measure))
 
 
-def generate_new_subgraph(candidates: pd.DataFrame, frequent_edges: pd.DataFrame) -> pd.DataFrame:
-    """Method to generate new subgraphs out of a given graph.
+def generate_new_subgraph(candidates: pd.DataFrame, frequent_edges: pd.DataFrame,
+                          support_measure: str = 'first_edge') -> dict:
+    """Method to generate new subgraphs out of a given graph. With the support measure 'mni' only the canonical
+    candidates are generated (see 'generate_canonical_candidates'). The support measure 'first_edge' depends on the
+    first edge of a candidate, i.e. on the parent it was generated out of, so all right most extensions of all parents
+    are generated (and deduplicated).
 
     :param candidates: The frequent subgraphs we want to expand
     :param frequent_edges: The set of all frequent edges of the input graph
-    :return: List of the newly generated candidates
-    :rtype: list
+    :param str support_measure: The support measure ('first_edge' or 'mni')
+    :return: The candidate set of the newly generated candidates (see 'add_candidate')
+    :rtype: dict
     """
-    new_candidates = pd.DataFrame(columns=['graph', 'size'])
+    candidate_set = {}
+
+    if support_measure == 'mni':
+        # get the labels of all frequent edges once (normalized like the labels of the canonical states)
+        frequent_edge_labels = compute_frequent_edge_labels(frequent_edges)
+
+        for i in range(0, len(candidates)):
+            # generate all canonical forward- and backward-edge-candidates for the current candidate
+            generate_canonical_candidates(candidates.iloc[i]['graph'], frequent_edge_labels, candidate_set)
+
+        return candidate_set
+
     for i in range(0, len(candidates)):
         current_candidate = candidates.iloc[i]['graph']
 
         # generate all forward-edge-candidates for current_candidate
-        new_candidates = new_candidates.append(generate_new_forward_edge_candidates(current_candidate, frequent_edges))
+        generate_new_forward_edge_candidates(current_candidate, frequent_edges, candidate_set)
 
         # generate all backward-edge-candidates for current_candidates
-        new_candidates = new_candidates.append(generate_backward_edge_candidates(current_candidate, frequent_edges))
+        generate_backward_edge_candidates(current_candidate, frequent_edges, candidate_set)
 
-    return new_candidates
+    return candidate_set
+
+
+########################################################################################################################
+"""This block includes all methods to deduplicate the generated candidates. The candidates are collected in a candidate 
+set, a dict which maps the Weisfeiler-Lehman hash of the candidates to the list of all candidates with this hash. Only 
+the candidates with the same hash are compared by their canonical codes (exact). An extension is checked against the 
+candidate set before its Pattern object is built, so duplicated candidates are never built. Only the first of all 
+isomorphic candidates is kept, which is safe, because the support measures (see 'count_support') give all of them the 
+same support.
+"""
+
+
+def compute_extension_state(candidate: Pattern, new_added_edge: dict, new_node_label=None) -> list:
+    """Method to compute the canonical state and the Weisfeiler-Lehman hash of an extension of a graph, without
+    building the extension.
+
+    :param Pattern candidate: The graph we want to expand
+    :param dict new_added_edge: The new edge of the extension
+    :param new_node_label: The label of the new node (only for forward edges)
+    :return: The canonical state and the hash of the extension
+    :rtype: list[dict, int]
+    """
+    new_node_id = len(candidate.labels)
+    canonical_state = extend_canonical_state(candidate.canonical_state, new_added_edge, {new_node_id: new_node_label})
+    return [canonical_state, compute_wl_hash(canonical_state)]
+
+
+def is_known_candidate(candidate_set: dict, canonical_state: dict, wl_hash: int) -> list:
+    """Method to check if a graph (given by its canonical state) is already part of a candidate set. The canonical
+    code is only built, if a candidate has the same hash. It is returned together with the canonical node order (see
+    'build_canonical_embedding_from_state'), so the graph doesn't have to build it again.
+
+    :param dict candidate_set: The candidate set (hash -> list of candidates)
+    :param dict canonical_state: The canonical state of the graph
+    :param int wl_hash: The Weisfeiler-Lehman hash of the graph
+    :return: True, if an isomorphic candidate is part of the candidate set, and the canonical embedding of the graph
+        (None, if it wasn't built)
+    :rtype: list[bool, list]
+    """
+    bucket = candidate_set.get(wl_hash)
+    if bucket is None:
+        return [False, None]
+
+    # the hashes are equal -> compare the canonical codes
+    canonical_embedding = build_canonical_embedding_from_state(canonical_state)
+    return [any(candidate.canonical_code == canonical_embedding[0] for candidate in bucket), canonical_embedding]
+
+
+def add_candidate(candidate_set: dict, new_pattern: Pattern) -> bool:
+    """Method to add a candidate to a candidate set, if no isomorphic candidate is already part of it.
+
+    :param dict candidate_set: The candidate set (hash -> list of candidates)
+    :param Pattern new_pattern: The candidate (with canonical code and hash)
+    :return: True, if the candidate was added
+    :rtype: bool
+    """
+    bucket = candidate_set.setdefault(new_pattern.wl_hash, [])
+    if any(candidate.canonical_code == new_pattern.canonical_code for candidate in bucket):
+        return False
+
+    bucket.append(new_pattern)
+    return True
+
+
+def candidate_set_to_frame(candidate_set: dict) -> pd.DataFrame:
+    """Method to convert a candidate set into the candidates DataFrame (index = canonical code).
+
+    :param dict candidate_set: The candidate set (hash -> list of candidates)
+    :return: The candidates
+    :rtype: pd.DataFrame
+    """
+    new_patterns = [new_pattern for bucket in candidate_set.values() for new_pattern in bucket]
+    return pd.DataFrame({'graph': new_patterns, 'size': [new_pattern.size for new_pattern in new_patterns]},
+                        index=[new_pattern.canonical_code for new_pattern in new_patterns], columns=['graph', 'size'])
+
+
+########################################################################################################################
+"""This block includes all methods to generate the canonical candidates of a frequent subgraph (gSpan): the candidates 
+are the right most extensions of the minimum DFS code of the subgraph (backward edges from the right most node to a 
+node of the right most path and forward edges from a node of the right most path to a new node). An extension is only 
+built, if the extended DFS code is the minimum DFS code of the extension. So every candidate is only generated out of 
+one parent (the subgraph of the first n edges of its minimum DFS code) and duplicated candidates are never built.
+"""
+
+
+def compute_frequent_edge_labels(frequent_edges: pd.DataFrame) -> list:
+    """Method to get the labels of all frequent edges.
+
+    :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
+    :return: The labels of the frequent edges (source label, target label, edge label)
+    :rtype: list
+    """
+    return [(normalize_label(source), normalize_label(target), normalize_label(label))
+            for source, target, label in zip(frequent_edges['source'], frequent_edges['target'],
+                                             frequent_edges['label'])]
+
+
+def generate_canonical_candidates(current_candidate: Pattern, frequent_edge_labels: list,
+                                  candidate_set: dict = None) -> dict:
+    """Method for generating all canonical candidates out of a given frequent subgraph.
+
+    :param Pattern current_candidate: The frequent subgraph we want to expand
+    :param list frequent_edge_labels: The labels of all frequent edges (see 'compute_frequent_edge_labels')
+    :param dict candidate_set: The candidate set the new candidates are added to (optionally)
+    :return: The candidate set with the newly generated candidates (see 'add_candidate')
+    :rtype: dict
+    """
+    canonical_candidates = {} if candidate_set is None else candidate_set
+
+    # get the minimum DFS code of current_candidate and its nodes in the order of their discovery times
+    canonical_state = current_candidate.canonical_state
+    dfs_code, dfs_nodes = compute_minimum_dfs_embedding(canonical_state['node_labels'], canonical_state['edges'],
+                                                        canonical_state['adjacency'])
+
+    for extension, new_added_edge, new_node_label in compute_right_most_extension_edges(
+            dfs_code, dfs_nodes, canonical_state['node_labels'], frequent_edge_labels):
+        new_dfs_code = dfs_code + [extension]
+
+        # skip the extension, if the extended DFS code isn't its minimum DFS code (not the canonical parent)
+        new_canonical_state = extend_canonical_state(canonical_state, new_added_edge, {len(dfs_nodes): new_node_label})
+        if not is_minimum_dfs_code(new_canonical_state['node_labels'], new_canonical_state['edges'], new_dfs_code,
+                                   new_canonical_state['adjacency']):
+            continue
+
+        # get the Pattern object of the new candidate (with the already extended canonical state)
+        new_pattern = add_new_edge(current_candidate, new_added_edge, new_node_label, new_canonical_state)
+
+        # set root node, right most node and right most path of the new candidate (out of its minimum DFS code)
+        new_dfs_nodes = dfs_nodes + [len(dfs_nodes)] if new_node_label is not None else dfs_nodes
+        new_pattern.right_most_path = [new_dfs_nodes[time] for time in
+                                       reversed(compute_dfs_code_right_most_path(new_dfs_code))]
+        new_pattern.root_node = new_pattern.right_most_path[0]
+        new_pattern.right_most_node = new_pattern.right_most_path[-1]
+
+        new_pattern.build_wl_hash()
+        add_candidate(canonical_candidates, new_pattern)
+
+    return canonical_candidates
+
+
+def compute_right_most_extension_edges(dfs_code: list, dfs_nodes: list, node_labels: dict,
+                                       frequent_edge_labels: list) -> list:
+    """Method to compute all right most extensions of a DFS code, whose edges are frequent edges.
+
+    :param list dfs_code: The DFS code of the subgraph
+    :param list dfs_nodes: The nodes of the subgraph in the order of their discovery times
+    :param dict node_labels: The label of every node (node id -> label)
+    :param list frequent_edge_labels: The labels of all frequent edges (see 'compute_frequent_edge_labels')
+    :return: The extensions (edge tuple of the DFS code, new added edge and the label of the new node (None for
+        backward edges))
+    :rtype: list[tuple, dict, int]
+    """
+    extensions = []
+    right_most_path = compute_dfs_code_right_most_path(dfs_code)
+    right_most_node = right_most_path[0]
+    right_most_node_id = dfs_nodes[right_most_node]
+    right_most_node_label = node_labels[right_most_node_id]
+    new_node = len(dfs_nodes)
+
+    # backward edges from the right most node to the other nodes of the right most path
+    for time in right_most_path[1:]:
+        node_id = dfs_nodes[time]
+        node_label = node_labels[node_id]
+        for source_label, target_label, edge_label in frequent_edge_labels:
+            if source_label == right_most_node_label and target_label == node_label:
+                extensions.append(((right_most_node, time, right_most_node_label, edge_label, 0, node_label),
+                                   {'parent_node_id': right_most_node_id, 'child_node_id': node_id,
+                                    'edge_label': edge_label, 'edge_type': 'backward'}, None))
+            if source_label == node_label and target_label == right_most_node_label:
+                extensions.append(((right_most_node, time, right_most_node_label, edge_label, 1, node_label),
+                                   {'parent_node_id': node_id, 'child_node_id': right_most_node_id,
+                                    'edge_label': edge_label, 'edge_type': 'backward'}, None))
+
+    # forward edges from the nodes of the right most path to a new node
+    for time in right_most_path:
+        node_id = dfs_nodes[time]
+        node_label = node_labels[node_id]
+        for source_label, target_label, edge_label in frequent_edge_labels:
+            if source_label == node_label:
+                extensions.append(((time, new_node, node_label, edge_label, 0, target_label),
+                                   {'parent_node_id': node_id, 'child_node_id': new_node,
+                                    'edge_label': edge_label, 'edge_type': 'forward'}, target_label))
+            if target_label == node_label:
+                extensions.append(((time, new_node, node_label, edge_label, 1, source_label),
+                                   {'parent_node_id': new_node, 'child_node_id': node_id,
+                                    'edge_label': edge_label, 'edge_type': 'forward'}, source_label))
+
+    return extensions
+
+
+def add_new_edge(candidate: Pattern, new_added_edge: dict, new_node_label=None,
+                 canonical_state: dict = None, canonical_embedding: list = None) -> Pattern:
+    """Method to add a new edge (and perhaps a new node) to an existing pattern. As a result you get an new pattern
+    object with the all edges and nodes of the existing pattern + the new edge (and node). The root node, right most
+    node and right most path of the new pattern are set by the caller.
+
+    :param Pattern candidate: The existing graph to expand.
+    :param dict new_added_edge: The edge we want to add to the existing graph.
+    :param new_node_label: The label of the new node (only for forward edges)
+    :param dict canonical_state: The canonical state of the new pattern (optionally, if it is already extended)
+    :param list canonical_embedding: The canonical code and node order of the new pattern (optionally, if they are
+        already built)
+    :return: A Pattern object of the new generated graph.
+    :rtype: Pattern
+    """
+
+    # extend the existing subgraph by the new edge (and perhaps new node), the new candidate inherits the valid
+    # instances and the (extended) canonical state of the parent subgraph
+    new_candidate = candidate.extend(new_added_edge, new_node_label, canonical_state)
+
+    # build the new canonical code for the candidate
+    new_candidate.build_canonical_smallest_code(canonical_embedding)
+
+    return new_candidate
 
 
 ########################################################################################################################
@@ -109,16 +334,18 @@ and generate all possible candidates.
 """
 
 
-def generate_new_forward_edge_candidates(current_candidate: Graph, frequent_edges: pd.DataFrame) -> pd.DataFrame:
+def generate_new_forward_edge_candidates(current_candidate: Pattern, frequent_edges: pd.DataFrame,
+                                         candidate_set: dict = None) -> dict:
     """Method for generating all possible forward edge candidates out of a given frequent subgraph.
 
-    :param Graph current_candidate: The candidate for which we want to add new backward edges
+    :param Pattern current_candidate: The candidate for which we want to add new backward edges
     :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
-    :return: A graph object of the newly generated candidate
-    :rtype: Graph
+    :param dict candidate_set: The candidate set the new candidates are added to (optionally)
+    :return: The candidate set with the newly generated candidates (see 'add_candidate')
+    :rtype: dict
     """
 
-    forward_edge_candidates = pd.DataFrame(columns=['graph', 'size'])
+    forward_edge_candidates = {} if candidate_set is None else candidate_set
 
     # get the right-most-path for current_candidate
     right_most_path = current_candidate.right_most_path
@@ -127,7 +354,7 @@ def generate_new_forward_edge_candidates(current_candidate: Graph, frequent_edge
     for j in range(0, len(right_most_path)):
         # get the id and label of the current_node
         current_node_id = right_most_path[j]
-        current_node_label = current_candidate.nodes.loc[current_node_id]['label']
+        current_node_label = current_candidate.labels[current_node_id]
 
         # get the relevant forward edges for current_node
         relevant_foward_edges = compute_relevant_forward_edges(current_node_label, frequent_edges)
@@ -137,10 +364,22 @@ def generate_new_forward_edge_candidates(current_candidate: Graph, frequent_edge
             # get the current_relevant_edge (pd.Series)
             current_relevant_forward_edge = relevant_foward_edges.iloc[k]
 
-            # get the Graph object of the new candidate
-            new_pattern = add_new_forward_edge(current_candidate, current_relevant_forward_edge, current_node_id)
+            # skip the extension, if it was already generated (by another parent or edge)
+            source_node_id, target_node_id, new_node_label = get_forward_edge_nodes(
+                current_candidate, current_relevant_forward_edge, current_node_id)
+            canonical_state, wl_hash = compute_extension_state(
+                current_candidate, {'parent_node_id': source_node_id, 'child_node_id': target_node_id,
+                                    'edge_label': current_relevant_forward_edge.at['label']}, new_node_label)
+            known_candidate, canonical_embedding = is_known_candidate(forward_edge_candidates, canonical_state, wl_hash)
+            if known_candidate:
+                continue
 
-            forward_edge_candidates.at[new_pattern.canonical_code] = [new_pattern, new_pattern.size]
+            # get the Pattern object of the new candidate (with the already extended canonical state and code)
+            new_pattern = add_new_forward_edge(current_candidate, current_relevant_forward_edge, current_node_id,
+                                               canonical_state, canonical_embedding)
+            new_pattern.wl_hash = wl_hash
+
+            add_candidate(forward_edge_candidates, new_pattern)
 
     return forward_edge_candidates
 
@@ -158,77 +397,50 @@ def compute_relevant_forward_edges(node: str, frequent_edges: pd.DataFrame) -> p
     return relevant_forward_edges
 
 
-def add_new_forward_edge(candidate: Graph, new_edge: pd.Series, current_node_id: int) -> Graph:
+def get_forward_edge_nodes(candidate: Pattern, new_edge: pd.Series, current_node_id: int) -> list:
+    """Method to get the source and target node of a new forward edge, like 'add_new_forward_edge' connects them (the
+    node of the right-most-path and a new node).
+
+    :param Pattern candidate: The subgraph we want to expand
+    :param pd.Series new_edge: The forward edge
+    :param int current_node_id: The id of the node where we want to add the new edge
+    :return: The ids of the source and target node and the label of the new node
+    :rtype: list[int, int, int]
+    """
+    new_node_id = len(candidate.labels)
+    if candidate.labels[current_node_id] == new_edge.at['source']:
+        return [current_node_id, new_node_id, new_edge.at['target']]
+    return [new_node_id, current_node_id, new_edge.at['source']]
+
+
+def add_new_forward_edge(candidate: Pattern, new_edge: pd.Series, current_node_id: int,
+                         canonical_state: dict = None, canonical_embedding: list = None) -> Pattern:
     """Method to add a new forward edge to an existing graph, which connects a node in the existing graph to an new node
     which is not already in the existing graph. As a result you get an new graph object with the all edges and nodes of
     the existing graph + the new edge and node.
 
-    :param Graph candidate: The existing graph to expand.
+    :param Pattern candidate: The existing graph to expand.
     :param pd.Series new_edge: The edge we want to add to the existing graph.
     :param int current_node_id: The id of the node where we want to add the new edge.
-    :return: A Graph object of the new generated graph.
-    :rtype: Graph
+    :param dict canonical_state: The canonical state of the new graph (optionally, see 'compute_extension_state')
+    :param list canonical_embedding: The canonical code and node order of the new graph (optionally, see
+        'is_known_candidate')
+    :return: A Pattern object of the new generated graph.
+    :rtype: Pattern
     """
+    source_node_id, target_node_id, new_node_label = get_forward_edge_nodes(candidate, new_edge, current_node_id)
 
-    # get the nodes and edges of the existing subgraph
-    candidate_nodes = candidate.nodes.copy()
-    candidate_edges = candidate.edges.copy()
-    candidate_csp_graph: pd.DataFrame = candidate.csp_graph.copy()
-
-    current_node_label = candidate_nodes.loc[current_node_id]['label']
-
-    if current_node_label == new_edge.at['source']:
-
-        # get label,id of the target node of the new_edge
-        target_node_label = new_edge.at['target']
-        target_node_id = len(candidate_nodes)
-
-        source_node_id = current_node_id
+    new_candidate = add_new_edge(candidate, {'parent_node_id': source_node_id, 'child_node_id': target_node_id,
+                                             'edge_label': new_edge.at['label'], 'edge_type': 'forward'},
+                                 new_node_label, canonical_state, canonical_embedding)
 
-        # append the new node (target_node) to the existing nodes
-        candidate_nodes.at[target_node_id] = [target_node_label]
-
-    else:
-        # get label,id of the target node of the new_edge
-        target_node_id = current_node_id
-
-        source_node_id = len(candidate_nodes)
-        source_node_label = new_edge.at['source']
-
-        # append the new node (target_node) to the existing nodes
-        candidate_nodes.at[source_node_id] = [source_node_label]
-
-    # get the label of new_edge
-    new_edge_label = new_edge.at['label']
-
-    # append new_edge to the existing edges
-    candidate_edges.at[len(candidate_edges)] = [source_node_id, target_node_id, new_edge_label]
-
-    # initialize the new_candidate as a graph
-    new_candidate = Graph(candidate_nodes, candidate_edges, candidate_csp_graph)
-
-    # set the right_most_node of new_candidate
-    new_candidate.right_most_node = len(candidate_nodes) - 1
-
-    # set the root_node of  new_candidate
+    # set the right_most_node (the new node) and the root_node of new_candidate
+    new_candidate.right_most_node = len(new_candidate.labels) - 1
     new_candidate.root_node = candidate.root_node
 
     # set the right most path for the new candidate
     new_candidate.right_most_path = find_right_most_path(new_candidate)
 
-    # copy the valid instances of the parent subgraph
-    new_candidate.instances = copy.deepcopy(candidate.instances)
-
-    # set the new added edge for the new candidate
-    new_candidate.new_added_edge = {'parent_node_id': source_node_id, 'child_node_id': target_node_id,
-                                    'edge_label': new_edge_label, 'edge_type': 'forward'}
-
-    # extend the csp graph by the new edge (and perhaps new node)
-    new_candidate.extend_csp_graph()
-
-    # build the new canonical code for the candidate
-    new_candidate.build_canonical_smallest_code()
-
     return new_candidate
 
 
@@ -239,19 +451,21 @@ and generate all possible candidates.
 """
 
 
-def generate_backward_edge_candidates(current_candidate: Graph, frequent_edges: pd.DataFrame) -> pd.DataFrame:
+def generate_backward_edge_candidates(current_candidate: Pattern, frequent_edges: pd.DataFrame,
+                                      candidate_set: dict = None) -> dict:
     """Method for generating all possible backward edge candidates out of a given frequent subgraph.
 
-    :param Graph current_candidate: The candidate for which we want to add new backward edges
+    :param Pattern current_candidate: The candidate for which we want to add new backward edges
     :param pd.DataFrame frequent_edges: The set of all frequent edges of the input graph
-    :return: A graph object of the newly generated candidate
-    :rtype: Graph
+    :param dict candidate_set: The candidate set the new candidates are added to (optionally)
+    :return: The candidate set with the newly generated candidates (see 'add_candidate')
+    :rtype: dict
     """
 
-    backward_edge_candidates = pd.DataFrame(columns=['graph', 'size'])
+    backward_edge_candidates = {} if candidate_set is None else candidate_set
 
     # get the right-most-node-label of current_candidate
-    right_most_node_label = current_candidate.nodes.loc[current_candidate.right_most_node]['label']
+    right_most_node_label = current_candidate.labels[current_candidate.right_most_node]
 
     # get labels for all nodes in right-most-path of current_candidate
     right_most_path_labels = current_candidate.right_most_path_labels
@@ -265,10 +479,23 @@ def generate_backward_edge_candidates(current_candidate: Graph, frequent_edges:
     for j in range(0, len(relevant_backward_edges)):
         # get the current relevant backward edge
         current_relevant_backward_edge = relevant_backward_edges.iloc[j]
-        # add current_relevant_backward_edge to current_candidate and create a new pattern (Graph object)
-        new_pattern = add_new_backward_edge(current_candidate, current_relevant_backward_edge)
 
-        backward_edge_candidates.at[new_pattern.canonical_code] = [new_pattern, new_pattern.size]
+        # skip the extension, if it was already generated (by another parent or edge)
+        source_node_id, target_node_id = get_backward_edge_nodes(current_candidate, current_relevant_backward_edge)
+        canonical_state, wl_hash = compute_extension_state(
+            current_candidate, {'parent_node_id': source_node_id, 'child_node_id': target_node_id,
+                                'edge_label': current_relevant_backward_edge.at['label']})
+        known_candidate, canonical_embedding = is_known_candidate(backward_edge_candidates, canonical_state, wl_hash)
+        if known_candidate:
+            continue
+
+        # add current_relevant_backward_edge to current_candidate and create a new pattern (Pattern object) with the
+        # already extended canonical state and code
+        new_pattern = add_new_backward_edge(current_candidate, current_relevant_backward_edge, canonical_state,
+                                            canonical_embedding)
+        new_pattern.wl_hash = wl_hash
+
+        add_candidate(backward_edge_candidates, new_pattern)
 
     return backward_edge_candidates
 
@@ -306,85 +533,57 @@ def compute_relevant_backward_edges(right_most_node_label: str, right_most_path:
     return relevant_backward_edges
 
 
-def add_new_backward_edge(candidate: Graph, new_edge: pd.Series) -> Graph:
-    """Method to add a new backward edge to an existing graph, which connects the right-most-node in the existing graph
-    to an existing node which is part of the right-most-path. As a result you get an new graph object with the all
-    edges and nodes of the existing graph + the new edge.
+def get_backward_edge_nodes(candidate: Pattern, new_edge: pd.Series) -> list:
+    """Method to get the source and target node of a new backward edge, like 'add_new_backward_edge' connects them
+    (the right-most-node and the last node of the right-most-path with the label of the other end of the edge).
 
-    :param Graph candidate: The existing graph to expand.
-    :param pd.Series new_edge: The edge we want to add to the existing graph.
-    :return: A Graph object of the new generated graph.
-    :rtype: Graph
+    :param Pattern candidate: The subgraph we want to expand
+    :param pd.Series new_edge: The backward edge
+    :return: The ids of the source and target node
+    :rtype: list[int, int]
     """
+    right_most_node = int(candidate.right_most_node)
+    right_most_node_label = candidate.labels[right_most_node]
+    outgoing = right_most_node_label == new_edge.at['source']
+    other_node_label = new_edge.at['target'] if outgoing else new_edge.at['source']
 
-    # get the nodes and edges of the existing subgraph
-    candidate_nodes = candidate.nodes.copy()
-    candidate_edges = candidate.edges.copy()
-    candidate_csp_graph: pd.DataFrame = candidate.csp_graph.copy()
-
-    right_most_path_nodes = candidate.right_most_path
-    right_most_node_label = candidate_nodes.loc[candidate.right_most_node]['label']
-
-    if right_most_node_label == new_edge.at['source']:
-        # get label, id of the target node of the new_edge
-        target_node_label = new_edge.loc['target']
-
-        for i in range(0, len(right_most_path_nodes) - 1):
-            current_right_most_path_node = candidate_nodes.loc[right_most_path_nodes[i]]
-            label = current_right_most_path_node.loc['label']
-
-            if label == target_node_label:
-                target_node_id = right_most_path_nodes[i]
-
-        # get the label of new_edge
-        new_edge_label = new_edge.loc['label']
-
-        # append new_edge to the existing edges
-        candidate_edges.at[len(candidate_edges)] = [candidate.right_most_node, target_node_id, new_edge_label]
+    other_node_id = None
+    for node_id in candidate.right_most_path[:-1]:
+        if candidate.labels[node_id] == other_node_label:
+            other_node_id = int(node_id)
 
-    elif right_most_node_label == new_edge.at['target']:
-        # get label,id of the target node of the new_edge
-        source_node_label = new_edge.loc['source']
+    if outgoing:
+        return [right_most_node, other_node_id]
+    return [other_node_id, right_most_node]
 
-        for i in range(0, len(right_most_path_nodes) - 1):
-            current_right_most_path_node = candidate_nodes.loc[right_most_path_nodes[i]]
-            label = current_right_most_path_node.loc['label']
 
-            if label == source_node_label:
-                source_node_id = right_most_path_nodes[i]
-
-        # get the label of new_edge
-        new_edge_label = new_edge.loc['label']
-
-        # append new_edge to the existing edges
-        candidate_edges.at[len(candidate_edges)] = [source_node_id, candidate.right_most_node, new_edge_label]
+def add_new_backward_edge(candidate: Pattern, new_edge: pd.Series, canonical_state: dict = None,
+                          canonical_embedding: list = None) -> Pattern:
+    """Method to add a new backward edge to an existing graph, which connects the right-most-node in the existing graph
+    to an existing node which is part of the right-most-path. As a result you get an new graph object with the all
+    edges and nodes of the existing graph + the new edge.
 
-    # initialize the new_candidate as a graph
-    new_candidate = Graph(candidate_nodes, candidate_edges, candidate_csp_graph)
+    :param Pattern candidate: The existing graph to expand.
+    :param pd.Series new_edge: The edge we want to add to the existing graph.
+    :param dict canonical_state: The canonical state of the new graph (optionally, see 'compute_extension_state')
+    :param list canonical_embedding: The canonical code and node order of the new graph (optionally, see
+        'is_known_candidate')
+    :return: A Pattern object of the new generated graph.
+    :rtype: Pattern
+    """
+    source_node_id, target_node_id = get_backward_edge_nodes(candidate, new_edge)
 
-    # set the right_most_node of new_candidate
-    new_candidate.right_most_node = len(candidate_nodes) - 1
+    new_candidate = add_new_edge(candidate, {'parent_node_id': source_node_id, 'child_node_id': target_node_id,
+                                             'edge_label': new_edge.at['label'], 'edge_type': 'backward'},
+                                 None, canonical_state, canonical_embedding)
 
-    # set the root_node of  new_candidate
+    # set the right_most_node and the root_node of new_candidate
+    new_candidate.right_most_node = len(new_candidate.labels) - 1
     new_candidate.root_node = candidate.root_node
 
     # set the right most path for the new candidate
     new_candidate.right_most_path = find_right_most_path(new_candidate)
 
-    # copy the valid instances of the parent subgraph
-    new_candidate.instances = copy.deepcopy(candidate.instances)
-
-    # set the new added edge for the new candidate
-    new_candidate.new_added_edge = {'parent_node_id': candidate_edges.loc[len(candidate_edges) - 1].source,
-                                    'child_node_id': candidate_edges.loc[len(candidate_edges) - 1].target,
-                                    'edge_label': new_edge_label, 'edge_type': 'backward'}
-
-    # extend the csp graph by the new edge (and perhaps new node)
-    new_candidate.extend_csp_graph()
-
-    # build the new canonical code for the candidate
-    new_candidate.build_canonical_smallest_code()
-
     return new_candidate
 
 
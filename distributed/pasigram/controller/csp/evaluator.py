@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 from distributed.pasigram.model.graph import Graph
+from distributed.pasigram.model.csp_graph import CSPGraph
+from distributed.pasigram.model.edge_index import EdgeIndex
 from distributed.pasigram.controller.csp.evaluator_utils import evaluate_candidates
 from pyspark import SparkContext, Broadcast
 from typing import Union
@@ -10,17 +12,61 @@ class Evaluator:
     """A class to represent the evaluator component of the PaSiGraM algorithm.
     """
 
-    def __init__(self, min_support: int) -> None:
+    def __init__(self, min_support: int, support_measure: str = 'first_edge', exact_frequency: bool = True) -> None:
         """Constructor
 
         :param Integer min_support: The minimum support the candidates have to meet
+        :param str support_measure: The support measure: the number of distinct assignments of the first candidate
+            edge ('first_edge') or the minimum image based support ('mni')
+        :param bool exact_frequency: Count the exact frequencies (True) or stop the matching of a candidate once it
+            meets the min_support (False)
         """
 
         self.__min_support = min_support
+        self.__support_measure = support_measure
+        self.__exact_frequency = exact_frequency
+        # cache of the matching plans of the candidates (see 'get_matching_plan')
+        self.__matching_plans: dict = {}
+
+    @property
+    def support_measure(self) -> str:
+        """The support measure which is used to compute the frequency of the candidates
+
+        :return: support_measure
+        :rtype: str
+        """
+        return self.__support_measure
+
+    @property
+    def exact_frequency(self) -> bool:
+        """Whether the exact frequencies of the frequent candidates are counted (otherwise only a lower bound, which
+        meets the min_support)
+
+        :return: exact_frequency
+        :rtype: bool
+        """
+        return self.__exact_frequency
+
+    @property
+    def matching_plans(self) -> dict:
+        """The cache of the matching plans of the evaluated candidates (canonical code and positions of the fixed nodes
+        -> plan in the canonical node order)
+
+        :return: matching_plans
+        :rtype: dict
+        """
+        return self.__matching_plans
+
+    def clear_matching_plans(self) -> None:
+        """Method to remove all matching plans out of the cache (e.g. once all candidates of a size are evaluated).
+
+        :return:
+        """
+        self.__matching_plans.clear()
 
     def evaluate_candidates(self, candidate_set: pd.DataFrame, sc: SparkContext, num_workers: int,
-                            input_csp_graph: Union[Broadcast, pd.DataFrame],
-                            input_graph_edges: Union[Broadcast, pd.DataFrame]) -> pd.DataFrame:
+                            input_csp_graph: Union[Broadcast, CSPGraph],
+                            input_graph_edges: Union[Broadcast, pd.DataFrame, EdgeIndex]) -> pd.DataFrame:
         """Method to evaluate the frequency of newly generated candidates.
 
         :param pd.DataFrame candidate_set: The set of candidates for which one want to evaluate the frequency
@@ -45,7 +91,9 @@ class Evaluator:
         # distribute the candidate evaluation over the single cluster nodes
         new_frequent_subgraphs_list: list[pd.DataFrame[Graph]] = candidates_rdd.map(
             evaluate_candidates(input_csp_graph, self.__min_support,
-                                input_graph_edges)).collect()
+                                input_graph_edges, support_measure=self.__support_measure,
+                                exact_frequency=self.__exact_frequency,
+                                matching_plans=self.__matching_plans)).collect()
 
         # iterate over all DataFrames in 'new_frequent_subgraphs_list'
         for item in new_frequent_subgraphs_list:
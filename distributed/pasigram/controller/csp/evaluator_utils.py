@@ -1,7 +1,13 @@
 import pandas as pd
 import numpy as np
 import multiprocessing as mp
-from distributed.pasigram.model.graph import Graph
+from distributed.pasigram.model.pattern import Pattern
+from distributed.pasigram.model.csp_graph import CSPGraph
+from distributed.pasigram.model.edge_index import EdgeIndex
+from distributed.pasigram.controller.csp.matcher import match_instances, match_instances_until_support, count_support, \
+    get_fixed_nodes
+from distributed.pasigram.controller.csp.planner import get_matching_plan
+from distributed.pasigram.service.graph_service import compute_pattern_neighbours
 from functools import partial
 from toolz import curry
 from pyspark import Broadcast
@@ -9,15 +15,22 @@ from typing import Union
 
 
 @curry
-def evaluate_candidates(input_csp_graph: Union[Broadcast, pd.DataFrame], min_support: int,
-                        input_graph_edges: Union[Broadcast, pd.DataFrame], candidate_set: pd.DataFrame) -> pd.DataFrame:
+def evaluate_candidates(input_csp_graph: Union[Broadcast, CSPGraph], min_support: int,
+                        input_graph_edges: Union[Broadcast, pd.DataFrame, EdgeIndex],
+                        candidate_set: pd.DataFrame, support_measure: str = 'first_edge',
+                        exact_frequency: bool = True, matching_plans: dict = None) -> pd.DataFrame:
     """Method to evaluate if candidates of a given set are frequent or not.
 
-    :param pd.DataFrame input_csp_graph: The csp_graph representation of the input graph
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
     :param int min_support: The minimum support the candidates have to meet
-    :param pd.DataFrame input_graph_edges: The edges set of the input graph
+    :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
     :param bool local_distributed: Enable (=True) or disable (=False) local parallelization over multiple cpu cores
     :param pd.DataFrame candidate_set: The set of candidates
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :param bool exact_frequency: Count the exact frequencies (True) or stop the matching of a candidate once it meets
+        the min_support (False, see 'calculate_frequency')
+    :param dict matching_plans: The cache of the matching plans (see 'get_matching_plan'), every worker works on its
+        own copy of the cache
     :return: A set of frequent subgraphs
     :rtype: pd.DataFrame
     """
@@ -26,32 +39,44 @@ def evaluate_candidates(input_csp_graph: Union[Broadcast, pd.DataFrame], min_sup
 
     if type(input_csp_graph) == Broadcast:
         new_frequent_subgraphs = new_frequent_subgraphs.append(
-            evaluate_candidates_chunk(candidate_set, min_support, input_csp_graph.value, input_graph_edges.value))
+            evaluate_candidates_chunk(candidate_set, min_support, input_csp_graph.value, input_graph_edges.value,
+                                      support_measure, exact_frequency, matching_plans))
     else:
         new_frequent_subgraphs = new_frequent_subgraphs.append(
-            evaluate_candidates_chunk(candidate_set, min_support, input_csp_graph, input_graph_edges))
+            evaluate_candidates_chunk(candidate_set, min_support, input_csp_graph, input_graph_edges,
+                                      support_measure, exact_frequency, matching_plans))
 
     return new_frequent_subgraphs
 
 
 def evaluate_candidates_chunk(candidates_chunk: pd.DataFrame, min_support: int,
-                              input_csp_graph: pd.DataFrame, input_graph_edges: pd.DataFrame) -> pd.DataFrame:
+                              input_csp_graph: CSPGraph,
+                              input_graph_edges: Union[pd.DataFrame, EdgeIndex],
+                              support_measure: str = 'first_edge', exact_frequency: bool = True,
+                              matching_plans: dict = None) -> pd.DataFrame:
     """Method to evaluate if graphs of a given set are frequent or not
 
     :param pd.DataFrame candidates_chunk: The set of candidates which one want to evaluate
     :param int min_support: The user defined min_support the candidates have to meet
-    :param pd.DataFrame input_csp_graph: The csp graph of the input graph
-    :param pd.DataFrame input_graph_edges: The set of all edges of the input graph
+    :param CSPGraph input_csp_graph: The csp graph of the input graph
+    :param pd.DataFrame input_graph_edges: The set of all edges of the input graph (or its EdgeIndex)
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :param bool exact_frequency: Count the exact frequencies (True) or stop the matching of a candidate once it meets
+        the min_support (False, see 'calculate_frequency')
+    :param dict matching_plans: The cache of the matching plans (see 'get_matching_plan')
     :return: The set of all frequent subgraphs
     :rtype: pd.DataFrame
     """
-    new_frequent_subgraphs = pd.DataFrame(columns=['graph', 'size', 'frequency'])
+    # the rows of the frequent subgraphs (canonical code -> graph, size, frequency), the DataFrame is built once
+    new_frequent_subgraphs = {}
     for i in range(0, len(candidates_chunk)):
         # get the 'current_candidate' out of 'candidate_chunk'
-        current_candidate: Graph = candidates_chunk.iloc[i]['graph']
+        current_candidate: Pattern = candidates_chunk.iloc[i]['graph']
 
         # calculate the frequency of the current candidate
-        current_candidate_frequency: int = calculate_frequency(current_candidate, input_csp_graph, input_graph_edges)
+        current_candidate_frequency: int = calculate_frequency(current_candidate, input_csp_graph, input_graph_edges,
+                                                               min_support, support_measure, exact_frequency,
+                                                               matching_plans)
 
         # check if 'current_candidate_frequency' is above 'min_support'
         if current_candidate_frequency >= min_support:
@@ -60,209 +85,120 @@ def evaluate_candidates_chunk(candidates_chunk: pd.DataFrame, min_support: int,
             # get the size of 'current_candidate'
             size: int = current_candidate.size
             # append 'current_candidate' to 'new_frequent_subgraphs'
-            new_frequent_subgraphs.at[current_candidate_canonical_code] = [current_candidate, size,
-                                                                            current_candidate_frequency]
-    return new_frequent_subgraphs
+            new_frequent_subgraphs[current_candidate_canonical_code] = [current_candidate, size,
+                                                                        current_candidate_frequency]
+        else:
+            # the instances of an infrequent candidate are never extended -> release them
+            current_candidate.instances = np.empty((0, 0), dtype=np.int32)
+    return pd.DataFrame.from_dict(new_frequent_subgraphs, orient='index', columns=['graph', 'size', 'frequency'])
+
+
+def release_instances(subgraphs: pd.DataFrame) -> None:
+    """Method to release the instances of frequent subgraphs, once all of their children are evaluated. The children
+    reference the instance matrix of their parent (see 'Pattern.extend') and every evaluation builds a new matrix, so
+    the matrix is freed as soon as neither the parent nor a child references it.
+
+    :param pd.DataFrame subgraphs: The frequent subgraphs
+    :return:
+    """
+    for subgraph in subgraphs['graph']:
+        subgraph.instances = np.empty((0, 0), dtype=np.int32)
 
 
-def calculate_frequency(candidate_graph: Graph, input_csp_graph: pd.DataFrame, input_graph_edges: pd.DataFrame) -> int:
+def calculate_frequency(candidate_graph: Pattern, input_csp_graph: CSPGraph,
+                        input_graph_edges: Union[pd.DataFrame, EdgeIndex], min_support: int = None,
+                        support_measure: str = 'first_edge', exact_frequency: bool = True,
+                        matching_plans: dict = None) -> int:
     """Method to calculate the frequency of a single candidate in an input graph.
 
-    :param Graph candidate_graph: The graph object of the candidate
-    :param pd.DataFrame input_csp_graph: The csp graph of the input graph
-    :param pd.DataFrame input_graph_edges: The set of all edges of the input graph
+    If 'exact_frequency' is False, the matching stops as soon as the instances found so far meet 'min_support'. The
+    returned frequency of a frequent candidate is then only a lower bound and its instances are perhaps incomplete.
+    The children still extend these instances (every extension is an instance of the child), but if the extensions
+    don't meet the min_support, the child is matched again from scratch.
+
+    With the MNI support measure the size of the (arc consistent) domain of a candidate node is an upper bound of its
+    number of images: if a domain is smaller than 'min_support', the candidate is rejected without matching its
+    instances and this upper bound is returned.
+
+    :param Pattern candidate_graph: The pattern object of the candidate
+    :param CSPGraph input_csp_graph: The csp graph of the input graph
+    :param pd.DataFrame input_graph_edges: The set of all edges of the input graph (or its EdgeIndex)
+    :param int min_support: The minimum support the candidate has to meet (optionally, enables the early rejection)
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :param bool exact_frequency: Count the exact frequency (True) or stop once the min_support is met (False)
+    :param dict matching_plans: The cache of the matching plans (see 'get_matching_plan')
     :return: The frequency of the candidate
     :rtype: int
     """
-    # initialize the potential occurrences and final instances of the candidate_graph
+    # initialize the frequency of the candidate_graph
     frequency = 0
-    valid_instances = []
+
+    # the instances are matched with the edge index of the input graph
+    if isinstance(input_graph_edges, EdgeIndex):
+        edge_index = input_graph_edges
+    else:
+        edge_index = EdgeIndex(input_graph_edges)
 
     # get the potential assignments of all nodes of the candidate to the nodes of the input graph
-    potential_assignments: dict[list] = compute_potential_assigments(candidate_graph.csp_graph,
+    potential_assignments: dict[list] = compute_potential_assigments(candidate_graph.labels,
+                                                                     candidate_graph.edge_list,
                                                                      candidate_graph.instances,
-                                                                     candidate_graph.new_added_edge, input_csp_graph)
+                                                                     candidate_graph.new_added_edge, input_csp_graph,
+                                                                     edge_index)
     # if potential_assignments is empty then return 0-frequency
     if len(potential_assignments) == 0:
         return frequency
-
-    potential_instances: list[dict] = find_valid_instances(potential_assignments, candidate_graph.edges,
-                                                           candidate_graph.instances, input_graph_edges)
-    # if valid_assignments is empty then return 0-frequency
-    if len(potential_instances) == 0:
-        return frequency
-
-    # iterate over all lists in 'valid_instances'
-    for i in range(len(potential_instances)):
-        graph_size_nodes: int = len(candidate_graph.nodes)
-        # if current instance contains the same number of valid assignments as the candidate contains nodes
-        # -> current instance must be a valid instance
-        if graph_size_nodes == len(potential_instances[i]):
-            # increase frequency of candidate with 1
-            frequency += 1
-            # append current instance to 'valid_instances'
-            valid_instances.append(potential_instances[i])
+    # if a node has no potential assignment, then there can't be an instance with all nodes -> 0-frequency
+    for domain in potential_assignments.values():
+        if not domain.any():
+            return frequency
+
+    # MNI: a candidate node can't have more images than potential assignments
+    if support_measure == 'mni' and min_support is not None:
+        upper_bound = min(int(domain.sum()) for domain in potential_assignments.values())
+        if upper_bound < min_support:
+            return upper_bound
+
+    # get the (cached) join order of the candidate nodes
+    fixed_nodes = get_fixed_nodes(candidate_graph.nodes_ids, candidate_graph.instances,
+                                  candidate_graph.new_added_edge)
+    matching_plan = get_matching_plan(candidate_graph, fixed_nodes, input_csp_graph, matching_plans)
+
+    # find all instances of the candidate with the matcher (vectorized extension joins), optionally only until they
+    # meet the min_support
+    if exact_frequency or min_support is None:
+        valid_instances: np.ndarray = match_instances(potential_assignments, candidate_graph.edge_list, input_csp_graph,
+                                                      edge_index, candidate_graph.instances,
+                                                      candidate_graph.new_added_edge, matching_plan)
+        complete = True
+    else:
+        valid_instances, complete = match_instances_until_support(potential_assignments, candidate_graph.edge_list,
+                                                                  input_csp_graph, edge_index, min_support,
+                                                                  candidate_graph.instances,
+                                                                  candidate_graph.new_added_edge, matching_plan,
+                                                                  support_measure, candidate_graph.first_edge_nodes)
+
+    # the frequency is computed with the support measure, by default it is the number of distinct assignments of the
+    # first edge of the canonical code, which can be extended to an instance (automorphic instances and further
+    # extensions of the same assignment are not counted twice)
+    frequency = count_support(valid_instances, candidate_graph.first_edge_nodes, support_measure)
+
+    # the extensions of incomplete inherited instances don't meet the min_support -> match the candidate from scratch
+    if not candidate_graph.complete_instances and min_support is not None and frequency < min_support:
+        candidate_graph.instances = np.empty((0, 0), dtype=np.int32)
+        candidate_graph.complete_instances = True
+        return calculate_frequency(candidate_graph, input_csp_graph, edge_index, min_support, support_measure,
+                                   exact_frequency, matching_plans)
 
     candidate_graph.instances = valid_instances
+    candidate_graph.complete_instances = candidate_graph.complete_instances and complete
 
     return frequency
 
 
-def find_valid_instances(potential_assignments: dict, candidate_edges: pd.DataFrame, candidate_instances: pd.DataFrame,
-                         input_graph_edges: pd.DataFrame) -> list:
-    """Method to compute valid instances of a candidate in the input graph.
-
-    :param dict potential_assignments: A dictionary with potential assignments to partner nodes in input graph
-    :param pd.DataFrame candidate_edges: The set of all edges of the candidate
-    :param pd.DataFrame input_graph_edges: The set of all edges of the input graph
-    :return: A list of valid assignments for all nodes
-    """
-    valid_instances = []
-    not_visited_nodes = list(potential_assignments.keys())
-    assigment_iterator_list = potential_assignments
-
-    # Dynamic evaluation: if the candidate inherits the valid instances from its parent, then we only have to compute
-    # valid assignments for the nodes, which are connected by the 'new_added_edge'
-    if len(candidate_instances) > 0:
-        # set the 'valid_instances' to inherited instances of the parent graph
-        valid_instances = candidate_instances
-        # get the later added node of the nodes which are connected by the newly added edge
-        assigment_iterator_list = sorted(potential_assignments)
-        new_node = assigment_iterator_list[len(assigment_iterator_list) - 1]
-        # iterate over all instances to delete the later added node
-        for instance in valid_instances:
-            if new_node in list(instance.keys()):
-                del (instance[new_node])
-            # if later added node not in an instance, then it have to be a newly added node
-            # -> wen can't delete the node, because it can't be in any instance of the parent graph
-            else:
-                break
-
-    # iterate through all nodes in 'potential_assignments'
-    for node1 in assigment_iterator_list:
-        # remove 'node1' from 'not_visited_nodes'
-        not_visited_nodes.remove(node1)
-
-        # iterate through all nodes in 'not_visited_nodes'
-        for node2 in not_visited_nodes:
-            # find valid instances for a pair of (node1, node2)
-            new_instances: list[dict] = find_partner_nodes(node1, potential_assignments[node1], node2,
-                                                           potential_assignments[node2],
-                                                           candidate_edges, input_graph_edges)
-            # if 'valid_instances' is empty -> overwrite it with 'new_instances'
-            if len(valid_instances) == 0:
-                valid_instances: list[dict] = new_instances.copy()
-                continue
-
-            # iterate over all instances in 'new_instances' (this are only the instances for node1 and node2 pairs)
-            for i in range(len(new_instances)):
-                # get current instance
-                new_instance: dict = new_instances[i]
-                # iterate over already identified instances
-                for j in range(len(valid_instances)):
-                    # get the assignment for 'node2'
-                    new_node_assignment: int = new_instance[node2].copy()
-                    # if 'new_node_assignment' is already in current instance of 'valid_instances'
-                    # -> continue with next instance in 'valid_instances'
-                    if new_node_assignment in list(valid_instances[j].values()):
-                        # Info: one node of the input graph cannot be an assignment for two different nodes
-                        # of the same candidate instance
-                        continue
-                    # if 'node2' is already in current instance of 'valid_instances'
-                    # -> continue with next instance in 'valid_instances'
-                    elif node2 in list(valid_instances[j].keys()):
-                        continue
-
-                    parent_node_instance = new_instance[node1]
-                    # check if the instance of the parent node (node1) is already in current instance of 'valid_instances'
-                    # Info: if that's not the case, there cant be an edge between the already identified assignments
-                    # in ''valid_instances' and the new assignment -> an istance has to be a connected graph
-                    if parent_node_instance in list(valid_instances[j].values()):
-                        # update the current valid instance with the 'new_node_assignment' of 'node2'
-                        valid_instances[j].update({node2.copy(): new_node_assignment})
-                        # continue with next 'new_instance' (leave inner loop and continue in outer loop)
-                        break
-
-    return valid_instances
-
-
-def find_partner_nodes(candidate_node1: int, candidate_node1_assignments: list, candidate_node2: int,
-                       candidate_node2_assignments: list, candidate_edges: pd.DataFrame,
-                       input_graph_edges: pd.DataFrame) -> list:
-    """Method to find valid assignments for two candidate nodes which are having an edge between them.
-
-    :param int candidate_node1: The id of node1 (candidate node)
-    :param list candidate_node1_assignments: All assignments for node1 (ids of input graph nodes)
-    :param int candidate_node2: The id of node2 (candidate node)
-    :param list candidate_node2_assignments: All assignments for node2 (ids of input graph nodes)
-    :param pd.DataFrame candidate_edges: The set with all edges of the candidate
-    :param pd.DataFrame input_graph_edges: The set with all edges of the input graph
-    :return: List with valid assignments (dict) for both nodes
-    :rtype: list[dict{candidate_node_id: assignment_id]
-    """
-    valid_instances = []
-    # get all foward edges between 'node1' and 'node2'
-    candidates_forward_edges: pd.DataFrame = candidate_edges[
-        (candidate_edges['source'] == candidate_node1) & (candidate_edges['target'] == candidate_node2)]
-    candidates_forward_edges_labels: list = sorted(list(candidates_forward_edges.label.unique()))
-
-    # get all foward edges between 'node1' and 'node2'
-    candidates_backward_edges: pd.DataFrame = candidate_edges[
-        (candidate_edges['source'] == candidate_node2) & (candidate_edges['target'] == candidate_node1)]
-    candidates_backward_edges_labels: list = sorted(list(candidates_backward_edges.label.unique()))
-
-    # if there is no edge between 'node1' and 'node2' there can't be an valid instance for both together
-    if len(candidates_forward_edges) == 0 and len(candidates_backward_edges) == 0:
-        return valid_instances
-
-    # iterate over all valid potential_assignments of node1
-    for i in range(len(candidate_node1_assignments)):
-        partner_node1 = candidate_node1_assignments[i]
-
-        # iterate over all valid potential_assignments of node2
-        for j in range(0, len(candidate_node2_assignments)):
-            partner_node2 = candidate_node2_assignments[j]
-
-            # if there is a forward edge between 'node1' and 'node2'
-            if len(candidates_forward_edges) > 0:
-                # compute all forward edges between the assignments of 'node1' and 'node2'
-                partner_forward_edges = input_graph_edges[
-                    (input_graph_edges['source'] == partner_node1) & (input_graph_edges['target'] == partner_node2)]
-                partner_forward_edges_labels = sorted(list(partner_forward_edges.label.unique()))
-
-                # compare the labels of forward candidate edges and the forward input graph edges
-                # of node1 and node2 and there assignments
-                # if label are unequal -> both assignments are not connected in the input graph
-                # -> those they can't be part of the same instance
-                if partner_forward_edges_labels != candidates_forward_edges_labels:
-                    # continue with next assignment pair
-                    continue
-            # if there is a backward edge between 'node1' and 'node2'
-            if len(candidates_backward_edges) > 0:
-                # compute all backward edges between the assignments of 'node1' and 'node2'
-                partner_backward_edges = input_graph_edges[
-                    (input_graph_edges['source'] == partner_node2) & (input_graph_edges['target'] == partner_node1)]
-                partner_backward_edges_labels = sorted(list(partner_backward_edges.label.unique()))
-
-                # compare the labels of forward candidate edges and the forward input graph edges
-                # of node1 and node2 and there assignments
-                # if label are unequal -> both assignments are not connected in the input graph
-                # -> those they can't be part of the same instance
-                if partner_backward_edges_labels != candidates_backward_edges_labels:
-                    # continue with next assignment pair
-                    continue
-
-            # build current instance with the current assignments for 'node1' and 'node2'
-            instance = {candidate_node1: partner_node1,
-                        candidate_node2: partner_node2}
-            # append current instance to valid_instances
-            valid_instances.append(instance)
-
-    return valid_instances
-
-
-def compute_potential_assigments(candidate_csp_graph: pd.DataFrame, candidate_instances: pd.DataFrame,
-                                 new_added_edge: dict, input_csp_graph: pd.DataFrame) -> dict:
+def compute_potential_assigments(candidate_labels: tuple, candidate_edges: tuple, candidate_instances: np.ndarray,
+                                 new_added_edge: dict, input_csp_graph: CSPGraph,
+                                 input_graph_edges: Union[pd.DataFrame, EdgeIndex] = None) -> dict:
     """Method to compute potential assignments for all nodes of the candidate in the input graph.
     An input graph node is called potential assigment to a candidate node, iff the node labels are equal,
     in- and outdegree of input graph node are greater equals in- and outdegree of the candidate node
@@ -271,65 +207,176 @@ def compute_potential_assigments(candidate_csp_graph: pd.DataFrame, candidate_in
     Dynamic programming approach: if the candidate inherits the valid instances from its parent, then the method only
     computes potential assigments for the nodes which are conncected by the newly added edge.
 
-    :param pd.DataFrame candidate_csp_graph: The csp_graph representation of the candidate graph
-    :param pd.DataFrame candidate_instances: Instances of the nodes of the candidate
-    :param pd.DataFrame input_csp_graph: The csp_graph representation of the input graph
-    :return: A dict which contains a list (value) of potential assignments for every candidate node (key)
-    :rtype: dict[candidate_node_id: [assignment_ids]]
+    If the edge index of the input graph is given, the domains are afterwards pruned to arc consistency
+    (see 'prune_domains').
+
+    :param tuple candidate_labels: The labels of the candidate nodes (position = node id)
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param np.ndarray candidate_instances: Instances of the nodes of the candidate (inherited from the parent)
+    :param dict new_added_edge: The edge which was added to the parent graph
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph (CSR format)
+    :param EdgeIndex input_graph_edges: The edge index of the input graph (optionally, enables the pruning)
+    :return: A dict which contains the domain (bitset over the dense node ids of the input graph) of potential
+        assignments for every candidate node (key)
+    :rtype: dict[candidate_node_id: np.ndarray[bool]]
     """
     potential_assignments = {}
 
     # Dynamic evaluation: if the candidate inherits the valid instances from its parent, then we only have to compute
     # new potential assignments for the nodes, which are connected by the 'new_added_edge'
     if len(candidate_instances) == 0:
-        candidate_node_ids = list(candidate_csp_graph.index)
+        candidate_node_ids = list(range(len(candidate_labels)))
     else:
-        candidate_node_ids = [new_added_edge['parent_node_id'], new_added_edge['child_node_id']]
+        candidate_node_ids = [int(new_added_edge['parent_node_id']), int(new_added_edge['child_node_id'])]
+
+    # the neighbour lists of the candidate nodes are computed out of the edges of the candidate (see
+    # 'compute_pattern_neighbours'), the in- and outdegree are their lengths
+    ingoing_neighbours, outgoing_neighbours = compute_pattern_neighbours(candidate_labels, candidate_edges)
 
     # iterate over all candidate nodes in 'candidate_node_ids' to compute their potential_assignments
     for node_index in candidate_node_ids:
-        # get id, label, in- and outdegree of the candidate_node
-        candidate_node = candidate_csp_graph.loc[node_index]
-        candidate_node_label = candidate_csp_graph.loc[candidate_node.name]['label']
-        candidate_node_indegree = candidate_csp_graph.loc[candidate_node.name]['indegree']
-        candidate_node_outdegree = candidate_csp_graph.loc[candidate_node.name]['outdegree']
-
-        # initialize empty list for potential assignments for candidate_node in the input graph
-        candidate_node_potential_assignments_ids = []
-
-        # compute all nodes of input graph which have the same label and in-/outdegree as candidate_node
-        potential_assignment_nodes: pd.DataFrame = input_csp_graph[
-            (input_csp_graph['indegree'] >= candidate_node_indegree) &
-            (input_csp_graph['outdegree'] >= candidate_node_outdegree) &
-            (input_csp_graph['label'] == candidate_node_label)]
-
-        # iterate over all potential_assignments (nodes of input graph)
-        for j in range(len(potential_assignment_nodes)):
-            # get the ingoing and outgoing neighbour lists for candidate and input graph node
-            potential_partner_node_ingoing_neighbours: list[list] = potential_assignment_nodes.iloc[j][
-                'ingoing_neighbours'].copy()
-            potential_partner_node_outgoing_neighbours: list[list] = potential_assignment_nodes.iloc[j][
-                'outgoing_neighbours'].copy()
-            candidate_node_ingoing_neighbours: list[list] = candidate_csp_graph.loc[candidate_node.name][
-                'ingoing_neighbours'].copy()
-            candidate_node_outgoing_neighbours: list[list] = candidate_csp_graph.loc[candidate_node.name][
-                'outgoing_neighbours'].copy()
-
-            # check the constraint that the ingoing and outgoing neighbours of assigment are super sets
-            # of the ingoing and outgoing neighbours of candidate_node
-            if is_subset(candidate_node_ingoing_neighbours, potential_partner_node_ingoing_neighbours):
-                if is_subset(candidate_node_outgoing_neighbours, potential_partner_node_outgoing_neighbours):
-                    # append id of potential_assigment to candidate_node_partner_node_ids
-                    candidate_node_potential_assignments_ids.append(potential_assignment_nodes.iloc[j].name)
-
-        potential_assignments.update({candidate_node.name: candidate_node_potential_assignments_ids})
+        # Info: 'is_subset' only pops from the neighbour lists of the input graph node, which are freshly build
+        # out of the CSR arrays -> no copy needed
+        candidate_node_domain = compute_domain(candidate_labels[node_index], len(ingoing_neighbours[node_index]),
+                                               len(outgoing_neighbours[node_index]), ingoing_neighbours[node_index],
+                                               outgoing_neighbours[node_index], input_csp_graph)
+        potential_assignments.update({node_index: candidate_node_domain})
 
     # else:
     #     new_nodes = [new_added_edge['parent_node_id'], new_added_edge['child_node_id']]
 
+    if isinstance(input_graph_edges, EdgeIndex):
+        prune_domains(potential_assignments, candidate_edges, input_csp_graph, input_graph_edges)
+
     return potential_assignments
 
 
+def compute_domain(candidate_node_label: int, candidate_node_indegree: int, candidate_node_outdegree: int,
+                   candidate_node_ingoing_neighbours: list, candidate_node_outgoing_neighbours: list,
+                   input_csp_graph: CSPGraph) -> np.ndarray:
+    """Method to compute the potential assignments of a single candidate node, given by its label, degrees and
+    neighbour lists (see 'compute_potential_assigments').
+
+    :param int candidate_node_label: The label of the candidate node
+    :param int candidate_node_indegree: The indegree of the candidate node
+    :param int candidate_node_outdegree: The outdegree of the candidate node
+    :param list candidate_node_ingoing_neighbours: The ingoing neighbours [edge label, node label, node id]
+    :param list candidate_node_outgoing_neighbours: The outgoing neighbours [edge label, node label, node id]
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph (CSR format)
+    :return: The domain (bitset over the dense node ids of the input graph) of the candidate node
+    :rtype: np.ndarray[bool]
+    """
+    # initialize empty list for potential assignments for candidate_node in the input graph
+    candidate_node_potential_assignments_ids = []
+
+    # compute the positions of all nodes of input graph which have the same label and in-/outdegree as
+    # candidate_node (lookup in the label-partitioned domain index of the input graph)
+    potential_assignment_positions: np.ndarray = input_csp_graph.domain(candidate_node_label,
+                                                                        candidate_node_indegree,
+                                                                        candidate_node_outdegree)
+
+    # check the constraint that the ingoing and outgoing neighbours of assigment are super sets
+    # of the ingoing and outgoing neighbours of candidate_node
+    if input_csp_graph.signature_index is not None:
+        # compare the neighbour-label counts of all potential assignments at once
+        potential_assignment_positions = input_csp_graph.filter_by_signature(potential_assignment_positions,
+                                                                             candidate_node_ingoing_neighbours,
+                                                                             candidate_node_outgoing_neighbours)
+        candidate_node_potential_assignments_ids = np.asarray(
+            input_csp_graph.node_ids[potential_assignment_positions]).tolist()
+    else:
+        # iterate over all potential_assignments (nodes of input graph)
+        for position in potential_assignment_positions:
+            if is_subset(candidate_node_ingoing_neighbours, input_csp_graph.ingoing_neighbours(position)):
+                if is_subset(candidate_node_outgoing_neighbours, input_csp_graph.outgoing_neighbours(position)):
+                    # append id of potential_assigment to candidate_node_partner_node_ids
+                    candidate_node_potential_assignments_ids.append(int(input_csp_graph.node_ids[position]))
+
+    # store the domain as bitset over the dense node ids of the input graph
+    candidate_node_domain = np.zeros(input_csp_graph.id_space, dtype=bool)
+    candidate_node_domain[candidate_node_potential_assignments_ids] = True
+    return candidate_node_domain
+
+
+def prune_domains(potential_assignments: dict, candidate_edges: tuple, input_csp_graph: CSPGraph,
+                  edge_index: EdgeIndex) -> None:
+    """Method to prune the domains of the candidate nodes to arc consistency (AC-3). An assignment is removed from the
+    domain of a candidate node, if it has no supporting assignment in the domain of an adjacent candidate node, i.e. no
+    assignment, which is connected with exactly the labels of the candidate edges between both nodes (the same
+    constraint as in 'match_instances'). The arcs of a node are revisited, whenever the domain of an adjacent node
+    shrinks. The domains are pruned in place (an empty domain stops the pruning).
+
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return:
+    """
+    # collect the labels of the candidate edges between all pairs of candidate nodes with a domain
+    edge_labels = {}
+    for source, target, edge_label in candidate_edges:
+        if int(source) in potential_assignments and int(target) in potential_assignments:
+            edge_labels.setdefault((int(source), int(target)), set()).add(int(edge_label))
+
+    # every arc (node, neighbour) is constrained by the forward and backward label set of the pair
+    arcs = {}
+    for node1, node2 in edge_labels:
+        for node, neighbour in [(node1, node2), (node2, node1)]:
+            arcs[(node, neighbour)] = [sorted(edge_labels.get((node, neighbour), [])),
+                                       sorted(edge_labels.get((neighbour, node), []))]
+
+    queue = list(arcs)
+    while len(queue) > 0:
+        node, neighbour = queue.pop(0)
+        forward_labels, backward_labels = arcs[(node, neighbour)]
+
+        if revise_domain(potential_assignments[node], potential_assignments[neighbour], forward_labels,
+                         backward_labels, input_csp_graph, edge_index):
+            if not potential_assignments[node].any():
+                return
+            # the arcs of the other neighbours to the pruned node have to be checked again
+            for other_node, other_neighbour in arcs:
+                if other_neighbour == node and other_node != neighbour and (other_node, node) not in queue:
+                    queue.append((other_node, node))
+
+
+def revise_domain(domain: np.ndarray, neighbour_domain: np.ndarray, forward_labels: list, backward_labels: list,
+                  input_csp_graph: CSPGraph, edge_index: EdgeIndex) -> bool:
+    """Method to remove all assignments without support in the neighbour domain out of a domain. The edges of all
+    assignments are gathered out of the CSR arrays at once and checked vectorized with the edge index.
+
+    :param np.ndarray domain: The domain (bitset) to revise (in place)
+    :param np.ndarray neighbour_domain: The domain (bitset) of the adjacent candidate node
+    :param list forward_labels: The labels of the candidate edges from the node to its neighbour
+    :param list backward_labels: The labels of the candidate edges from the neighbour to the node
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return: True if assignments were removed, else False
+    :rtype: bool
+    """
+    assignment_ids = np.flatnonzero(domain)
+
+    # get all neighbours of the assignments in the direction of a candidate edge
+    positions, neighbour_ids = input_csp_graph.neighbour_pairs(input_csp_graph.positions(assignment_ids),
+                                                               outgoing=len(forward_labels) > 0)
+    node_ids = np.asarray(input_csp_graph.node_ids[positions], dtype=np.int64)
+
+    # a neighbour supports an assignment, if it is in the neighbour domain and the label sets are equal
+    supported = neighbour_domain[neighbour_ids]
+    if len(forward_labels) > 0:
+        supported &= edge_index.lookup(node_ids, neighbour_ids) == edge_index.label_set_id(forward_labels)
+    if len(backward_labels) > 0:
+        supported &= edge_index.lookup(neighbour_ids, node_ids) == edge_index.label_set_id(backward_labels)
+
+    supported_domain = np.zeros(len(domain), dtype=bool)
+    supported_domain[node_ids[supported]] = True
+    if np.array_equal(domain, supported_domain & domain):
+        return False
+
+    domain &= supported_domain
+    return True
+
+
 def is_subset(list1: list, list2: list) -> bool:
     """Method to check if a list of lists is a subset of another list of lists.
 
@@ -0,0 +1,412 @@
+import numpy as np
+from distributed.pasigram.model.csp_graph import CSPGraph
+from distributed.pasigram.model.edge_index import EdgeIndex
+
+# number of partial instances which are extended at first, if the matching stops once the min_support is reached
+# (the chunks are doubled after every step)
+EARLY_EXIT_CHUNK_SIZE = 256
+
+
+def match_instances(potential_assignments: dict, candidate_edges: tuple, input_csp_graph: CSPGraph,
+                    edge_index: EdgeIndex, candidate_instances: np.ndarray = None, new_added_edge: dict = None,
+                    order: list = None) -> np.ndarray:
+    """Method to find all instances (injective embeddings) of a candidate in the input graph. The instances are stored
+    as int32 matrix (row = instance, column = candidate node in the order of the node ids), which is built by one
+    vectorized extension join per candidate node (see 'extend_embeddings'). The candidate nodes are joined in a
+    connectivity-aware order (see 'compute_matching_order'): the assignments of a node are the neighbours of the
+    assignment of an already bound adjacent node, which are in the domain of the node, not used by another node of the
+    instance and connected with exactly the labels of the candidate edges to the assignments of all bound adjacent
+    nodes (the same constraint as in 'prune_domains').
+
+    Dynamic evaluation: if the candidate inherits the instances of its parent, then they are used as partial
+    instances, which are checked against the 'new_added_edge' and extended by the nodes which are not in the parent.
+
+    The order of the nodes can be given by a matching plan (see 'planner.get_matching_plan'), which has to start with
+    the fixed nodes (see 'get_fixed_nodes'), else it is computed out of the domain sizes.
+
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param np.ndarray candidate_instances: The instances of the parent graph (optionally)
+    :param dict new_added_edge: The edge which was added to the parent graph (optionally)
+    :param list order: The matching order (candidate node, adjacent nodes which are assigned before) (optionally)
+    :return: The instances in lexicographic order (row = instance, column = candidate node)
+    :rtype: np.ndarray
+    """
+    embeddings, bound, joins, constraints = prepare_joins(potential_assignments, candidate_edges, edge_index,
+                                                          candidate_instances, new_added_edge, order)
+
+    # join the nodes one after another (the columns of 'embeddings' are in the order of 'bound')
+    embeddings, bound = join_nodes(embeddings, bound, joins, potential_assignments, constraints, input_csp_graph,
+                                   edge_index)
+    return sort_instances(embeddings, bound)
+
+
+def match_instances_until_support(potential_assignments: dict, candidate_edges: tuple,
+                                  input_csp_graph: CSPGraph, edge_index: EdgeIndex, min_support: int,
+                                  candidate_instances: np.ndarray = None, new_added_edge: dict = None,
+                                  order: list = None, support_measure: str = 'first_edge',
+                                  first_edge_nodes: list = None) -> list:
+    """Method to find the instances of a candidate in the input graph until they meet the min_support (early exit).
+    The partial instances are extended in chunks (see 'join_until_support') and the matching stops as soon as the
+    instances found so far meet the min_support, so the support of the returned instances is only a lower bound of the
+    support of the candidate. The instances are complete, if the matching didn't stop early.
+
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param int min_support: The support the instances have to meet
+    :param np.ndarray candidate_instances: The instances of the parent graph (optionally)
+    :param dict new_added_edge: The edge which was added to the parent graph (optionally)
+    :param list order: The matching order (candidate node, adjacent nodes which are assigned before) (optionally)
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :param list first_edge_nodes: The nodes of the canonical first edge (see 'Pattern.first_edge_nodes'), optionally
+        (by default the nodes of the first edge of 'candidate_edges')
+    :return: The instances in lexicographic order and the flag if they are complete
+    :rtype: list[np.ndarray, bool]
+    """
+    embeddings, bound, joins, constraints = prepare_joins(potential_assignments, candidate_edges, edge_index,
+                                                          candidate_instances, new_added_edge, order)
+
+    if first_edge_nodes is None:
+        first_edge_nodes = [int(candidate_edges[0][0]), int(candidate_edges[0][1])]
+
+    embeddings, bound, complete = join_until_support(embeddings, bound, joins, potential_assignments, constraints,
+                                                     input_csp_graph, edge_index, first_edge_nodes, min_support,
+                                                     support_measure)
+    return [sort_instances(embeddings, bound), complete]
+
+
+def prepare_joins(potential_assignments: dict, candidate_edges: tuple, edge_index: EdgeIndex,
+                  candidate_instances: np.ndarray = None, new_added_edge: dict = None, order: list = None) -> list:
+    """Method to compute the partial instances where the joins start from and the candidate nodes which have to be
+    joined (see 'match_instances').
+
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param np.ndarray candidate_instances: The instances of the parent graph (optionally)
+    :param dict new_added_edge: The edge which was added to the parent graph (optionally)
+    :param list order: The matching order (candidate node, adjacent nodes which are assigned before) (optionally)
+    :return: The partial instances, the ids of the bound candidate nodes, the nodes to join and the pair constraints
+    :rtype: list[np.ndarray, list, list, dict]
+    """
+    constraints = compute_pair_constraints(candidate_edges, edge_index)
+    candidate_nodes = sorted(set(potential_assignments) | {node for node, _ in constraints})
+
+    # the partial instances where the joins start from (one empty instance, if there are no inherited instances)
+    fixed_nodes = get_fixed_nodes(candidate_nodes, candidate_instances, new_added_edge)
+    if len(fixed_nodes) > 0:
+        embeddings = filter_partial_instances(candidate_instances, fixed_nodes, potential_assignments, constraints,
+                                              new_added_edge, edge_index)
+    else:
+        embeddings = np.empty((1, 0), dtype=np.int32)
+
+    if order is None:
+        order = compute_matching_order(candidate_nodes, potential_assignments, constraints, fixed_nodes)
+
+    return [embeddings, list(fixed_nodes), order[len(fixed_nodes):], constraints]
+
+
+def sort_instances(embeddings: np.ndarray, bound: list) -> np.ndarray:
+    """Method to sort the columns of the instances by the candidate node ids and the rows lexicographic.
+
+    :param np.ndarray embeddings: The instances (row = instance, column = bound node)
+    :param list bound: The ids of the candidate nodes (in the order of the columns)
+    :return: The instances in lexicographic order (row = instance, column = candidate node)
+    :rtype: np.ndarray
+    """
+    embeddings = embeddings[:, np.argsort(bound)]
+    return embeddings[np.lexsort(embeddings.T[::-1])] if len(embeddings) > 0 else embeddings
+
+
+def join_nodes(embeddings: np.ndarray, bound: list, joins: list, potential_assignments: dict, constraints: dict,
+               input_csp_graph: CSPGraph, edge_index: EdgeIndex) -> list:
+    """Method to extend partial instances by the given candidate nodes, one join after another (see
+    'extend_embeddings').
+
+    :param np.ndarray embeddings: The partial instances (row = instance, column = bound node)
+    :param list bound: The ids of the bound candidate nodes (in the order of the columns)
+    :param list joins: The candidate nodes to join (candidate node, adjacent nodes which are assigned before)
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param dict constraints: The label set ids of the edges between adjacent candidate nodes
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return: The extended instances and the ids of the candidate nodes in the order of their columns
+    :rtype: list[np.ndarray, list]
+    """
+    bound = list(bound)
+    for node, bound_neighbours in joins:
+        if len(embeddings) > 0:
+            embeddings = extend_embeddings(embeddings, bound, node, bound_neighbours, potential_assignments[node],
+                                           constraints, input_csp_graph, edge_index)
+        else:
+            # no partial instance is left -> only add the (empty) column of the node
+            embeddings = np.empty((0, len(bound) + 1), dtype=np.int32)
+        bound.append(node)
+    return [embeddings, bound]
+
+
+def join_until_support(embeddings: np.ndarray, bound: list, joins: list, potential_assignments: dict,
+                       constraints: dict, input_csp_graph: CSPGraph, edge_index: EdgeIndex,
+                       first_edge_nodes: list, min_support: int, support_measure: str = 'first_edge') -> list:
+    """Method to extend partial instances by the given candidate nodes until the instances meet the min_support. Every
+    instance is the extension of exactly one partial instance, so the partial instances are extended in chunks
+    (starting with 'EARLY_EXIT_CHUNK_SIZE' partial instances, doubled after every chunk) and the support of the
+    instances found so far is a lower bound of the support of the candidate.
+
+    :param np.ndarray embeddings: The partial instances (row = instance, column = bound node)
+    :param list bound: The ids of the bound candidate nodes (in the order of the columns)
+    :param list joins: The candidate nodes to join (candidate node, adjacent nodes which are assigned before)
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param dict constraints: The label set ids of the edges between adjacent candidate nodes
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :param list first_edge_nodes: The nodes of the canonical first edge of the candidate (see 'count_support')
+    :param int min_support: The support the instances have to meet
+    :param str support_measure: The support measure ('first_edge' or 'mni', see 'count_support')
+    :return: The (perhaps incomplete) instances, the ids of the candidate nodes in the order of their columns and the
+        flag if the instances are complete
+    :rtype: list[np.ndarray, list, bool]
+    """
+    # without fixed nodes the chunks are taken out of the assignments of the first node
+    if len(bound) == 0 and len(joins) > 0:
+        embeddings, bound = join_nodes(embeddings, bound, joins[:1], potential_assignments, constraints,
+                                       input_csp_graph, edge_index)
+        joins = joins[1:]
+    final_bound = list(bound) + [node for node, _ in joins]
+
+    instances = []
+    start, chunk_size = 0, EARLY_EXIT_CHUNK_SIZE
+    while start < len(embeddings):
+        chunk_instances, _ = join_nodes(embeddings[start:start + chunk_size], bound, joins, potential_assignments,
+                                        constraints, input_csp_graph, edge_index)
+        instances.append(chunk_instances)
+        start, chunk_size = start + chunk_size, 2 * chunk_size
+
+        # stop, if the instances found so far meet the min_support (the last chunk completes the instances anyway)
+        if start < len(embeddings) and count_support(np.concatenate(instances)[:, np.argsort(final_bound)],
+                                                     first_edge_nodes, support_measure) >= min_support:
+            break
+
+    if len(instances) == 0:
+        return [np.empty((0, len(final_bound)), dtype=np.int32), final_bound, True]
+    return [np.concatenate(instances), final_bound, start >= len(embeddings)]
+
+
+def get_fixed_nodes(candidate_nodes: list, candidate_instances: np.ndarray, new_added_edge: dict) -> list:
+    """Method to get the candidate nodes, which are assigned by the inherited instances of the parent graph (the
+    columns of the parent instances are the first nodes of the candidate, the new node has always the largest id).
+
+    :param list candidate_nodes: The ids of all candidate nodes
+    :param np.ndarray candidate_instances: The instances of the parent graph
+    :param dict new_added_edge: The edge which was added to the parent graph
+    :return: The ascending ids of the fixed nodes (empty if the instances aren't inherited)
+    :rtype: list[int]
+    """
+    if candidate_instances is None or len(candidate_instances) == 0 or new_added_edge is None:
+        return []
+    return sorted(candidate_nodes)[:np.shape(candidate_instances)[1]]
+
+
+def extend_embeddings(embeddings: np.ndarray, bound: list, node: int, bound_neighbours: list, domain: np.ndarray,
+                      constraints: dict, input_csp_graph: CSPGraph, edge_index: EdgeIndex) -> np.ndarray:
+    """Method to extend all partial instances by a candidate node with one vectorized join: the assignments of the
+    first bound neighbour are joined with their neighbours out of the CSR arrays, afterwards the pairs are filtered by
+    the domain of the node, the injectivity (the assignment isn't used by another node of the instance) and the label
+    sets of the edges to the assignments of all bound neighbours.
+
+    :param np.ndarray embeddings: The partial instances (row = instance, column = bound node)
+    :param list bound: The ids of the bound candidate nodes (in the order of the columns)
+    :param int node: The id of the candidate node to join
+    :param list bound_neighbours: The adjacent candidate nodes which are bound
+    :param np.ndarray domain: The domain (bitset) of the candidate node
+    :param dict constraints: The label set ids of the edges between adjacent candidate nodes
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return: The extended instances (the new node is the last column)
+    :rtype: np.ndarray
+    """
+    # the first node of a connected candidate can be assigned to every node of its domain
+    if len(bound_neighbours) == 0:
+        domain_assignments = np.flatnonzero(domain)
+        rows = np.repeat(np.arange(len(embeddings)), len(domain_assignments))
+        assignments = np.tile(domain_assignments, len(embeddings))
+    else:
+        # join the assignments of the first bound neighbour with their neighbours in the direction of a candidate edge
+        anchor = bound_neighbours[0]
+        outgoing = constraints[(anchor, node)][0] is not None
+        positions = input_csp_graph.positions(embeddings[:, bound.index(anchor)])
+        _, assignments = input_csp_graph.neighbour_pairs(positions, outgoing=outgoing)
+        degrees = input_csp_graph.outdegree if outgoing else input_csp_graph.indegree
+        rows = np.repeat(np.arange(len(embeddings)), degrees[positions])
+
+        # parallel edges lead to the same pair multiple times
+        pairs = np.unique(rows * np.int64(input_csp_graph.id_space) + assignments)
+        rows, assignments = pairs // input_csp_graph.id_space, pairs % input_csp_graph.id_space
+
+    valid = domain[assignments]
+    # injectivity: the assignment isn't used by another node of the same instance
+    if embeddings.shape[1] > 0:
+        valid &= ~np.any(embeddings[rows] == assignments[:, None], axis=1)
+    rows, assignments = rows[valid], assignments[valid]
+
+    # compare the label sets of the edges to the assignments of all bound adjacent nodes
+    for neighbour in bound_neighbours:
+        neighbour_assignments = embeddings[rows, bound.index(neighbour)]
+        forward_label_set_id, backward_label_set_id = constraints[(neighbour, node)]
+        valid = np.ones(len(assignments), dtype=bool)
+        if forward_label_set_id is not None:
+            valid &= edge_index.lookup(neighbour_assignments, assignments) == forward_label_set_id
+        if backward_label_set_id is not None:
+            valid &= edge_index.lookup(assignments, neighbour_assignments) == backward_label_set_id
+        rows, assignments = rows[valid], assignments[valid]
+
+    return np.column_stack((embeddings[rows], assignments)).astype(np.int32)
+
+
+def compute_pair_constraints(candidate_edges: tuple, edge_index: EdgeIndex) -> dict:
+    """Method to compute the constraints between all adjacent candidate nodes. For both directions of a pair
+    (node, neighbour) the label set id of the edges from node to neighbour and from neighbour to node is stored
+    (None if there is no edge in this direction, -2 if no pair of input graph nodes has this label set).
+
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return: The constraints of all ordered pairs of adjacent candidate nodes
+    :rtype: dict[(node, neighbour): [forward label set id, backward label set id]]
+    """
+    edge_labels = {}
+    for source, target, label in candidate_edges:
+        edge_labels.setdefault((int(source), int(target)), set()).add(int(label))
+
+    constraints = {}
+    for node1, node2 in edge_labels:
+        for node, neighbour in [(node1, node2), (node2, node1)]:
+            constraints[(node, neighbour)] = [
+                edge_index.label_set_id(edge_labels[(node, neighbour)]) if (node, neighbour) in edge_labels else None,
+                edge_index.label_set_id(edge_labels[(neighbour, node)]) if (neighbour, node) in edge_labels else None]
+
+    return constraints
+
+
+def compute_matching_order(candidate_nodes: list, potential_assignments: dict, constraints: dict,
+                           fixed_nodes: list) -> list:
+    """Method to compute a connectivity-aware order of the candidate nodes for the matcher. After the
+    fixed nodes (which are assigned by the partial instances) the next node is always an adjacent node of the already
+    ordered nodes with the smallest domain (ties are broken by the number of adjacent ordered nodes), so every node
+    except the first one is constrained by at least one assigned node.
+
+    :param list candidate_nodes: The ids of all candidate nodes
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param dict constraints: The constraints of all ordered pairs of adjacent candidate nodes
+    :param list fixed_nodes: The candidate nodes which are assigned by the partial instances
+    :return: The matching order (candidate node, adjacent nodes which are ordered before it)
+    :rtype: list[tuple]
+    """
+    neighbours = {node: [] for node in candidate_nodes}
+    for node, neighbour in constraints:
+        neighbours[node].append(neighbour)
+
+    domain_sizes = {node: int(np.count_nonzero(potential_assignments[node])) if node in potential_assignments else 0
+                    for node in candidate_nodes}
+
+    ordered = list(fixed_nodes)
+    order = [(node, [neighbour for neighbour in neighbours[node] if neighbour in ordered[:i]])
+             for i, node in enumerate(ordered)]
+
+    while len(ordered) < len(candidate_nodes):
+        remaining = [node for node in candidate_nodes if node not in ordered]
+        connected = [node for node in remaining if any(neighbour in ordered for neighbour in neighbours[node])]
+        next_node = min(connected if len(connected) > 0 else remaining,
+                        key=lambda node: (domain_sizes[node],
+                                          -sum(neighbour in ordered for neighbour in neighbours[node]), node))
+        order.append((next_node, [neighbour for neighbour in neighbours[next_node] if neighbour in ordered]))
+        ordered.append(next_node)
+
+    return order
+
+
+def filter_partial_instances(candidate_instances: np.ndarray, fixed_nodes: list, potential_assignments: dict,
+                             constraints: dict, new_added_edge: dict, edge_index: EdgeIndex) -> np.ndarray:
+    """Method to check the inherited instances of the parent graph against the 'new_added_edge'. An instance is kept,
+    if the nodes of the new edge, which are part of the instance, are in their (recomputed) domains and, in case of a
+    backward edge, if their assignments are connected with exactly the labels of the candidate edges between them.
+
+    :param np.ndarray candidate_instances: The instances of the parent graph (column = fixed node)
+    :param list fixed_nodes: The ids of the candidate nodes which are assigned by the instances
+    :param dict potential_assignments: The domains (bitsets) of the candidate nodes
+    :param dict constraints: The constraints of all ordered pairs of adjacent candidate nodes
+    :param dict new_added_edge: The edge which was added to the parent graph
+    :param EdgeIndex edge_index: The edge index of the input graph
+    :return: The instances of the parent graph, which can be extended to instances of the candidate
+    :rtype: np.ndarray
+    """
+    candidate_instances = np.asarray(candidate_instances, dtype=np.int32)
+    source, target = int(new_added_edge['parent_node_id']), int(new_added_edge['child_node_id'])
+    edge_nodes = [node for node in [source, target] if node in fixed_nodes]
+
+    valid = np.ones(len(candidate_instances), dtype=bool)
+    for node in edge_nodes:
+        if node in potential_assignments:
+            valid &= potential_assignments[node][candidate_instances[:, fixed_nodes.index(node)]]
+
+    # both nodes of a backward edge are part of the parent instances -> check the edges between them
+    if len(edge_nodes) == 2:
+        source_assignments = candidate_instances[:, fixed_nodes.index(source)]
+        target_assignments = candidate_instances[:, fixed_nodes.index(target)]
+        forward_label_set_id, backward_label_set_id = constraints[(source, target)]
+        valid &= edge_index.lookup(source_assignments, target_assignments) == forward_label_set_id
+        if backward_label_set_id is not None:
+            valid &= edge_index.lookup(target_assignments, source_assignments) == backward_label_set_id
+
+    return candidate_instances[valid]
+
+
+def count_support(instances: np.ndarray, first_edge_nodes: list, support_measure: str = 'first_edge') -> int:
+    """Method to compute the support of a candidate out of its instances with the given support measure:
+    'first_edge' counts the distinct assignments of the first edge of the canonical code (see
+    'count_distinct_assignments' and 'Pattern.first_edge_nodes'), 'mni' counts the minimum number of distinct images of
+    a candidate node (see 'count_minimum_images'). Both measures are the same for all isomorphic candidates, no matter
+    how their nodes are numbered.
+
+    :param np.ndarray instances: The instances of the candidate (row = instance, column = candidate node id)
+    :param list first_edge_nodes: The nodes of the canonical first edge of the candidate
+    :param str support_measure: The support measure ('first_edge' or 'mni')
+    :return: The support of the candidate
+    :rtype: int
+    """
+    if support_measure == 'mni':
+        return count_minimum_images(instances)
+
+    return count_distinct_assignments(instances, [int(node) for node in first_edge_nodes])
+
+
+def count_distinct_assignments(instances: np.ndarray, candidate_nodes: list) -> int:
+    """Method to count the distinct assignments of some candidate nodes over all instances, e.g. the number of input
+    graph edges the first edge of the candidate is mapped to (every assignment is counted once, no matter in how many
+    instances it is extended).
+
+    :param np.ndarray instances: The instances of the candidate (row = instance, column = candidate node id)
+    :param list candidate_nodes: The ids of the candidate nodes
+    :return: The number of distinct assignments of the candidate nodes
+    :rtype: int
+    """
+    if len(instances) == 0:
+        return 0
+    return len(np.unique(instances[:, candidate_nodes], axis=0))
+
+
+def count_minimum_images(instances: np.ndarray) -> int:
+    """Method to compute the minimum image based support (MNI) of a candidate: the minimum over all candidate nodes
+    of the number of distinct input graph nodes the candidate node is assigned to. In contrast to the number of
+    instances, MNI is anti-monotone on a single input graph.
+
+    :param np.ndarray instances: The instances of the candidate (row = instance, column = candidate node id)
+    :return: The minimum number of distinct images of a candidate node
+    :rtype: int
+    """
+    if len(instances) == 0 or instances.shape[1] == 0:
+        return 0
+    return min(len(np.unique(instances[:, column])) for column in range(instances.shape[1]))
@@ -0,0 +1,179 @@
+from distributed.pasigram.model.pattern import Pattern
+from distributed.pasigram.model.csp_graph import CSPGraph
+
+
+def get_matching_plan(candidate_graph: Pattern, fixed_nodes: list, input_csp_graph: CSPGraph,
+                      matching_plans: dict = None) -> list:
+    """Method to get the matching plan of a candidate out of a cache of matching plans. The plans are cached in the
+    canonical node order of the candidates (see 'Pattern.canonical_order'), so the isomorphic candidates share one plan
+    regardless of the numbering of their nodes: the cached plan is remapped to the node ids of the candidate. If the
+    candidate has no cached plan, the plan is computed (see 'compute_matching_plan') and stored in the cache.
+
+    :param Pattern candidate_graph: The pattern object of the candidate
+    :param list fixed_nodes: The candidate nodes which are assigned by the partial instances
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :param dict matching_plans: The cache of the matching plans, e.g. of the Evaluator (canonical code and positions
+        of the fixed nodes -> plan in the canonical node order). Optionally, without a cache the plan is computed.
+    :return: The matching plan (candidate node, adjacent nodes which are assigned before)
+    :rtype: list[tuple]
+    """
+    # without a cache or a canonical code the plan can't be shared with other candidates
+    if matching_plans is None or candidate_graph.canonical_order is None:
+        return compute_matching_plan(candidate_graph.labels, candidate_graph.edge_list, fixed_nodes, input_csp_graph)
+
+    # the position of every node of the candidate in the canonical node order
+    canonical_order = candidate_graph.canonical_order
+    positions = {node: position for position, node in enumerate(canonical_order)}
+    plan_key = (candidate_graph.canonical_code, tuple(positions[node] for node in fixed_nodes))
+
+    if plan_key not in matching_plans:
+        plan = compute_matching_plan(candidate_graph.labels, candidate_graph.edge_list, fixed_nodes, input_csp_graph)
+        matching_plans[plan_key] = [(positions[node], [positions[neighbour] for neighbour in bound_neighbours])
+                                    for node, bound_neighbours in plan]
+
+    return [(canonical_order[position], [canonical_order[neighbour] for neighbour in bound_neighbours])
+            for position, bound_neighbours in matching_plans[plan_key]]
+
+
+def compute_matching_plan(candidate_labels: tuple, candidate_edges: tuple, fixed_nodes: list,
+                          input_csp_graph: CSPGraph) -> list:
+    """Method to compute the order in which the matcher assigns the candidate nodes (join order). After the fixed nodes
+    the plan starts with the node with the smallest estimated domain and is then always extended along an edge from
+    an already bound node: the next node is the adjacent node of the bound nodes with the smallest estimated number of
+    assignments per partial instance (see 'estimate_extension_size'). Ties are broken by the degree of the candidate
+    node, the rarity of its label and its id. The bound neighbours of a node are ordered by their estimated fan out.
+
+    :param tuple candidate_labels: The labels of the candidate nodes (position = node id)
+    :param tuple candidate_edges: The edges of the candidate (source id, target id, edge label)
+    :param list fixed_nodes: The candidate nodes which are assigned by the partial instances
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :return: The matching plan (candidate node, adjacent nodes which are assigned before)
+    :rtype: list[tuple]
+    """
+    candidate_nodes = list(range(len(candidate_labels)))
+    labels = {node: int(label) for node, label in enumerate(candidate_labels)}
+
+    # the in- and outdegree of the candidate nodes and the labels of the candidate edges from a node to an adjacent
+    # node
+    indegrees = {node: 0 for node in candidate_nodes}
+    outdegrees = {node: 0 for node in candidate_nodes}
+    edge_labels = {}
+    for source, target, label in candidate_edges:
+        outdegrees[source] += 1
+        indegrees[target] += 1
+        edge_labels.setdefault((int(source), int(target)), set()).add(int(label))
+    degrees = {node: indegrees[node] + outdegrees[node] for node in candidate_nodes}
+    neighbours = {node: sorted({neighbour for pair in edge_labels for neighbour in pair
+                                if node in pair and neighbour != node}) for node in candidate_nodes}
+
+    # estimated domain sizes (nodes with the same label and at least the same degrees) and label counts
+    domain_sizes = {node: len(input_csp_graph.domain(labels[node], indegrees[node], outdegrees[node]))
+                    for node in candidate_nodes}
+    label_counts = {node: count_label(labels[node], input_csp_graph) for node in candidate_nodes}
+
+    bound = list(fixed_nodes)
+    plan = [(node, [neighbour for neighbour in neighbours[node] if neighbour in bound[:i]])
+            for i, node in enumerate(bound)]
+
+    while len(bound) < len(candidate_nodes):
+        unbound = [node for node in candidate_nodes if node not in bound]
+        connected = [node for node in unbound if any(neighbour in bound for neighbour in neighbours[node])]
+
+        # only the first node of a connected candidate isn't extended along an edge
+        if len(connected) == 0:
+            estimates = {node: float(domain_sizes[node]) for node in unbound}
+        else:
+            estimates = {node: estimate_extension_size(node, [neighbour for neighbour in neighbours[node]
+                                                              if neighbour in bound],
+                                                       labels, edge_labels, domain_sizes, label_counts,
+                                                       input_csp_graph)
+                         for node in connected}
+
+        next_node = min(estimates, key=lambda node: (estimates[node], -degrees[node], label_counts[node], node))
+
+        # the bound neighbour with the smallest fan out is the first one (the matcher extends along its edges)
+        bound_neighbours = sorted([neighbour for neighbour in neighbours[next_node] if neighbour in bound],
+                                  key=lambda neighbour: (estimate_fan_out(neighbour, next_node, labels, edge_labels,
+                                                                          label_counts, input_csp_graph), neighbour))
+        plan.append((next_node, bound_neighbours))
+        bound.append(next_node)
+
+    return plan
+
+
+def estimate_extension_size(node: int, bound_neighbours: list, labels: dict, edge_labels: dict, domain_sizes: dict,
+                            label_counts: dict, input_csp_graph: CSPGraph) -> float:
+    """Method to estimate the number of assignments of a candidate node per partial instance, which binds the given
+    adjacent nodes. The assignments are the neighbours of the assignment of the most selective bound neighbour
+    (average number of neighbours by edge label and neighbour label), which are additionally connected to the
+    assignments of the other bound neighbours (independent probabilities) and meet the degrees of the node (share of
+    the nodes of the label in the estimated domain).
+
+    :param int node: The id of the candidate node
+    :param list bound_neighbours: The adjacent candidate nodes which are bound
+    :param dict labels: The labels of the candidate nodes
+    :param dict edge_labels: The labels of the candidate edges between adjacent nodes
+    :param dict domain_sizes: The estimated domain sizes of the candidate nodes
+    :param dict label_counts: The number of input graph nodes with the label of every candidate node
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :return: The estimated number of assignments
+    :rtype: float
+    """
+    if label_counts[node] == 0:
+        return 0.0
+
+    fan_outs = sorted(estimate_fan_out(neighbour, node, labels, edge_labels, label_counts, input_csp_graph)
+                      for neighbour in bound_neighbours)
+
+    estimate = fan_outs[0]
+    for fan_out in fan_outs[1:]:
+        estimate *= min(1.0, fan_out / label_counts[node])
+
+    return estimate * domain_sizes[node] / label_counts[node]
+
+
+def estimate_fan_out(bound_node: int, node: int, labels: dict, edge_labels: dict, label_counts: dict,
+                     input_csp_graph: CSPGraph) -> float:
+    """Method to estimate the average number of neighbours of an input graph node with the label of 'bound_node',
+    which have the label of 'node' and are connected by the candidate edges between both nodes (the smallest average
+    over the labels of the edges in both directions).
+
+    :param int bound_node: The id of the bound candidate node
+    :param int node: The id of the adjacent candidate node
+    :param dict labels: The labels of the candidate nodes
+    :param dict edge_labels: The labels of the candidate edges between adjacent nodes
+    :param dict label_counts: The number of input graph nodes with the label of every candidate node
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :return: The estimated number of neighbours
+    :rtype: float
+    """
+    # without statistics every neighbour is assumed to be an assignment
+    if input_csp_graph.statistics_index is None or label_counts[bound_node] == 0:
+        return float(label_counts[node])
+    neighbour_counts = input_csp_graph.statistics_index[1]
+
+    fan_out = float(label_counts[node])
+    # direction 1 = outgoing edges (bound_node -> node), direction 0 = ingoing edges (node -> bound_node)
+    for direction, pair in [(1, (bound_node, node)), (0, (node, bound_node))]:
+        for edge_label in edge_labels.get(pair, []):
+            if labels[bound_node] >= neighbour_counts.shape[0] or edge_label >= neighbour_counts.shape[2] or \
+                    labels[node] >= neighbour_counts.shape[3]:
+                return 0.0
+            count = neighbour_counts[labels[bound_node], direction, edge_label, labels[node]]
+            fan_out = min(fan_out, count / label_counts[bound_node])
+
+    return fan_out
+
+
+def count_label(label: int, input_csp_graph: CSPGraph) -> int:
+    """Method to count the nodes of the input graph with the given label.
+
+    :param int label: The label of the nodes
+    :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+    :return: The number of nodes
+    :rtype: int
+    """
+    if input_csp_graph.statistics_index is None:
+        return len(input_csp_graph.domain(label, 0, 0))
+    label_counts = input_csp_graph.statistics_index[0]
+    return int(label_counts[label]) if 0 <= label < len(label_counts) else 0
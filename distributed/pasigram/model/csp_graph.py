@@ -0,0 +1,477 @@
+import numpy as np
+import pandas as pd
+from distributed.pasigram.service.binary_service import read_binary_arrays, CSP_GRAPH_ARRAYS
+
+
+class CSPGraph:
+    """A class to represent the csp graph of a (large) input graph in compressed sparse row (CSR) format.
+    The ingoing and outgoing neighbours of the node at position i are stored in the slices
+    [offsets[i]:offsets[i + 1]] of three parallel int32 arrays (neighbour ids, edge labels and neighbour labels).
+    Inside every slice the neighbours are sorted by (edge label, neighbour label, neighbour id).
+    """
+
+    def __init__(self, node_ids: np.ndarray, labels: np.ndarray,
+                 in_offsets: np.ndarray, in_neighbours: np.ndarray, in_edge_labels: np.ndarray,
+                 in_neighbour_labels: np.ndarray,
+                 out_offsets: np.ndarray, out_neighbours: np.ndarray, out_edge_labels: np.ndarray,
+                 out_neighbour_labels: np.ndarray, path: str = None) -> None:
+        """Constructor
+
+        :param np.ndarray node_ids: The ids of all nodes (position -> node id)
+        :param np.ndarray labels: The (compressed) labels of all nodes
+        :param np.ndarray in_offsets: Start of the ingoing neighbours of every node (length = number of nodes + 1)
+        :param np.ndarray in_neighbours: Ids of the ingoing neighbours
+        :param np.ndarray in_edge_labels: Labels of the ingoing edges
+        :param np.ndarray in_neighbour_labels: Labels of the ingoing neighbours
+        :param np.ndarray out_offsets: Start of the outgoing neighbours of every node (length = number of nodes + 1)
+        :param np.ndarray out_neighbours: Ids of the outgoing neighbours
+        :param np.ndarray out_edge_labels: Labels of the outgoing edges
+        :param np.ndarray out_neighbour_labels: Labels of the outgoing neighbours
+        :param str path: The directory of the binary graph, if the arrays are memory mapped (optionally)
+        """
+
+        self.__node_ids = node_ids
+        self.__labels = labels
+
+        self.__in_offsets = in_offsets
+        self.__in_neighbours = in_neighbours
+        self.__in_edge_labels = in_edge_labels
+        self.__in_neighbour_labels = in_neighbour_labels
+
+        self.__out_offsets = out_offsets
+        self.__out_neighbours = out_neighbours
+        self.__out_edge_labels = out_edge_labels
+        self.__out_neighbour_labels = out_neighbour_labels
+
+        # the degrees are derived once from the offsets, because they are needed for every candidate node
+        self.__indegree = np.diff(in_offsets).astype(np.int32)
+        self.__outdegree = np.diff(out_offsets).astype(np.int32)
+
+        # lookup index to translate node ids into positions
+        # -> not needed, if the node ids are dense (id = position, see 'remap_node_ids')
+        self.__positions = None
+        if not np.array_equal(node_ids, np.arange(len(node_ids))):
+            self.__positions = pd.Index(node_ids)
+
+        # directory of the binary graph, if the arrays are memory mapped
+        self.__path = path
+
+        # size of the node id space (= number of nodes for dense ids), e.g. for bitsets over the node ids
+        self.__id_space = len(node_ids) if self.__positions is None else int(np.max(node_ids, initial=-1)) + 1
+
+        # label-partitioned index of the nodes for domain lookups (see 'build_domain_index')
+        self.__domain_index: list = None
+
+        # sparse neighbour-label count signatures of the nodes (see 'build_signature_index')
+        self.__signature_index: list = None
+
+        # label and edge counts of the graph for selectivity estimations (see 'build_statistics_index')
+        self.__statistics_index: list = None
+
+    @classmethod
+    def from_binary(cls, path: str) -> 'CSPGraph':
+        """Method to open the csp graph of a graph in the binary format. The arrays are memory mapped.
+
+        :param str path: The directory of the binary graph
+        :return: The memory mapped csp graph
+        :rtype: CSPGraph
+        """
+        return cls(*read_binary_arrays(path, CSP_GRAPH_ARRAYS), path=path)
+
+    def __getstate__(self) -> dict:
+        # a memory mapped csp graph is pickled by its path only
+        # -> every worker process maps the same file instead of receiving its own copy of the arrays
+        # (the indexes are sent along, so they haven't to be rebuilt by every worker)
+        if self.__path is not None:
+            return {'path': self.__path, 'domain_index': self.__domain_index,
+                    'signature_index': self.__signature_index, 'statistics_index': self.__statistics_index}
+        return self.__dict__
+
+    def __setstate__(self, state: dict) -> None:
+        if 'path' in state:
+            csp_graph = CSPGraph.from_binary(state['path'])
+            csp_graph.__domain_index = state['domain_index']
+            csp_graph.__signature_index = state['signature_index']
+            csp_graph.__statistics_index = state['statistics_index']
+            state = csp_graph.__dict__
+        self.__dict__.update(state)
+
+    def __len__(self) -> int:
+        return len(self.__node_ids)
+
+    def positions(self, node_ids) -> np.ndarray:
+        """Method to translate node ids into positions of the csp graph
+
+        :param node_ids: The ids of the nodes
+        :return: The positions of the nodes (-1 for unknown ids)
+        :rtype: np.ndarray
+        """
+        node_ids = np.atleast_1d(node_ids)
+        if self.__positions is None:
+            return np.where((node_ids >= 0) & (node_ids < len(self)), node_ids, -1).astype(np.int64)
+        return self.__positions.get_indexer(node_ids)
+
+    def build_domain_index(self) -> None:
+        """Method to build the label-partitioned domain index. The positions of all nodes are sorted by
+        (label, indegree, outdegree), so the nodes with the same label are one slice of the index, which is sorted by
+        the indegree.
+
+        """
+        # sort the positions by (label, indegree, outdegree) -> the last key is the primary key
+        order = np.lexsort((self.__outdegree, self.__indegree, self.__labels)).astype(np.int32)
+
+        # start of the slice of every label
+        offsets = np.zeros(int(np.max(self.__labels, initial=-1)) + 2, dtype=np.int64)
+        np.cumsum(np.bincount(self.__labels, minlength=len(offsets) - 1), out=offsets[1:])
+
+        self.__domain_index = [order, offsets, self.__indegree[order]]
+
+    def domain(self, label: int, indegree: int, outdegree: int) -> np.ndarray:
+        """Method to compute the positions of all nodes with the given label and at least the given in- and outdegree.
+        With the domain index this is a slice plus a binary search for the indegree (only the outdegree of the nodes in
+        the slice is compared), else all nodes are scanned.
+
+        :param int label: The label of the nodes
+        :param int indegree: The minimum indegree of the nodes
+        :param int outdegree: The minimum outdegree of the nodes
+        :return: The ascending positions of the nodes
+        :rtype: np.ndarray
+        """
+        if self.__domain_index is None:
+            return np.flatnonzero((self.__indegree >= indegree) & (self.__outdegree >= outdegree) &
+                                  (self.__labels == label))
+
+        order, offsets, sorted_indegree = self.__domain_index
+        # the values of the candidate nodes can be floats (mixed DataFrame rows)
+        label, indegree, outdegree = int(label), int(indegree), int(outdegree)
+
+        # unknown labels have no nodes
+        if label < 0 or label >= len(offsets) - 1:
+            return np.array([], dtype=np.int64)
+
+        # the nodes with the label are sorted by their indegree -> binary search for the first node with 'indegree'
+        start, end = offsets[label], offsets[label + 1]
+        start += np.searchsorted(sorted_indegree[start:end], indegree, side='left')
+        positions = order[start:end]
+
+        return np.sort(positions[self.__outdegree[positions] >= outdegree]).astype(np.int64)
+
+    def build_signature_index(self) -> None:
+        """Method to build the neighbour-label count signatures of all nodes. The signature of a node counts its
+        neighbours for every key (direction, edge label, neighbour label). The signatures of all nodes are stored as one
+        sparse COO matrix, whose (node position, key) pairs are encoded as sorted int64 keys
+        (position * number of keys + key) with a parallel array of counts.
+
+        """
+        # number of different edge and node labels (the labels are compressed numbers)
+        number_of_edge_labels = int(max(np.max(self.__in_edge_labels, initial=-1),
+                                        np.max(self.__out_edge_labels, initial=-1))) + 1
+        number_of_node_labels = int(np.max(self.__labels, initial=-1)) + 1
+        number_of_keys = 2 * number_of_edge_labels * number_of_node_labels
+
+        # encode every neighbour (ingoing = direction 0, outgoing = direction 1) as (node position, key)
+        positions = np.arange(len(self), dtype=np.int64)
+        encoded_neighbours = []
+        for direction, degree, edge_labels, neighbour_labels in [
+                (0, self.__indegree, self.__in_edge_labels, self.__in_neighbour_labels),
+                (1, self.__outdegree, self.__out_edge_labels, self.__out_neighbour_labels)]:
+            keys = (direction * number_of_edge_labels + np.asarray(edge_labels, dtype=np.int64)) * \
+                number_of_node_labels + np.asarray(neighbour_labels, dtype=np.int64)
+            encoded_neighbours.append(np.repeat(positions, degree) * number_of_keys + keys)
+
+        # count the neighbours per (node position, key)
+        signature_keys, signature_counts = np.unique(np.concatenate(encoded_neighbours), return_counts=True)
+
+        self.__signature_index = [number_of_edge_labels, number_of_node_labels, signature_keys,
+                                  signature_counts.astype(np.int32)]
+
+    def filter_by_signature(self, positions: np.ndarray, ingoing_neighbours: list,
+                            outgoing_neighbours: list) -> np.ndarray:
+        """Method to filter the nodes, whose neighbours are a super set (by edge label and neighbour label) of the given
+        neighbours. The counts of all keys of the given neighbours are looked up for all nodes at once and compared
+        with one vectorized '>=' (same result as 'is_subset' for the ingoing and outgoing neighbours).
+
+        :param np.ndarray positions: The positions of the nodes to filter
+        :param list ingoing_neighbours: The ingoing neighbours ([edge_label, neighbour_label, ...] lists)
+        :param list outgoing_neighbours: The outgoing neighbours ([edge_label, neighbour_label, ...] lists)
+        :return: The positions of the nodes which are a super set
+        :rtype: np.ndarray
+        """
+        number_of_edge_labels, number_of_node_labels, signature_keys, signature_counts = self.__signature_index
+        number_of_keys = 2 * number_of_edge_labels * number_of_node_labels
+
+        # compute the signature of the given neighbours
+        neighbour_keys = []
+        for direction, neighbours in [(0, ingoing_neighbours), (1, outgoing_neighbours)]:
+            for neighbour in neighbours:
+                edge_label, neighbour_label = int(neighbour[0]), int(neighbour[1])
+                # labels which don't exist in the graph can't be matched
+                if not (0 <= edge_label < number_of_edge_labels and 0 <= neighbour_label < number_of_node_labels):
+                    return np.array([], dtype=np.int64)
+                neighbour_keys.append((direction * number_of_edge_labels + edge_label) * number_of_node_labels +
+                                      neighbour_label)
+        if len(neighbour_keys) == 0 or len(positions) == 0:
+            return positions
+        if len(signature_keys) == 0:
+            return positions[:0]
+        keys, counts = np.unique(neighbour_keys, return_counts=True)
+
+        # look up the counts of all keys for all nodes (missing keys have count 0)
+        queries = (np.asarray(positions, dtype=np.int64)[:, None] * number_of_keys + keys[None, :]).ravel()
+        found_positions = np.minimum(np.searchsorted(signature_keys, queries), len(signature_keys) - 1)
+        found_counts = np.where(signature_keys[found_positions] == queries, signature_counts[found_positions], 0)
+
+        return positions[np.all(found_counts.reshape(len(positions), len(keys)) >= counts[None, :], axis=1)]
+
+    def build_statistics_index(self) -> None:
+        """Method to build the label statistics of the graph: the number of nodes of every label and the number of
+        neighbours of all nodes of a label for every key (direction, edge label, neighbour label). The statistics are
+        summed up out of the signature index (which is built first, if it doesn't exist).
+
+        """
+        if self.__signature_index is None:
+            self.build_signature_index()
+        number_of_edge_labels, number_of_node_labels, signature_keys, signature_counts = self.__signature_index
+        number_of_keys = 2 * number_of_edge_labels * number_of_node_labels
+
+        label_counts = np.bincount(self.__labels, minlength=number_of_node_labels).astype(np.int64)
+
+        # sum up the signatures of all nodes with the same label
+        labels = np.asarray(self.__labels, dtype=np.int64)[signature_keys // max(number_of_keys, 1)]
+        neighbour_counts = np.bincount(labels * number_of_keys + signature_keys % max(number_of_keys, 1),
+                                       weights=signature_counts, minlength=number_of_node_labels * number_of_keys)
+
+        self.__statistics_index = [label_counts,
+                                   neighbour_counts.astype(np.int64).reshape(number_of_node_labels, 2,
+                                                                             number_of_edge_labels,
+                                                                             number_of_node_labels)]
+
+    def neighbour_pairs(self, positions: np.ndarray, outgoing: bool = True, labels: bool = False) -> list:
+        """Method to get all (node, neighbour) pairs of the nodes at the given positions at once, by gathering their
+        slices of the CSR arrays.
+
+        :param np.ndarray positions: The positions of the nodes
+        :param bool outgoing: Get the outgoing (True) or the ingoing (False) neighbours
+        :param bool labels: Get the edge labels and neighbour labels of the pairs too
+        :return: The position of the node and the id of the neighbour for every pair (and the edge label and the label
+            of the neighbour, if 'labels' is True)
+        :rtype: list[np.ndarray]
+        """
+        offsets, neighbours, edge_labels, neighbour_labels = \
+            (self.__out_offsets, self.__out_neighbours, self.__out_edge_labels, self.__out_neighbour_labels) \
+            if outgoing else \
+            (self.__in_offsets, self.__in_neighbours, self.__in_edge_labels, self.__in_neighbour_labels)
+        positions = np.asarray(positions, dtype=np.int64)
+
+        # index of every neighbour in the CSR arrays: start of the slice of its node + its rank inside the slice
+        starts = np.asarray(offsets[positions], dtype=np.int64)
+        counts = np.asarray(offsets[positions + 1], dtype=np.int64) - starts
+        ranks = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        indices = np.repeat(starts, counts) + ranks
+
+        pairs = [np.repeat(positions, counts), np.asarray(neighbours[indices], dtype=np.int64)]
+        if labels:
+            pairs += [np.asarray(edge_labels[indices], dtype=np.int64), np.asarray(neighbour_labels[indices],
+                                                                                   dtype=np.int64)]
+        return pairs
+
+    def ingoing_neighbours(self, position: int) -> list:
+        """The ingoing neighbours of the node at 'position' in the format of the csp graph DataFrame.
+
+        :param int position: The position of the node
+        :return: A sorted list of [edge_label, neighbour_label, neighbour_id] lists
+        :rtype: list[list]
+        """
+        start, end = self.__in_offsets[position], self.__in_offsets[position + 1]
+        return np.stack((self.__in_edge_labels[start:end], self.__in_neighbour_labels[start:end],
+                         self.__in_neighbours[start:end]), axis=1).tolist()
+
+    def outgoing_neighbours(self, position: int) -> list:
+        """The outgoing neighbours of the node at 'position' in the format of the csp graph DataFrame.
+
+        :param int position: The position of the node
+        :return: A sorted list of [edge_label, neighbour_label, neighbour_id] lists
+        :rtype: list[list]
+        """
+        start, end = self.__out_offsets[position], self.__out_offsets[position + 1]
+        return np.stack((self.__out_edge_labels[start:end], self.__out_neighbour_labels[start:end],
+                         self.__out_neighbours[start:end]), axis=1).tolist()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Method to convert the csp graph into the DataFrame representation used by the candidates.
+        Only meant for debugging and small graphs.
+
+        :return: The csp graph as DataFrame (label|indegree|outdegree|ingoing_neighbours|outgoing_neighbours)
+        :rtype: pd.DataFrame
+        """
+        positions = range(len(self))
+        return pd.DataFrame({'label': self.__labels, 'indegree': self.__indegree, 'outdegree': self.__outdegree,
+                             'ingoing_neighbours': [self.ingoing_neighbours(i) for i in positions],
+                             'outgoing_neighbours': [self.outgoing_neighbours(i) for i in positions]},
+                            index=self.__node_ids)
+
+    @property
+    def arrays(self) -> list:
+        """All arrays of the csp graph in the order of the constructor
+
+        :return: arrays
+        :rtype: list[np.ndarray]
+        """
+        return [self.__node_ids, self.__labels,
+                self.__in_offsets, self.__in_neighbours, self.__in_edge_labels, self.__in_neighbour_labels,
+                self.__out_offsets, self.__out_neighbours, self.__out_edge_labels, self.__out_neighbour_labels]
+
+    @property
+    def domain_index(self) -> list:
+        """The domain index (sorted positions, offsets of the labels and sorted indegrees), None if not built
+
+        :return: domain_index
+        :rtype: list[np.ndarray]
+        """
+        return self.__domain_index
+
+    @property
+    def signature_index(self) -> list:
+        """The signature index (number of edge labels, number of node labels, sorted keys and counts), None if not
+        built
+
+        :return: signature_index
+        :rtype: list
+        """
+        return self.__signature_index
+
+    @property
+    def statistics_index(self) -> list:
+        """The statistics index (number of nodes per label and number of neighbours per
+        (label, direction, edge label, neighbour label)), None if not built
+
+        :return: statistics_index
+        :rtype: list[np.ndarray]
+        """
+        return self.__statistics_index
+
+    @property
+    def id_space(self) -> int:
+        """The size of the node id space (largest node id + 1)
+
+        :return: id_space
+        :rtype: int
+        """
+        return self.__id_space
+
+    @property
+    def path(self) -> str:
+        """The directory of the binary graph, if the csp graph is memory mapped (else None)
+
+        :return: path
+        :rtype: str
+        """
+        return self.__path
+
+    @property
+    def node_ids(self) -> np.ndarray:
+        """The ids of all nodes (position -> node id)
+
+        :return: node_ids
+        :rtype: np.ndarray
+        """
+        return self.__node_ids
+
+    @property
+    def label(self) -> np.ndarray:
+        """The labels of all nodes
+
+        :return: label
+        :rtype: np.ndarray
+        """
+        return self.__labels
+
+    @property
+    def indegree(self) -> np.ndarray:
+        """The indegree of all nodes
+
+        :return: indegree
+        :rtype: np.ndarray
+        """
+        return self.__indegree
+
+    @property
+    def outdegree(self) -> np.ndarray:
+        """The outdegree of all nodes
+
+        :return: outdegree
+        :rtype: np.ndarray
+        """
+        return self.__outdegree
+
+    @property
+    def in_offsets(self) -> np.ndarray:
+        """Offsets of the ingoing neighbours
+
+        :return: in_offsets
+        :rtype: np.ndarray
+        """
+        return self.__in_offsets
+
+    @property
+    def in_neighbours(self) -> np.ndarray:
+        """Ids of the ingoing neighbours
+
+        :return: in_neighbours
+        :rtype: np.ndarray
+        """
+        return self.__in_neighbours
+
+    @property
+    def in_edge_labels(self) -> np.ndarray:
+        """Labels of the ingoing edges
+
+        :return: in_edge_labels
+        :rtype: np.ndarray
+        """
+        return self.__in_edge_labels
+
+    @property
+    def in_neighbour_labels(self) -> np.ndarray:
+        """Labels of the ingoing neighbours
+
+        :return: in_neighbour_labels
+        :rtype: np.ndarray
+        """
+        return self.__in_neighbour_labels
+
+    @property
+    def out_offsets(self) -> np.ndarray:
+        """Offsets of the outgoing neighbours
+
+        :return: out_offsets
+        :rtype: np.ndarray
+        """
+        return self.__out_offsets
+
+    @property
+    def out_neighbours(self) -> np.ndarray:
+        """Ids of the outgoing neighbours
+
+        :return: out_neighbours
+        :rtype: np.ndarray
+        """
+        return self.__out_neighbours
+
+    @property
+    def out_edge_labels(self) -> np.ndarray:
+        """Labels of the outgoing edges
+
+        :return: out_edge_labels
+        :rtype: np.ndarray
+        """
+        return self.__out_edge_labels
+
+    @property
+    def out_neighbour_labels(self) -> np.ndarray:
+        """Labels of the outgoing neighbours
+
+        :return: out_neighbour_labels
+        :rtype: np.ndarray
+        """
+        return self.__out_neighbour_labels
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+class EdgeIndex:
+    """A class to represent an index of the edges of a (large) input graph, which maps a pair of nodes
+    (source id, target id) to the sorted set of the labels of all edges from source to target.
+    The pairs are stored as sorted keys (source * number_of_nodes + target) in an int64 array, the label sets are
+    numbered, so two pairs are connected by the same labels, iff they have the same label set id. A lookup is a
+    binary search and works for whole arrays of pairs at once.
+    """
+
+    def __init__(self, edges: pd.DataFrame) -> None:
+        """Constructor
+
+        :param pd.DataFrame edges: The edges of the graph (id|source|target|label), the ids of the nodes have to be
+            non-negative integers (e.g. dense ids, see 'remap_node_ids')
+        """
+        sources = np.asarray(edges['source'], dtype=np.int64)
+        targets = np.asarray(edges['target'], dtype=np.int64)
+        labels = np.asarray(edges['label'], dtype=np.int64)
+
+        # the keys have to be unique for every pair of nodes
+        self.__number_of_nodes: int = int(max(np.max(sources, initial=-1), np.max(targets, initial=-1))) + 1
+
+        # sort the edges by (key, label) and remove edges with the same key and label
+        keys = sources * self.__number_of_nodes + targets
+        order = np.lexsort((labels, keys))
+        keys, labels = keys[order], labels[order]
+        distinct = np.r_[True, (keys[1:] != keys[:-1]) | (labels[1:] != labels[:-1])]
+        keys, labels = keys[distinct], labels[distinct]
+
+        # group the labels by their key
+        group_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, len(keys)])
+
+        # number the label sets: the pairs with only one label are numbered vectorized (nearly all pairs),
+        # the label sets with multiple labels are numbered one after another
+        self.__label_sets: dict = {}
+        label_set_ids = np.empty(len(group_starts), dtype=np.int32)
+        single = group_sizes == 1
+        single_labels, label_set_ids[single] = np.unique(labels[group_starts[single]], return_inverse=True)
+        for label in single_labels:
+            self.__label_sets[(int(label),)] = len(self.__label_sets)
+        for group in np.flatnonzero(~single):
+            label_set = tuple(labels[group_starts[group]:group_starts[group] + group_sizes[group]].tolist())
+            label_set_ids[group] = self.__label_sets.setdefault(label_set, len(self.__label_sets))
+
+        self.__keys: np.ndarray = keys[group_starts]
+        self.__label_set_ids: np.ndarray = label_set_ids
+
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+    def lookup(self, sources, targets) -> np.ndarray:
+        """Method to get the label set ids of the edges between pairs of nodes.
+
+        :param sources: The ids of the source nodes
+        :param targets: The ids of the target nodes
+        :return: The label set id for every pair (-1 if there is no edge from source to target)
+        :rtype: np.ndarray
+        """
+        sources = np.atleast_1d(np.asarray(sources, dtype=np.int64))
+        targets = np.atleast_1d(np.asarray(targets, dtype=np.int64))
+        label_set_ids = np.full(np.broadcast(sources, targets).shape, -1, dtype=np.int32)
+        if len(self.__keys) == 0:
+            return label_set_ids
+
+        # nodes outside of the index have no edges
+        known = (sources >= 0) & (sources < self.__number_of_nodes) & \
+                (targets >= 0) & (targets < self.__number_of_nodes)
+        keys = sources * self.__number_of_nodes + targets
+
+        positions = np.minimum(np.searchsorted(self.__keys, keys), len(self.__keys) - 1)
+        found = known & (self.__keys[positions] == keys)
+        label_set_ids[found] = self.__label_set_ids[positions[found]]
+
+        return label_set_ids
+
+    def label_set_id(self, labels) -> int:
+        """Method to get the id of a set of edge labels.
+
+        :param labels: The labels of the edges (duplicates are ignored)
+        :return: The id of the label set (-2 if no pair of nodes is connected by exactly this labels)
+        :rtype: int
+        """
+        return self.__label_sets.get(tuple(sorted(set(int(label) for label in labels))), -2)
+
+    @property
+    def keys(self) -> np.ndarray:
+        """The sorted keys (source * number of nodes + target) of all connected pairs of nodes
+
+        :return: keys
+        :rtype: np.ndarray
+        """
+        return self.__keys
+
+    @property
+    def label_set_ids(self) -> np.ndarray:
+        """The label set id of every key
+
+        :return: label_set_ids
+        :rtype: np.ndarray
+        """
+        return self.__label_set_ids
+
+    @property
+    def label_sets(self) -> dict:
+        """The numbered label sets (sorted tuple of labels -> id)
+
+        :return: label_sets
+        :rtype: dict
+        """
+        return self.__label_sets
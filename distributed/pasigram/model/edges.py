@@ -51,3 +51,5 @@ class Edges:
     @edges.setter
     def edges(self, new_edges: pd.DataFrame) -> None:
         self.__edges = new_edges
+        # edges can be dropped (e.g. edges with unknown nodes while remapping the node ids)
+        self.__edge_ids = compute_edge_ids(self.__edges)
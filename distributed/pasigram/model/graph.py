@@ -1,8 +1,16 @@
 import pandas as pd
+import numpy as np
+from typing import Union
+from distributed.pasigram.model.csp_graph import CSPGraph
+from distributed.pasigram.model.edge_index import EdgeIndex
 from distributed.pasigram.model.edges import Edges
 from distributed.pasigram.model.nodes import Nodes
-from distributed.pasigram.service.graph_service import build_canonical_smallest_code, build_csp_graph, \
-    compute_right_most_path_labels, extend_csp_graph, dictionary_compression, create_initial_csp_graph
+from distributed.pasigram.service.graph_service import build_canonical_smallest_code, dictionary_compression, \
+    create_initial_csp_graph, build_csr_csp_graph, decode_patterns, remap_node_ids, decode_instances
+from distributed.pasigram.service.binary_service import read_binary_graph, write_binary_graph
+from distributed.pasigram.service.arrow_service import read_arrow_graph
+from distributed.pasigram.service.cache_service import compute_graph_hash, load_cached_csp_graph, store_csp_graph, \
+    MAX_CACHE_SIZE
 
 
 class Graph:
@@ -24,50 +32,201 @@ class Graph:
         self.__nodes: Nodes = Nodes(nodes)
 
         # the data structure needed to solve the csp problem
-        self.__csp_graph: pd.DataFrame = csp_graph
+        self.__csp_graph: Union[pd.DataFrame, CSPGraph] = csp_graph
 
         # canonical code of the graph build based on the final clusters
         self.__canonical_code: str = None
 
-        # the dictionary of nodes used for compression
-        self.__node_dict = {}
+        # the labels of the nodes used for compression (position = number)
+        self.__node_labels: pd.Index = pd.Index([])
 
-        # the dictionary of edges used for compression
-        self.__edge_dict = {}
+        # the labels of the edges used for compression (position = number)
+        self.__edge_labels: pd.Index = pd.Index([])
 
-    def build_csp_graph(self) -> None:
-        """Method to build the csp graph
+        # the original ids of the nodes, if the ids were remapped to dense ids (position = dense id)
+        self.__original_node_ids: pd.Index = None
 
+        # index of the labels of the edges between two nodes (built with the csp graph of an input graph)
+        self.__edge_index: EdgeIndex = None
+
+    @classmethod
+    def from_binary(cls, path: str) -> 'Graph':
+        """Method to load a (compressed) input graph with its csp graph from the binary format.
+        The csp graph is memory mapped, so the startup is nearly instant even for large graphs.
+
+        :param str path: The directory of the binary graph (see convert.py)
+        :return: The graph
+        :rtype: Graph
         """
-        self.__csp_graph = build_csp_graph(self.nodes, self.edges)
+        nodes, edges, node_labels, edge_labels, original_node_ids, csp_arrays = read_binary_graph(path)
 
-    def create_initial_csp_graph(self) -> None:
-        self.__csp_graph = create_initial_csp_graph(self.nodes_ids, self.nodes, self.edges)
+        graph = cls(nodes, edges, CSPGraph(*csp_arrays, path=path))
+        graph.__build_indexes()
+        graph.__node_labels = node_labels
+        graph.__edge_labels = edge_labels
+        graph.__original_node_ids = original_node_ids
+
+        return graph
 
-    def extend_csp_graph(self) -> None:
-        """Method to extend an existing csp graph, with one edge (and the corresponding nodes).
-        Mainly used to extend an existing frequent subgraph to generate new candidates.
+    @classmethod
+    def from_arrow(cls, nodes_path: str, edges_path: str) -> 'Graph':
+        """Method to load an input graph from Parquet or Arrow IPC files (requires pyarrow). Only the columns id|label
+        (nodes) and id|source|target|label (edges) are read.
 
+        :param str nodes_path: The file with the nodes of the graph
+        :param str edges_path: The file with the edges of the graph
+        :return: The graph
+        :rtype: Graph
         """
-        self.__csp_graph = extend_csp_graph(self.csp_graph, self.new_added_edge, self.nodes)
+        nodes, edges = read_arrow_graph(nodes_path, edges_path)
+
+        return cls(nodes, edges)
+
+    def to_binary(self, path: str) -> None:
+        """Method to store the (compressed) graph with its csp graph in the binary format.
+
+        :param str path: The directory in which the graph is stored
+        """
+        write_binary_graph(path, self.nodes, self.edges, self.node_labels, self.edge_labels, self.original_node_ids,
+                           self.csp_graph.arrays)
+
+    def build_csp_graph(self, cache_dir: str = None, max_cache_size: int = MAX_CACHE_SIZE) -> None:
+        """Method to build the csp graph of an input graph. The csp graph is stored in CSR format (see CSPGraph).
+        If a cache directory is given, the csp graph is only built if there is no cached csp graph for the same nodes,
+        edges and label dictionaries. Otherwise the cached csp graph is loaded (memory mapped).
+        Afterwards the indexes of the input graph are built once (see '__build_indexes').
+
+        :param str cache_dir: The directory of the csp graph cache (optionally)
+        :param int max_cache_size: The maximum size of the cache in bytes
+        """
+        if cache_dir is None:
+            self.__csp_graph = build_csr_csp_graph(self.nodes, self.edges)
+            self.__build_indexes()
+            return
+
+        graph_hash = compute_graph_hash(self.nodes, self.edges, self.node_labels, self.edge_labels)
+        cached_csp_graph = load_cached_csp_graph(cache_dir, graph_hash)
+
+        # if the csp graph isn't cached -> build it and store it in the cache
+        if cached_csp_graph is None:
+            csp_graph = build_csr_csp_graph(self.nodes, self.edges)
+            store_csp_graph(cache_dir, graph_hash, csp_graph.arrays, max_cache_size)
+            self.__csp_graph = csp_graph
+        else:
+            csp_arrays, entry_path = cached_csp_graph
+            self.__csp_graph = CSPGraph(*csp_arrays, path=entry_path)
+
+        self.__build_indexes()
+
+    def __build_indexes(self) -> None:
+        """Method to build the indexes which are used to evaluate the candidates in the input graph: the domain and the
+        signature index and the label statistics of the csp graph and the edge index of the graph.
+
+        """
+        self.__csp_graph.build_domain_index()
+        self.__csp_graph.build_signature_index()
+        self.__csp_graph.build_statistics_index()
+        self.__edge_index = EdgeIndex(self.edges)
+
+    def create_initial_csp_graph(self) -> None:
+        self.__csp_graph = create_initial_csp_graph(self.nodes_ids, self.nodes, self.edges)
 
     def build_canonical_smallest_code(self) -> None:
-        """Method to build the canonical code based on the csp graph.
+        """Method to build the canonical code (minimum DFS code, see 'build_canonical_smallest_code'). Two graphs have
+        the same canonical code, iff they are isomorphic.
 
         """
-        self.__canonical_code = build_canonical_smallest_code(self.csp_graph)
+        self.__canonical_code = build_canonical_smallest_code(self.nodes, self.edges)
 
     def build_compressed_graph(self) -> None:
         """Method to do dictionary compression for the graph. Nodes and edges set will be compressed (labels will be
-        replaced by numbers).
+        replaced by numbers and the node ids by dense ids 0..N-1).
 
         """
         compressed_result = dictionary_compression(self.nodes, self.edges)
+        remapped_result = remap_node_ids(compressed_result[2], compressed_result[3])
+
+        self.__node_labels = compressed_result[0]
+        self.__edge_labels = compressed_result[1]
+        self.__original_node_ids = remapped_result[0]
+        self.__nodes.nodes = remapped_result[1]
+        self.__edges.edges = remapped_result[2]
+
+    def decode_patterns(self, patterns: pd.Series) -> list:
+        """Method to decode the labels of patterns, which were mined out of this (compressed) graph, back into the
+        original labels.
+
+        :param pd.Series patterns: The Graph objects of the patterns
+        :return: The nodes and edges of all patterns with the original labels (first index level = pattern)
+        :rtype: list[pd.DataFrame, pd.DataFrame]
+        """
+        return decode_patterns(patterns, self.node_labels, self.edge_labels)
+
+    def decode_instances(self, instances: np.ndarray) -> pd.DataFrame:
+        """Method to translate the instances of a pattern, which was mined out of this (compressed) graph, back into the
+        original node ids.
+
+        :param np.ndarray instances: The instances of the pattern (row = instance, column = pattern node id)
+        :return: The instances with the original node ids (row = instance, column = pattern node id)
+        :rtype: pd.DataFrame
+        """
+        if self.original_node_ids is None:
+            return pd.DataFrame(list(instances))
+        return decode_instances(instances, self.original_node_ids)
+
+    @property
+    def node_labels(self) -> pd.Index:
+        """The labels of the nodes used for compression (position = number)
+
+        :return: node_labels
+        :rtype: pd.Index
+        """
+        return self.__node_labels
+
+    @property
+    def edge_labels(self) -> pd.Index:
+        """The labels of the edges used for compression (position = number)
+
+        :return: edge_labels
+        :rtype: pd.Index
+        """
+        return self.__edge_labels
 
-        self.__node_dict = compressed_result[0]
-        self.__edge_dict = compressed_result[1]
-        self.__nodes.nodes = compressed_result[2]
-        self.__edges.edges = compressed_result[3]
+    @property
+    def edge_index(self) -> EdgeIndex:
+        """The index of the labels of the edges between two nodes (None if the csp graph wasn't built)
+
+        :return: edge_index
+        :rtype: EdgeIndex
+        """
+        return self.__edge_index
+
+    @property
+    def original_node_ids(self) -> pd.Index:
+        """The original ids of the nodes, if the ids were remapped to dense ids (position = dense id, else None)
+
+        :return: original_node_ids
+        :rtype: pd.Index
+        """
+        return self.__original_node_ids
+
+    @property
+    def node_dict(self) -> dict:
+        """The dictionary of the node labels used for compression (label -> number)
+
+        :return: node_dict
+        :rtype: dict
+        """
+        return dict(zip(self.__node_labels, range(len(self.__node_labels))))
+
+    @property
+    def edge_dict(self) -> dict:
+        """The dictionary of the edge labels used for compression (label -> number)
+
+        :return: edge_dict
+        :rtype: dict
+        """
+        return dict(zip(self.__edge_labels, range(len(self.__edge_labels))))
 
     @property
     def size(self) -> int:
@@ -104,6 +263,15 @@ class Graph:
         """
         return self.__edges.edges
 
+    @property
+    def edge_list(self) -> list:
+        """The edges of the graph as tuples (source id, target id, label)
+
+        :return: edge_list
+        :rtype: list
+        """
+        return list(zip(self.edges['source'], self.edges['target'], self.edges['label']))
+
     @property
     def edges_ids(self) -> list:
         """List of all ids of the edges
@@ -123,11 +291,11 @@ class Graph:
         return self.__canonical_code
 
     @property
-    def csp_graph(self) -> pd.DataFrame:
-        """The CSP representation of the graph
+    def csp_graph(self) -> Union[pd.DataFrame, CSPGraph]:
+        """The CSP representation of the graph (CSPGraph for input graphs, pd.DataFrame for candidates)
 
         :return: csp_graph
-        :rtype: pd.DataFrame
+        :rtype: Union[pd.DataFrame, CSPGraph]
         """
         return self.__csp_graph
 
@@ -161,34 +329,6 @@ class Graph:
         """
         return self.__nodes.right_most_path
 
-    @property
-    def instances(self) -> pd.DataFrame:
-        """Instances of the candidates in the input graph.
-        By default empty DataFrame.
-
-        :return: instances
-        :rtype: pd.DataFrame
-        """
-        return self.__nodes.instances
-
-    @property
-    def right_most_path_labels(self) -> list:
-        """A list with the labels of all nodes which are part of the right-most-path
-
-        :return: right_most_path_labels
-        :rtype: list
-        """
-        return compute_right_most_path_labels(self.right_most_path, self.nodes)
-
-    @property
-    def new_added_edge(self) -> dict:
-        """The last added edge of the graph
-
-        :return: new_added_edge
-        _rtype: dict
-        """
-        return self.__edges.new_added_edge
-
     @right_most_path.setter
     def right_most_path(self, edge_ids: list):
         self.__nodes.right_most_path = edge_ids
@@ -200,11 +340,3 @@ class Graph:
     @right_most_node.setter
     def right_most_node(self, node_id):
         self.__nodes.right_most_node = node_id
-
-    @instances.setter
-    def instances(self, instances: list):
-        self.__nodes.instances = instances
-
-    @new_added_edge.setter
-    def new_added_edge(self, new_edge: dict):
-        self.__edges.new_added_edge = new_edge
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 from distributed.pasigram.service.nodes_service import compute_node_ids
 
 
@@ -18,7 +19,7 @@ class Nodes:
         self.__root_node = None
         self.__right_most_node = None
         self.__right_most_path = []
-        self.__instances = []
+        self.__instances = np.empty((0, 0), dtype=np.int32)
 
     @property
     def nodes(self) -> pd.DataFrame:
@@ -66,11 +67,11 @@ class Nodes:
         return self.__root_node
 
     @property
-    def instances(self) -> pd.DataFrame:
-        """The instances of a candidate graph in his input graph
+    def instances(self) -> np.ndarray:
+        """The instances of a candidate graph in his input graph (row = instance, column = node id)
 
         :return: instances
-        :rtype: pd.DataFrame
+        :rtype: np.ndarray
         """
         return self.__instances
 
@@ -97,9 +98,11 @@ class Nodes:
         self.__right_most_path = path
 
     @instances.setter
-    def instances(self, instances: list):
+    def instances(self, instances: np.ndarray):
         self.__instances = instances
 
     @nodes.setter
     def nodes(self, new_nodes: pd.DataFrame) -> None:
         self.__nodes = new_nodes
+        # the ids can change (e.g. by remapping them to dense ids)
+        self.__node_ids = compute_node_ids(self.__nodes)
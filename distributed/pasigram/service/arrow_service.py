@@ -0,0 +1,72 @@
+import os
+import pandas as pd
+
+########################################################################################################################
+"""This block includes all methods to load an input graph from Parquet or Arrow IPC (Feather) files. Only the columns
+which are used by PaSiGraM are read (id|label for the nodes, id|source|target|label for the edges). The id columns are
+converted into numpy arrays without copying (if they contain no nulls) and the labels are read dictionary encoded, so
+every distinct label is only materialized once and 'dictionary_compression' works on the categorical codes.
+pyarrow is an optional dependency and only imported, if one of these methods is used.
+"""
+
+# columns which are read from the files
+NODE_COLUMNS = ['id', 'label']
+EDGE_COLUMNS = ['id', 'source', 'target', 'label']
+
+# file extensions of Parquet files (all other files are read as Arrow IPC/Feather files)
+PARQUET_EXTENSIONS = ['.parquet', '.parq', '.pq']
+
+
+def read_arrow_graph(nodes_path: str, edges_path: str) -> list:
+    """Method to read the nodes and edges of a graph from Parquet or Arrow IPC files.
+
+    :param str nodes_path: The file with the nodes of the graph (id|label)
+    :param str edges_path: The file with the edges of the graph (id|source|target|label)
+    :return: A list with the nodes and edges (indexed by their ids)
+    :rtype: list[pd.DataFrame, pd.DataFrame]
+    """
+    nodes = arrow_table_to_frame(read_arrow_table(nodes_path, NODE_COLUMNS))
+    edges = arrow_table_to_frame(read_arrow_table(edges_path, EDGE_COLUMNS))
+
+    return [nodes, edges]
+
+
+def read_arrow_table(path: str, columns: list):
+    """Method to read the given columns of a Parquet or Arrow IPC file. The files are memory mapped and the label
+    column is dictionary encoded.
+
+    :param str path: The Parquet or Arrow IPC file
+    :param list columns: The columns to read
+    :return: The table with the projected columns
+    :rtype: pyarrow.Table
+    """
+    try:
+        import pyarrow.compute
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('pyarrow is required to read Parquet/Arrow files (pip install pyarrow)')
+
+    if os.path.splitext(path)[1].lower() in PARQUET_EXTENSIONS:
+        # the dictionary pages of the label column are kept instead of decoding every value
+        table = pyarrow.parquet.read_table(path, columns=columns, memory_map=True, read_dictionary=['label'])
+    else:
+        table = pyarrow.feather.read_table(path, columns=columns, memory_map=True)
+
+    # the label column of Arrow IPC files (or Parquet files without dictionary pages) is encoded here
+    label_position = table.schema.get_field_index('label')
+    if not pyarrow.types.is_dictionary(table.schema.field(label_position).type):
+        table = table.set_column(label_position, 'label', pyarrow.compute.dictionary_encode(table.column('label')))
+
+    return table
+
+
+def arrow_table_to_frame(table) -> pd.DataFrame:
+    """Method to convert a table into a DataFrame indexed by the id column. Every column is converted into its own
+    block (no consolidation), so numeric columns without nulls aren't copied.
+
+    :param pyarrow.Table table: The table (with an id and a dictionary encoded label column)
+    :return: The DataFrame with a categorical label column
+    :rtype: pd.DataFrame
+    """
+    return table.to_pandas(split_blocks=True).set_index('id')
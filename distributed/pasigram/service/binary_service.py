@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+########################################################################################################################
+"""This block includes all methods to store a (compressed) input graph in the binary format of PaSiGraM and to load it
+again. A binary graph is a directory which contains one .npy file for every array of the graph (node and edge arrays
+and the CSR arrays of the csp graph) and a json file with the labels of the dictionary compression.
+The .npy files are stored with 64 byte aligned data, so they can be opened with np.memmap (np.load(mmap_mode='r')).
+Loading a graph is therefore nearly instant and all processes which open the same graph share the same pages.
+"""
+
+# names of the arrays of the nodes and edges sets
+GRAPH_ARRAYS = ['node_ids', 'node_labels', 'edge_ids', 'edge_sources', 'edge_targets', 'edge_labels']
+
+# name of the array with the original ids of the nodes (position = dense id)
+ORIGINAL_NODE_IDS = 'original_node_ids'
+
+# names of the arrays of the csp graph (in the order of the CSPGraph constructor)
+CSP_GRAPH_ARRAYS = ['csp_node_ids', 'csp_labels',
+                    'csp_in_offsets', 'csp_in_neighbours', 'csp_in_edge_labels', 'csp_in_neighbour_labels',
+                    'csp_out_offsets', 'csp_out_neighbours', 'csp_out_edge_labels', 'csp_out_neighbour_labels']
+
+# name of the file with the labels of the dictionary compression
+DICTIONARIES_FILE = 'dictionaries.json'
+
+
+def write_binary_graph(path: str, nodes: pd.DataFrame, edges: pd.DataFrame, node_labels: pd.Index,
+                       edge_labels: pd.Index, original_node_ids: pd.Index, csp_arrays: list) -> None:
+    """Method to write a compressed graph and its csp graph into the binary format.
+
+    :param str path: The directory in which the graph is stored (will be created if necessary)
+    :param pd.DataFrame nodes: The compressed nodes of the graph (id|label)
+    :param pd.DataFrame edges: The compressed edges of the graph (id|source|target|label)
+    :param pd.Index node_labels: The labels of the nodes (position = number)
+    :param pd.Index edge_labels: The labels of the edges (position = number)
+    :param pd.Index original_node_ids: The original ids of the nodes (position = dense id), None if not remapped
+    :param list csp_arrays: The arrays of the csp graph (in the order of 'CSP_GRAPH_ARRAYS')
+    :return:
+    """
+    os.makedirs(path, exist_ok=True)
+
+    graph_arrays = [nodes.index.values, nodes['label'].values, edges.index.values, edges['source'].values,
+                    edges['target'].values, edges['label'].values]
+
+    write_binary_arrays(path, GRAPH_ARRAYS + CSP_GRAPH_ARRAYS, graph_arrays + list(csp_arrays))
+    if original_node_ids is not None:
+        write_binary_arrays(path, [ORIGINAL_NODE_IDS], [original_node_ids.values])
+
+    # the labels are saved ordered by their number
+    dictionaries = {'node_labels': pd.Series(node_labels, dtype=object).tolist(),
+                    'edge_labels': pd.Series(edge_labels, dtype=object).tolist()}
+    with open(os.path.join(path, DICTIONARIES_FILE), 'w') as dictionaries_file:
+        json.dump(dictionaries, dictionaries_file)
+
+
+def write_binary_arrays(path: str, names: list, arrays: list) -> None:
+    """Method to write arrays into .npy files (the data of .npy files is always aligned).
+
+    :param str path: The directory in which the arrays are stored (has to exist)
+    :param list names: The names of the arrays
+    :param list arrays: The arrays to store
+    :return:
+    """
+    for name, array in zip(names, arrays):
+        np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(array))
+
+
+def read_binary_arrays(path: str, names: list) -> list:
+    """Method to open arrays of a binary graph as memory maps.
+
+    :param str path: The directory of the binary graph
+    :param list names: The names of the arrays to open
+    :return: A list with the memory mapped arrays
+    :rtype: list[np.memmap]
+    """
+    return [np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in names]
+
+
+def read_binary_graph(path: str) -> list:
+    """Method to read a graph in the binary format.
+
+    :param str path: The directory of the binary graph
+    :return: A list with the nodes, edges, node labels, edge labels, original node ids (None if the node ids weren't
+        remapped) and the csp graph arrays
+    :rtype: list[pd.DataFrame, pd.DataFrame, pd.Index, pd.Index, pd.Index, list]
+    """
+    node_ids, node_labels, edge_ids, edge_sources, edge_targets, edge_labels = read_binary_arrays(path, GRAPH_ARRAYS)
+
+    nodes = pd.DataFrame({'label': node_labels}, index=pd.Index(node_ids, name='id'))
+    edges = pd.DataFrame({'source': edge_sources, 'target': edge_targets, 'label': edge_labels},
+                         index=pd.Index(edge_ids, name='id'))
+
+    with open(os.path.join(path, DICTIONARIES_FILE)) as dictionaries_file:
+        dictionaries = json.load(dictionaries_file)
+    node_labels = pd.Index(dictionaries['node_labels'])
+    edge_labels = pd.Index(dictionaries['edge_labels'])
+
+    original_node_ids = None
+    if os.path.exists(os.path.join(path, ORIGINAL_NODE_IDS + '.npy')):
+        original_node_ids = pd.Index(read_binary_arrays(path, [ORIGINAL_NODE_IDS])[0], name='id')
+
+    return [nodes, edges, node_labels, edge_labels, original_node_ids, read_binary_arrays(path, CSP_GRAPH_ARRAYS)]
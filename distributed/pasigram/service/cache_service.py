@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import pandas as pd
+from distributed.pasigram.service.binary_service import read_binary_arrays, write_binary_arrays, CSP_GRAPH_ARRAYS
+
+########################################################################################################################
+"""This block includes all methods for the persistent cache of built csp graphs. Every entry of the cache is a
+directory (named by the content hash of the input graph), which contains the CSR arrays of the csp graph in the binary
+format. If the cache grows above its maximum size, the least recently used entries are deleted.
+"""
+
+# default maximum size of the cache in bytes (1 GiB)
+MAX_CACHE_SIZE = 2 ** 30
+
+# version of the layout of the cached csp graphs (part of the hash -> old entries are never loaded)
+CACHE_VERSION = 1
+
+
+def compute_graph_hash(nodes: pd.DataFrame, edges: pd.DataFrame, node_labels: pd.Index, edge_labels: pd.Index) -> str:
+    """Method to compute a hash of the content of a (compressed) graph.
+
+    :param pd.DataFrame nodes: The nodes of the graph
+    :param pd.DataFrame edges: The edges of the graph
+    :param pd.Index node_labels: The labels of the nodes used for compression
+    :param pd.Index edge_labels: The labels of the edges used for compression
+    :return: The hash of the graph (hex digest)
+    :rtype: str
+    """
+    graph_hash = hashlib.sha1(str(CACHE_VERSION).encode())
+
+    # hash the nodes and edges (including their ids) row by row
+    graph_hash.update(pd.util.hash_pandas_object(nodes[['label']], index=True).values.tobytes())
+    graph_hash.update(pd.util.hash_pandas_object(edges[['source', 'target', 'label']], index=True).values.tobytes())
+
+    # hash the labels of the compression (ordered by their number)
+    for labels in [node_labels, edge_labels]:
+        graph_hash.update(json.dumps([str(label) for label in labels]).encode())
+
+    return graph_hash.hexdigest()
+
+
+def load_cached_csp_graph(cache_dir: str, graph_hash: str) -> list:
+    """Method to load the arrays of a cached csp graph.
+
+    :param str cache_dir: The directory of the cache
+    :param str graph_hash: The hash of the graph
+    :return: The memory mapped arrays of the csp graph and the path of the cache entry (None if it's not cached)
+    :rtype: list[list, str]
+    """
+    entry_path = os.path.join(cache_dir, graph_hash)
+
+    if not os.path.isdir(entry_path):
+        return None
+
+    # update the modification time of the entry -> it's the most recently used entry now
+    os.utime(entry_path)
+
+    return [read_binary_arrays(entry_path, CSP_GRAPH_ARRAYS), entry_path]
+
+
+def store_csp_graph(cache_dir: str, graph_hash: str, csp_arrays: list, max_cache_size: int = MAX_CACHE_SIZE) -> str:
+    """Method to store the arrays of a csp graph in the cache.
+
+    :param str cache_dir: The directory of the cache
+    :param str graph_hash: The hash of the graph
+    :param list csp_arrays: The arrays of the csp graph (in the order of 'CSP_GRAPH_ARRAYS')
+    :param int max_cache_size: The maximum size of the cache in bytes
+    :return: The path of the new cache entry
+    :rtype: str
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_path = os.path.join(cache_dir, graph_hash)
+
+    # write the entry into a temporary directory first and rename it afterwards
+    # -> other processes never see a half written entry
+    temp_path = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp_')
+    write_binary_arrays(temp_path, CSP_GRAPH_ARRAYS, csp_arrays)
+    try:
+        os.rename(temp_path, entry_path)
+    except OSError:
+        # another process stored the same entry in the meantime
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+    evict_cache_entries(cache_dir, max_cache_size, keep=graph_hash)
+
+    return entry_path
+
+
+def evict_cache_entries(cache_dir: str, max_cache_size: int, keep: str = None) -> None:
+    """Method to delete the least recently used entries of the cache until its size is below 'max_cache_size'.
+
+    :param str cache_dir: The directory of the cache
+    :param int max_cache_size: The maximum size of the cache in bytes
+    :param str keep: The hash of an entry which should never be deleted (optionally)
+    :return:
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_path = os.path.join(cache_dir, name)
+        if name.startswith('.') or not os.path.isdir(entry_path):
+            continue
+        entry_size = sum(entry.stat().st_size for entry in os.scandir(entry_path))
+        entries.append((os.stat(entry_path).st_mtime, name, entry_size))
+
+    cache_size = sum(entry[2] for entry in entries)
+
+    # delete entries, starting with the least recently used one
+    for _, name, entry_size in sorted(entries):
+        if cache_size <= max_cache_size:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        cache_size -= entry_size
@@ -1,88 +1,367 @@
 import pandas as pd
 import numpy as np
+from hashlib import blake2b
+from distributed.pasigram.model.csp_graph import CSPGraph
 
 ########################################################################################################################
-"""This block includes all methods which are necessary to compute the canonical smallest code for a graph.
+"""This block includes all methods which are necessary to compute the canonical smallest code for a graph. The 
+canonical code is the minimum DFS code of the graph (gSpan): a DFS code lists all edges in the order of a depth first 
+search as tuples (i, j, label of i, edge label, direction, label of j), where i and j are the discovery times of the 
+nodes. The edges are traversed in both directions, the direction is 0 if the edge goes from i to j and 1 otherwise 
+(so the code of a directed multigraph is computed on its underlying undirected multigraph). Two graphs are isomorphic, 
+iff their minimum DFS codes are equal.
 """
 
 
-def build_canonical_smallest_code(csp_graph: pd.DataFrame) -> str:
-    """Method for building the canonical code of a graph.
+def build_canonical_smallest_code(nodes: pd.DataFrame, edges: pd.DataFrame) -> str:
+    """Method for building the canonical code (minimum DFS code) of a graph.
 
-    :param pd.DataFrame csp_graph: The csp_graph of the graph.
+    :param pd.DataFrame nodes: The set of nodes of the graph
+    :param pd.DataFrame edges: The set of edges of the graph
+    :return: The canonical code for the graph
+    :rtype: str
+    """
+    return build_canonical_code_from_state(build_canonical_state(nodes, edges))
+
+
+def build_canonical_code_from_state(canonical_state: dict) -> str:
+    """Method for building the canonical code (minimum DFS code) of a graph out of its canonical state (see
+    'build_canonical_state'), so the nodes and edges DataFrames don't have to be read again.
+
+    :param dict canonical_state: The canonical state of the graph
     :return: The canonical code for the graph
     :rtype: str
     """
-    # todo: Code commenting
-    canonical_code = ''
-    node_codes = {}
+    return build_canonical_embedding_from_state(canonical_state)[0]
+
+
+def build_canonical_embedding_from_state(canonical_state: dict) -> list:
+    """Method for building the canonical code (minimum DFS code) of a graph out of its canonical state together with
+    the nodes of the graph in the order of their discovery times in the minimum DFS code (canonical node order).
+
+    :param dict canonical_state: The canonical state of the graph
+    :return: The canonical code for the graph and the canonical node order
+    :rtype: list[str, list]
+    """
+    dfs_code, node_order = compute_minimum_dfs_embedding(canonical_state['node_labels'], canonical_state['edges'],
+                                                         canonical_state['adjacency'])
+    return [encode_dfs_code(dfs_code), node_order]
+
+
+def build_canonical_state(nodes: pd.DataFrame, edges: pd.DataFrame) -> dict:
+    """Method for building the canonical state of a graph: everything the minimum DFS code is computed from (the label
+    of every node, the edges and the adjacency lists of the underlying undirected multigraph) as plain python objects.
+
+    :param pd.DataFrame nodes: The set of nodes of the graph
+    :param pd.DataFrame edges: The set of edges of the graph
+    :return: The canonical state ('node_labels', 'edges', 'adjacency')
+    :rtype: dict
+    """
+    node_labels = {node: normalize_label(label) for node, label in zip(nodes.index, nodes['label'])}
+    graph_edges = [(source, target, normalize_label(label))
+                   for source, target, label in zip(edges['source'], edges['target'], edges['label'])]
+
+    return {'node_labels': node_labels, 'edges': graph_edges,
+            'adjacency': compute_undirected_adjacency(node_labels, graph_edges)}
+
+
+def build_pattern_canonical_state(labels: tuple, edge_list: tuple) -> dict:
+    """Method for building the canonical state (see 'build_canonical_state') of a pattern out of its tuples, so no
+    DataFrame is needed.
+
+    :param tuple labels: The labels of the nodes of the pattern (position = node id)
+    :param tuple edge_list: The edges of the pattern (source id, target id, edge label)
+    :return: The canonical state ('node_labels', 'edges', 'adjacency')
+    :rtype: dict
+    """
+    node_labels = {node: normalize_label(label) for node, label in enumerate(labels)}
+    graph_edges = [(source, target, normalize_label(label)) for source, target, label in edge_list]
+
+    return {'node_labels': node_labels, 'edges': graph_edges,
+            'adjacency': compute_undirected_adjacency(node_labels, graph_edges)}
+
+
+def extend_canonical_state(canonical_state: dict, new_added_edge: dict, labels) -> dict:
+    """Method to extend the canonical state of a graph with a new edge (and perhaps a new node). Like
+    'Pattern.extend' only the pieces of the two nodes of the new edge are added, the state of the parent graph isn't
+    modified (the containers are copied, the unchanged adjacency lists are shared).
+
+    :param dict canonical_state: The canonical state of the parent graph
+    :param dict new_added_edge: The newly added edge
+    :param labels: The labels of the nodes of the graph (node id -> label, e.g. the 'label' column of the nodes or a
+        dict with the label of the new node)
+    :return: The extended canonical state
+    :rtype: dict
+    """
+    source_node = int(new_added_edge['parent_node_id'])
+    target_node = int(new_added_edge['child_node_id'])
+    edge_label = normalize_label(new_added_edge['edge_label'])
+    edge_id = len(canonical_state['edges'])
+
+    node_labels = canonical_state['node_labels'].copy()
+    adjacency = canonical_state['adjacency'].copy()
 
-    # iterate over all nodes in the csp_graph
-    for i in range(0, len(csp_graph)):
-        node = csp_graph.iloc[i]
+    # a forward edge comes with a new node
+    for node in (source_node, target_node):
+        if node not in node_labels:
+            node_labels[node] = normalize_label(labels[node])
+            adjacency[node] = []
 
-        # get label, ind-/outdegree, in-/outgoing neighbours for the current_node
-        node_label = str(int(node.label))
-        node_indegree = str(int(len(node.ingoing_neighbours)))
-        node_outdegree = str(int(len(node.outgoing_neighbours)))
-        node_ingoing_neighbours: list[list] = node.ingoing_neighbours
-        node_outgoing_neighbours: list[list] = node.outgoing_neighbours
+    # only the adjacency lists of the nodes of the new edge change
+    adjacency[source_node] = adjacency[source_node] + [(edge_id, target_node, edge_label, 0)]
+    adjacency[target_node] = adjacency[target_node] + [(edge_id, source_node, edge_label, 1)]
 
-        # compute the unique code for every node and append them to a dict
-        node_code: str = node_label + node_indegree + node_outdegree
+    return {'node_labels': node_labels, 'edges': canonical_state['edges'] + [(source_node, target_node, edge_label)],
+            'adjacency': adjacency}
 
-        for j in range(len(node_ingoing_neighbours)):
-            node_code += str(int(node_ingoing_neighbours[j][0])) + str(int(node_ingoing_neighbours[j][1]))
 
-        for j in range(len(node_outgoing_neighbours)):
-            node_code += str(int(node_outgoing_neighbours[j][0])) + str(int(node_outgoing_neighbours[j][1]))
+def normalize_label(label):
+    """Method to normalize a label, so equal labels are encoded equally: the compressed (integer) labels can become
+    floats by the row access on DataFrames with mixed types, therefore integral labels are converted to int.
+
+    :param label: The label of a node or an edge
+    :return: The normalized label
+    """
+    if isinstance(label, (int, np.integer)):
+        return int(label)
+    if isinstance(label, (float, np.floating)) and float(label).is_integer():
+        return int(label)
+    return label
+
+
+def encode_dfs_code(dfs_code: list) -> str:
+    """Method to encode a DFS code as string (one '(i,j,label of i,edge label,direction,label of j)' per edge).
+
+    :param list dfs_code: The DFS code (list of edge tuples)
+    :return: The string representation of the DFS code
+    :rtype: str
+    """
+    return ''.join('(' + ','.join(str(value) for value in edge) + ')' for edge in dfs_code)
 
-        if node_code in list(node_codes.keys()):
-            node_codes.update({node_code: node_codes[node_code] + 1})
 
-        else:
-            node_codes.update({node_code: 1})
+def compute_minimum_dfs_embedding(node_labels: dict, edges: list, adjacency: dict = None) -> list:
+    """Method to compute the minimum DFS code of a (connected) graph together with an embedding of the code into the
+    graph. The code is built edge by edge: all embeddings of the minimum code prefix into the graph are extended by
+    all right most extensions and only the embeddings of the minimum extension (see 'compute_dfs_order') are kept.
 
-    # concatenate all node codes to get the final canonical code for the graph
-    node_codes_keys = list(node_codes.keys())
-    node_codes_list = []
-    for key in node_codes_keys:
-        node_name = key + '#' + str(node_codes[key]) + '#'
-        node_codes_list.append(node_name)
+    :param dict node_labels: The label of every node (node id -> label)
+    :param list edges: The edges of the graph (source id, target id, edge label)
+    :param dict adjacency: The adjacency lists of the underlying undirected multigraph (computed if not given)
+    :return: The minimum DFS code (list of edge tuples (i, j, label of i, edge label, direction, label of j)) and the
+        nodes of the graph in the order of their discovery times
+    :rtype: list[list, list]
+    """
+    if adjacency is None:
+        adjacency = compute_undirected_adjacency(node_labels, edges)
+
+    # the first edge: every edge in both directions
+    dfs_code = []
+    embeddings = []
+    for edge_id, (source, target, edge_label) in enumerate(edges):
+        for node_i, node_j, direction in ((source, target, 0), (target, source, 1)):
+            first_edge = (0, 1, node_labels[node_i], edge_label, direction, node_labels[node_j])
+            if len(dfs_code) == 0 or first_edge < dfs_code[0]:
+                dfs_code, embeddings = [first_edge], []
+            if first_edge == dfs_code[0]:
+                embeddings.append(([node_i, node_j], {edge_id}))
+
+    while len(dfs_code) < len(edges):
+        right_most_path = compute_dfs_code_right_most_path(dfs_code)
+        minimum_extension, minimum_order, extended_embeddings = None, None, []
+
+        for nodes, used_edges in embeddings:
+            for extension, extended_embedding in compute_right_most_extensions(nodes, used_edges, right_most_path,
+                                                                               node_labels, adjacency):
+                order = compute_dfs_order(extension)
+                if minimum_order is None or order < minimum_order:
+                    minimum_extension, minimum_order, extended_embeddings = extension, order, []
+                if order == minimum_order:
+                    extended_embeddings.append(extended_embedding)
+
+        dfs_code.append(minimum_extension)
+        embeddings = extended_embeddings
+
+    return [dfs_code, embeddings[0][0]]
+
+
+def is_minimum_dfs_code(node_labels: dict, edges: list, dfs_code: list, adjacency: dict = None) -> bool:
+    """Method to check if a DFS code of a graph is its minimum DFS code. The minimum code is built like in
+    'compute_minimum_dfs_embedding', but the check stops as soon as the graph has a smaller extension than the code.
+
+    :param dict node_labels: The label of every node (node id -> label)
+    :param list edges: The edges of the graph (source id, target id, edge label)
+    :param list dfs_code: A DFS code of the graph
+    :param dict adjacency: The adjacency lists of the underlying undirected multigraph (computed if not given)
+    :return: True, if the DFS code is the minimum DFS code of the graph
+    :rtype: bool
+    """
+    if adjacency is None:
+        adjacency = compute_undirected_adjacency(node_labels, edges)
+
+    # the first edge: no edge may be smaller than the first edge of the code
+    embeddings = []
+    for edge_id, (source, target, edge_label) in enumerate(edges):
+        for node_i, node_j, direction in ((source, target, 0), (target, source, 1)):
+            first_edge = (0, 1, node_labels[node_i], edge_label, direction, node_labels[node_j])
+            if first_edge < dfs_code[0]:
+                return False
+            if first_edge == dfs_code[0]:
+                embeddings.append(([node_i, node_j], {edge_id}))
+
+    for position in range(1, len(dfs_code)):
+        right_most_path = compute_dfs_code_right_most_path(dfs_code[:position])
+        code_order = compute_dfs_order(dfs_code[position])
+        extended_embeddings = []
+
+        for nodes, used_edges in embeddings:
+            for extension, extended_embedding in compute_right_most_extensions(nodes, used_edges, right_most_path,
+                                                                               node_labels, adjacency):
+                order = compute_dfs_order(extension)
+                if order < code_order:
+                    return False
+                if order == code_order:
+                    extended_embeddings.append(extended_embedding)
+
+        embeddings = extended_embeddings
+
+    return True
+
+
+def compute_undirected_adjacency(node_labels: dict, edges: list) -> dict:
+    """Method to compute the adjacency lists of the underlying undirected multigraph of a graph.
+
+    :param dict node_labels: The label of every node (node id -> label)
+    :param list edges: The edges of the graph (source id, target id, edge label)
+    :return: The adjacency list of every node (node id -> list of (edge id, neighbour id, edge label, direction))
+    :rtype: dict
+    """
+    adjacency = {node: [] for node in node_labels}
+    for edge_id, (source, target, edge_label) in enumerate(edges):
+        adjacency[source].append((edge_id, target, edge_label, 0))
+        adjacency[target].append((edge_id, source, edge_label, 1))
+    return adjacency
 
-    sorted_node_nodes_list = sorted(node_codes_list)
 
-    for key in sorted_node_nodes_list:
-        canonical_code += key
+def compute_dfs_code_right_most_path(dfs_code: list) -> list:
+    """Method to compute the right most path of a DFS code (the path of forward edges from the first to the last
+    discovered node).
 
-    return canonical_code
+    :param list dfs_code: The DFS code (list of edge tuples)
+    :return: The discovery times of the nodes on the right most path (from the right most node to the root)
+    :rtype: list
+    """
+    parents = {}
+    for edge in dfs_code:
+        # forward edges discover a new node
+        if edge[0] < edge[1]:
+            parents[edge[1]] = edge[0]
+
+    right_most_path = [max(parents)]
+    while right_most_path[-1] in parents:
+        right_most_path.append(parents[right_most_path[-1]])
+    return right_most_path
+
+
+def compute_right_most_extensions(nodes: list, used_edges: set, right_most_path: list, node_labels: dict,
+                                  adjacency: dict) -> list:
+    """Method to compute all right most extensions of an embedding of a DFS code: backward edges from the right most
+    node to a node on the right most path and forward edges from a node on the right most path to a new node.
+
+    :param list nodes: The graph nodes of the embedding (index = discovery time)
+    :param set used_edges: The ids of the edges of the embedding
+    :param list right_most_path: The discovery times of the nodes on the right most path (right most node first)
+    :param dict node_labels: The label of every node (node id -> label)
+    :param dict adjacency: The adjacency lists of the underlying undirected multigraph
+    :return: The extensions (edge tuple) with the extended embeddings
+    :rtype: list[tuple, tuple[list, set]]
+    """
+    extensions = []
+    discovery_times = {node: time for time, node in enumerate(nodes)}
+    right_most_node = right_most_path[0]
+    on_right_most_path = set(right_most_path)
+
+    for time in right_most_path:
+        for edge_id, neighbour, edge_label, direction in adjacency[nodes[time]]:
+            if edge_id in used_edges:
+                continue
+            if neighbour not in discovery_times:
+                # forward edge to a new node
+                extension = (time, len(nodes), node_labels[nodes[time]], edge_label, direction,
+                             node_labels[neighbour])
+                extensions.append((extension, (nodes + [neighbour], used_edges | {edge_id})))
+            elif time == right_most_node and discovery_times[neighbour] in on_right_most_path:
+                # backward edge from the right most node
+                extension = (time, discovery_times[neighbour], node_labels[nodes[time]], edge_label, direction,
+                             node_labels[neighbour])
+                extensions.append((extension, (nodes, used_edges | {edge_id})))
+    return extensions
+
+
+def compute_dfs_order(extension: tuple) -> tuple:
+    """Method to compute the sort key of a right most extension in the DFS lexicographic order: backward edges are
+    smaller than forward edges, backward edges to an earlier discovered node are smaller and forward edges from a
+    later discovered node are smaller, otherwise the labels decide.
+
+    :param tuple extension: The extension (i, j, label of i, edge label, direction, label of j)
+    :return: The sort key of the extension
+    :rtype: tuple
+    """
+    node_i, node_j, _, edge_label, direction, label_j = extension
+    if node_i >= node_j:
+        return 0, node_j, edge_label, direction
+    return 1, -node_i, edge_label, direction, label_j
 
 
 ########################################################################################################################
-"""This block computes just the labels of all nodes in the right most path
+"""This block includes all methods which are necessary to compute the Weisfeiler-Lehman hash of a graph: every node is 
+colored by its label, then the colors are refined for a fixed number of iterations by the multiset of the (edge label, 
+direction, color) of all neighbours. The hash is a 64-bit integer computed out of the multiset of the final colors. 
+Isomorphic graphs have the same hash, but non-isomorphic graphs can have the same hash too, so the hash is only a cheap 
+prefilter for the comparison of the canonical codes.
 """
 
+WL_ITERATIONS = 3
 
-def compute_right_most_path_labels(right_most_path: list, nodes: pd.DataFrame) -> list:
-    """Method for computing the labels of all nodes on the right-most-path.
 
-    :param list right_most_path: A list of all nodes on the right-most-path
-    :param pd.DataFrame nodes: All nodes of the graph
-    :return: A list with all labels of all nodes on the right-most-path
-    :rtype: list
+def compute_wl_hash(canonical_state: dict, iterations: int = WL_ITERATIONS) -> int:
+    """Method to compute the Weisfeiler-Lehman hash of a graph out of its canonical state (see 'build_canonical_state').
+
+    :param dict canonical_state: The canonical state of the graph
+    :param int iterations: The number of refinement iterations
+    :return: The 64-bit hash of the graph
+    :rtype: int
     """
-    right_most_path_labels = []
+    adjacency = canonical_state['adjacency']
+
+    # the initial color of every node is its label
+    colors = {node: hash_value(label) for node, label in canonical_state['node_labels'].items()}
 
-    for i in range(0, len(right_most_path)):
-        current_node_label = nodes.loc[right_most_path[i]]['label']
-        right_most_path_labels.append(current_node_label)
+    for _ in range(iterations):
+        # the new color of a node combines its color with the colors of its neighbours (and the edges to them)
+        colors = {node: hash_value((color, sorted((edge_label, direction, colors[neighbour])
+                                                  for _, neighbour, edge_label, direction in adjacency[node])))
+                  for node, color in colors.items()}
 
-    return right_most_path_labels
+    return hash_value((len(canonical_state['edges']), sorted(colors.values())))
+
+
+def hash_value(value) -> int:
+    """Method to hash a value (e.g. a label or a tuple of labels and colors) to a 64-bit integer. Unlike 'hash' the
+    result doesn't depend on the process (strings are hashed randomized per process), so the hashes computed by
+    different processes can be compared.
+
+    :param value: The value to hash
+    :return: The 64-bit hash of the value
+    :rtype: int
+    """
+    return int.from_bytes(blake2b(repr(value).encode(), digest_size=8).digest(), 'little')
 
 
 ########################################################################################################################
 """This block includes all methods which are necessary to compute the csp graph representation. 
-It's mostly used to generate the csp graph of the (large) input graph with a multiple of joins of different data sets.
+It's mostly used to generate the csp graph of the (large) input graph. 'build_csp_graph' computes the DataFrame 
+representation with a multiple of joins of different data sets, 'build_csr_csp_graph' computes the CSR representation
+(which is used for input graphs) with a few vectorized numpy operations.
 To generate the csp graph of the initial patterns/new candidates other methods are used (due to performance reasons).
 """
 
@@ -148,6 +427,44 @@ def replace_nan(x) -> list:
         return x
 
 
+def build_csr_csp_graph(nodes: pd.DataFrame, edges: pd.DataFrame) -> CSPGraph:
+    """Method to compute the csp graph in CSR format. In contrast to 'build_csp_graph' no python lists are built: the
+    edge arrays are sorted once per direction by (node, edge label, neighbour label, neighbour id), the degrees are
+    computed with np.bincount and the offsets with np.cumsum. Runs in O(E log E).
+
+    :param pd.DataFrame nodes: The set of (compressed) nodes of the graph
+    :param pd.DataFrame edges: The set of (compressed) edges of the graph
+    :return: CSP graph
+    :rtype: CSPGraph
+    """
+    node_ids = np.asarray(nodes.index, dtype=np.int32)
+    labels = np.asarray(nodes['label'], dtype=np.int32)
+
+    # translate the node ids of the edges into positions (edges with unknown nodes are ignored)
+    sources = nodes.index.get_indexer(edges['source'])
+    targets = nodes.index.get_indexer(edges['target'])
+    edge_labels = np.asarray(edges['label'], dtype=np.int32)
+    known_edges = (sources >= 0) & (targets >= 0)
+    sources, targets, edge_labels = sources[known_edges], targets[known_edges], edge_labels[known_edges]
+
+    csr_arrays = []
+    # the ingoing neighbours are grouped by the target, the outgoing neighbours by the source of the edges
+    for nodes_positions, neighbours_positions in [(targets, sources), (sources, targets)]:
+        neighbour_ids = node_ids[neighbours_positions]
+        neighbour_labels = labels[neighbours_positions]
+
+        # sort the edges by (node, edge label, neighbour label, neighbour id) -> the last key is the primary key
+        order = np.lexsort((neighbour_ids, neighbour_labels, edge_labels, nodes_positions))
+
+        # degree of every node and the start of its neighbours in the sorted arrays
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes_positions, minlength=len(node_ids)), out=offsets[1:])
+
+        csr_arrays.extend([offsets, neighbour_ids[order], edge_labels[order], neighbour_labels[order]])
+
+    return CSPGraph(node_ids, labels, *csr_arrays)
+
+
 ########################################################################################################################
 """This block includes all methods which are used to compute the csp graph for the initial candidates.
 WARNING: this approach to build the csp graph is very slow for big graphs, but faster than the join-based approach for
@@ -184,12 +501,49 @@ def create_initial_csp_graph(keyset: list, nodes: pd.DataFrame, edges: pd.DataFr
         node_outdegree = len(outgoing_neighbour_list)
 
         # insert all entries for the current node into 'csp_graph'
-        csp_graph.at[node_id] = np.array([node_label, node_indegree, node_outdegree, ingoing_neighbour_list,
+        csp_graph.loc[node_id] = np.array([node_label, node_indegree, node_outdegree, ingoing_neighbour_list,
                                  outgoing_neighbour_list], dtype=object)
 
     return csp_graph
 
 
+def build_pattern_csp_graph(labels: tuple, edge_list: tuple) -> pd.DataFrame:
+    """Method to compute the csp graph of a pattern out of its tuples (same format as 'create_initial_csp_graph' and
+    'build_csp_graph'). The DataFrame is built at once instead of row by row.
+
+    :param tuple labels: The labels of the nodes of the pattern (position = node id)
+    :param tuple edge_list: The edges of the pattern (source id, target id, edge label)
+    :return: Csp graph
+    :rtype: pd.DataFrame
+    """
+    ingoing_neighbours, outgoing_neighbours = compute_pattern_neighbours(labels, edge_list)
+
+    rows = [[label, len(ingoing_neighbours[node]), len(outgoing_neighbours[node]), ingoing_neighbours[node],
+             outgoing_neighbours[node]] for node, label in enumerate(labels)]
+
+    return pd.DataFrame(rows, columns=['label', 'indegree', 'outdegree', 'ingoing_neighbours', 'outgoing_neighbours'],
+                        dtype=object)
+
+
+def compute_pattern_neighbours(labels: tuple, edge_list: tuple) -> list:
+    """Method to compute the sorted ingoing and outgoing neighbour lists [edge label, node label, node id] of all nodes
+    of a pattern out of its tuples (the neighbour lists of the csp graph, without building the csp graph).
+
+    :param tuple labels: The labels of the nodes of the pattern (position = node id)
+    :param tuple edge_list: The edges of the pattern (source id, target id, edge label)
+    :return: The ingoing and the outgoing neighbour lists (position = node id)
+    :rtype: list[list, list]
+    """
+    ingoing_neighbours = [[] for _ in labels]
+    outgoing_neighbours = [[] for _ in labels]
+    for source, target, edge_label in edge_list:
+        outgoing_neighbours[source].append([edge_label, labels[target], target])
+        ingoing_neighbours[target].append([edge_label, labels[source], source])
+
+    return [[sorted(neighbours) for neighbours in ingoing_neighbours],
+            [sorted(neighbours) for neighbours in outgoing_neighbours]]
+
+
 def compute_adjacency_lists(current_node_id: int, nodes: pd.DataFrame, edges: pd.DataFrame) -> dict:
     """Method to compute the adjacency list for a node.
 
@@ -241,85 +595,115 @@ def compute_adjacency_lists(current_node_id: int, nodes: pd.DataFrame, edges: pd
 
 
 ########################################################################################################################
-"""This block includes all methods which are used to extend an existing csp graph of a graph object, if a new edge 
-is added. It's unimportant if the edges comes with one or zero new nodes. Logic for all cases are encapsulated 
-in the methods. This approach follows an dynamic programming approach, where one don't have to compute everything new,
-but just add the new pieces (in that case the new edge (and perhaps the new node)). 
+"""This block includes all methods which are necessary to do a dictionary compression for the nodes and edges set 
+of a graph. There labels will be replaced by numbers and the mappings are saved in an index (for both - edges 
+and nodes), where the position of a label is its number. This will compress the graph in size and will lead to a 
+better performance of the whole algorithm. This is mainly used to compress the input graph, because all subgraphs will
+be generated out of the input graph. The same indexes are used to decode the mined patterns in bulk.
 """
 
 
-def extend_csp_graph(csp_graph: pd.DataFrame, new_added_edge: dict, nodes: pd.DataFrame) -> pd.DataFrame:
-    """Method to extend an existing csp graph with a new edge (and the corresponding nodes)
+def dictionary_compression(nodes: pd.DataFrame, edges: pd.DataFrame) -> list:
+    """Method to apply a dictionary compression on the edges and nodes DataFrames. The given DataFrames aren't
+    modified.
 
-    :param pd.DataFrame csp_graph: The csp graph of the respective graph object
-    :param dict new_added_edge: The newly added edge
-    :param pd.DataFrame nodes: The set of all nodes of the graph
-    :return: Extended csp graph
-    :rtype: pd.DataFrame
+    :param pd.DataFrame nodes: Set of all nodes of the graph
+    :param pd.DataFrame edges: Set of all edges of the graph
+    :return: A set with the indexes of the node and edge labels (position = number), and the new compressed nodes and
+        edges sets.
+    :rtype: list[pd.Index, pd.Index, pd.DataFrame, pd.DataFrame]
     """
-    # get the source and target node of the new edge
-    source_node = int(new_added_edge['parent_node_id'])
-    target_node = int(new_added_edge['child_node_id'])
+    # replace every label by the position of its first occurrence
+    node_codes, node_labels = pd.factorize(nodes['label'])
+    edge_codes, edge_labels = pd.factorize(edges['label'])
+    # categorical labels (e.g. read from Arrow files) are factorized by their codes -> store their labels as plain index
+    node_labels = pd.Index(np.asarray(node_labels))
+    edge_labels = pd.Index(np.asarray(edge_labels))
 
-    # if the source node is already in csp graph included -> edit it's 'outdegree' and 'outgoing_neighbours'
-    if source_node in list(csp_graph.index):
-        csp_graph.loc[source_node, 'outdegree'] += 1
-        outgoing_neighbours = csp_graph.loc[source_node]['outgoing_neighbours'].copy()
-        outgoing_neighbours.append([new_added_edge['edge_label'], nodes.loc[target_node]['label'], target_node])
-        new_outgoing_neighbours = sorted(outgoing_neighbours)
-        csp_graph.at[source_node, 'outgoing_neighbours'] = new_outgoing_neighbours
+    # build new DataFrames with the compact label numbers (the other columns aren't copied)
+    compressed_nodes = nodes.assign(label=node_codes.astype(compute_label_dtype(len(node_labels))))
+    compressed_edges = edges.assign(label=edge_codes.astype(compute_label_dtype(len(edge_labels))))
 
-    # if source node isn't already in the csp graph included -> add it completely new to the csp graph
-    else:
-        source_node_label = nodes.at[source_node, 'label']
-        outgoing_neighbours = [[new_added_edge['edge_label'], nodes.loc[target_node]['label'], target_node]]
-        csp_graph.at[source_node] = np.array([source_node_label, 0, 1, [], outgoing_neighbours], dtype=object)
-
-    # if the target node is already in csp graph included -> edit it's 'indegree' and 'ingoing_neighbours'
-    if target_node in list(csp_graph.index):
-        csp_graph.loc[target_node, 'indegree'] += 1
-        ingoing_neighbours = csp_graph.loc[target_node]['ingoing_neighbours'].copy()
-        ingoing_neighbours.append([new_added_edge['edge_label'], nodes.loc[source_node]['label'], source_node])
-        new_ingoing_neighbours = sorted(ingoing_neighbours)
-        csp_graph.at[target_node, 'ingoing_neighbours'] = new_ingoing_neighbours
-
-    # if target node isn't already in the csp graph included -> add it completely new to the csp graph
-    else:
-        target_node_label = nodes.loc[target_node]['label']
-        ingoing_neighbours = [[new_added_edge['edge_label'], nodes.loc[source_node]['label'], source_node]]
-        csp_graph.at[target_node] = np.array([target_node_label, 1, 0, ingoing_neighbours, []], dtype=object)
+    return [node_labels, edge_labels, compressed_nodes, compressed_edges]
 
-    return csp_graph
+
+def compute_label_dtype(number_of_labels: int) -> type:
+    """Method to compute the smallest integer type for a number of labels.
+
+    :param int number_of_labels: The number of different labels
+    :return: np.int16 or np.int32
+    :rtype: type
+    """
+    if number_of_labels <= np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+def decode_patterns(patterns: pd.Series, node_labels: pd.Index, edge_labels: pd.Index) -> list:
+    """Method to decode the (compressed) labels of a set of patterns back into the original labels. The nodes and edges
+    of all patterns are concatenated and decoded at once.
+
+    :param pd.Series patterns: The Graph objects of the patterns (e.g. the 'graph' column of the frequent subgraphs)
+    :param pd.Index node_labels: The index of the node labels (position = number)
+    :param pd.Index edge_labels: The index of the edge labels (position = number)
+    :return: The nodes (pattern|id|label) and edges (pattern|id|source|target|label) of all patterns with the original
+        labels
+    :rtype: list[pd.DataFrame, pd.DataFrame]
+    """
+    columns = [['label'], ['source', 'target', 'label']]
+    if len(patterns) == 0:
+        return [pd.DataFrame(columns=columns[0]), pd.DataFrame(columns=columns[1])]
+
+    # concatenate the nodes and edges of all patterns, the keys of the patterns are the first index level
+    nodes = pd.concat([pattern.nodes for pattern in patterns], keys=list(patterns.index), names=['pattern', 'id'])
+    edges = pd.concat([pattern.edges for pattern in patterns], keys=list(patterns.index), names=['pattern', 'id'])
+
+    # replace the numbers with the labels at their position
+    nodes['label'] = node_labels.take(nodes['label'].values.astype(np.int64))
+    edges['label'] = edge_labels.take(edges['label'].values.astype(np.int64))
+
+    return [nodes[columns[0]], edges[columns[1]]]
 
 
 ########################################################################################################################
-"""This block includes all methods which are necessary to do a dictionary compression for the nodes and edges set 
-of a graph. There labels will be replaced by numbers and the mappings are saved in a dictionary (for both - edges 
-and nodes). This will compress the graph in size and will lead to a better performance of the whole algorithm. 
-This is mainly used to compress the input graph, because all subgraphs will be generated out of the input graph. 
+"""This block includes all methods to remap the (sparse) node ids of the input graph to dense ids 0..N-1 (the position
+of the node). With dense ids every lookup of a node is a plain array access instead of a pandas label lookup. The
+original ids are kept in an index (position = dense id) to translate the instances of mined patterns back.
 """
 
 
-def dictionary_compression(nodes: pd.DataFrame, edges: pd.DataFrame) -> list:
-    """Method to apply a dictionary compression on the edges and nodes DataFrames
+def remap_node_ids(nodes: pd.DataFrame, edges: pd.DataFrame) -> list:
+    """Method to replace the ids of the nodes by their positions. The sources and targets of the edges are remapped
+    accordingly (int32), edges with unknown nodes are dropped. The given DataFrames aren't modified.
 
     :param pd.DataFrame nodes: Set of all nodes of the graph
     :param pd.DataFrame edges: Set of all edges of the graph
-    :return: A set with dictionaries for the node and edges labels, and the new compressed nodes and edges sets.
-    :rtype: list[dict, dict, pd.DataFrame, pd.DataFrame]
+    :return: The index of the original node ids (position = new id) and the remapped nodes and edges sets
+    :rtype: list[pd.Index, pd.DataFrame, pd.DataFrame]
     """
-    # get the unique node and edge labels
-    unique_node_labels: list = list(nodes.label.unique()).copy()
-    unique_edge_labels: list = list(edges.label.unique()).copy()
+    original_node_ids = nodes.index
 
-    # create dictionaries for the node and edge labels
-    # key = node/edge label
-    # value = random number (int)
-    node_dict: dict = dict(zip(unique_node_labels, range(0, len(unique_node_labels))))
-    edge_dict: dict = dict(zip(unique_edge_labels, range(0, len(unique_edge_labels))))
+    # translate the sources and targets into positions
+    sources = original_node_ids.get_indexer(edges['source'])
+    targets = original_node_ids.get_indexer(edges['target'])
+    known_edges = (sources >= 0) & (targets >= 0)
 
-    # replace the values of edge/node labels with the corresponding in the dictionary
-    nodes['label'] = nodes['label'].map(node_dict)
-    edges['label'] = edges['label'].map(edge_dict)
+    remapped_nodes = nodes.set_axis(pd.RangeIndex(len(nodes), name=original_node_ids.name), axis='index')
+    remapped_edges = edges[known_edges].assign(source=sources[known_edges].astype(np.int32),
+                                               target=targets[known_edges].astype(np.int32))
+
+    return [original_node_ids, remapped_nodes, remapped_edges]
+
+
+def decode_instances(instances: np.ndarray, original_node_ids: pd.Index) -> pd.DataFrame:
+    """Method to translate the instances of a pattern (dense node ids of the input graph) back into the original ids.
+
+    :param np.ndarray instances: The instances of the pattern (row = instance, column = pattern node id,
+        value = dense input graph node id)
+    :param pd.Index original_node_ids: The index of the original node ids (position = dense id)
+    :return: The instances with the original node ids (row = instance, column = pattern node id)
+    :rtype: pd.DataFrame
+    """
+    instances = pd.DataFrame(list(instances))
 
-    return [node_dict, edge_dict, nodes, edges]
+    return instances.apply(lambda dense_ids: original_node_ids.take(dense_ids.values.astype(np.int64)))
@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from distributed.pasigram.service.binary_service import DICTIONARIES_FILE, ORIGINAL_NODE_IDS
+from distributed.pasigram.service.graph_service import compute_label_dtype
+
+########################################################################################################################
+"""This block includes all methods to convert a graph from csv files into the binary format without loading the whole
+edge list into memory. The edges are read in chunks, their labels are factorized incrementally and all arrays are
+written directly into memory mapped .npy files:
+1. The edges are compressed chunk by chunk into a temporary file and the degrees of all nodes are counted.
+2. The CSR offsets are computed out of the degrees and the edges are scattered into their CSR slots.
+3. The neighbours of every node are sorted by (edge label, neighbour label, neighbour id) in blocks of nodes.
+The node ids are remapped to dense ids 0..N-1 (see 'remap_node_ids'), the original ids are stored separately.
+Only the node arrays (ids, labels, degrees) and one chunk of edges have to fit into memory.
+"""
+
+# default number of rows which are read from the csv files at once
+CHUNK_SIZE = 10 ** 6
+
+
+def stream_csv_to_binary(nodes_path: str, edges_path: str, path: str, sep: str = ';',
+                         chunk_size: int = CHUNK_SIZE) -> None:
+    """Method to convert a graph from csv files (nodes: id|label, edges: id|source|target|label) into the binary
+    format by streaming the edges in chunks.
+
+    :param str nodes_path: The csv file with the nodes of the graph
+    :param str edges_path: The csv file with the edges of the graph
+    :param str path: The directory in which the binary graph is stored (will be created if necessary)
+    :param str sep: The separator of the csv files
+    :param int chunk_size: The number of rows which are read and processed at once
+    :return:
+    """
+    os.makedirs(path, exist_ok=True)
+
+    # read the nodes in chunks and factorize their labels incrementally
+    node_label_index = pd.Index([])
+    node_ids_chunks = []
+    node_codes_chunks = []
+    for nodes_chunk in pd.read_csv(nodes_path, sep=sep, chunksize=chunk_size):
+        node_label_index, node_codes = factorize_incrementally(node_label_index, nodes_chunk['label'])
+        node_ids_chunks.append(nodes_chunk['id'].values)
+        node_codes_chunks.append(node_codes)
+    original_node_ids = np.concatenate(node_ids_chunks)
+    node_labels = np.concatenate(node_codes_chunks).astype(np.int32)
+    node_positions = pd.Index(original_node_ids)
+    number_of_nodes = len(original_node_ids)
+
+    # 1. compress the edges chunk by chunk into a temporary file (edge id, source, target, label per row)
+    #    and count the degrees of all nodes
+    indegree = np.zeros(number_of_nodes, dtype=np.int64)
+    outdegree = np.zeros(number_of_nodes, dtype=np.int64)
+    edge_label_index = pd.Index([])
+    raw_edges_file, raw_edges_path = tempfile.mkstemp(dir=path, suffix='.raw')
+    number_of_edges = 0
+    with os.fdopen(raw_edges_file, 'wb') as raw_edges:
+        for edges_chunk in pd.read_csv(edges_path, sep=sep, chunksize=chunk_size):
+            sources = node_positions.get_indexer(edges_chunk['source'])
+            targets = node_positions.get_indexer(edges_chunk['target'])
+            edge_label_index, edge_codes = factorize_incrementally(edge_label_index, edges_chunk['label'])
+
+            # edges with unknown nodes are ignored
+            known_edges = (sources >= 0) & (targets >= 0)
+            rows = np.stack((edges_chunk['id'].values[known_edges], sources[known_edges], targets[known_edges],
+                             edge_codes[known_edges]), axis=1).astype(np.int64)
+            raw_edges.write(rows.tobytes())
+
+            indegree += np.bincount(rows[:, 2], minlength=number_of_nodes)
+            outdegree += np.bincount(rows[:, 1], minlength=number_of_nodes)
+            number_of_edges += len(rows)
+
+    edges = np.memmap(raw_edges_path, dtype=np.int64, mode='r', shape=(number_of_edges, 4))
+
+    # write the node and edge arrays
+    open_array(path, ORIGINAL_NODE_IDS, original_node_ids.dtype, number_of_nodes)[:] = original_node_ids
+    open_array(path, 'node_ids', np.int64, number_of_nodes)[:] = np.arange(number_of_nodes)
+    open_array(path, 'node_labels', compute_label_dtype(len(node_label_index)), number_of_nodes)[:] = node_labels
+    edge_arrays = [open_array(path, 'edge_ids', np.int64, number_of_edges),
+                   open_array(path, 'edge_sources', np.int32, number_of_edges),
+                   open_array(path, 'edge_targets', np.int32, number_of_edges),
+                   open_array(path, 'edge_labels', compute_label_dtype(len(edge_label_index)), number_of_edges)]
+    for start in range(0, number_of_edges, chunk_size):
+        chunk = edges[start:start + chunk_size]
+        edge_arrays[0][start:start + len(chunk)] = chunk[:, 0]
+        edge_arrays[1][start:start + len(chunk)] = chunk[:, 1]
+        edge_arrays[2][start:start + len(chunk)] = chunk[:, 2]
+        edge_arrays[3][start:start + len(chunk)] = chunk[:, 3]
+
+    # write the csp graph arrays
+    open_array(path, 'csp_node_ids', np.int32, number_of_nodes)[:] = np.arange(number_of_nodes)
+    open_array(path, 'csp_labels', np.int32, number_of_nodes)[:] = node_labels
+    # the ingoing neighbours are grouped by the target (column 2), the outgoing neighbours by the source (column 1)
+    for direction, node_column, neighbour_column, degree in [('in', 2, 1, indegree), ('out', 1, 2, outdegree)]:
+        offsets = open_array(path, 'csp_' + direction + '_offsets', np.int64, number_of_nodes + 1)
+        offsets[0] = 0
+        np.cumsum(degree, out=offsets[1:])
+
+        csr_arrays = [open_array(path, 'csp_' + direction + '_neighbours', np.int32, number_of_edges),
+                      open_array(path, 'csp_' + direction + '_edge_labels', np.int32, number_of_edges),
+                      open_array(path, 'csp_' + direction + '_neighbour_labels', np.int32, number_of_edges)]
+
+        # 2. scatter the edges into the CSR slots of their nodes
+        write_positions = np.array(offsets[:-1])
+        for start in range(0, number_of_edges, chunk_size):
+            chunk = edges[start:start + chunk_size]
+            chunk_nodes = chunk[:, node_column]
+            chunk_neighbours = chunk[:, neighbour_column]
+
+            # rank of every edge among the edges of the same node inside the chunk
+            order = np.argsort(chunk_nodes, kind='stable')
+            sorted_nodes = chunk_nodes[order]
+            group_starts = np.flatnonzero(np.r_[True, sorted_nodes[1:] != sorted_nodes[:-1]])
+            ranks = np.arange(len(order)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(order)]))
+
+            slots = write_positions[sorted_nodes] + ranks
+            csr_arrays[0][slots] = chunk_neighbours[order]
+            csr_arrays[1][slots] = chunk[order, 3]
+            csr_arrays[2][slots] = node_labels[chunk_neighbours[order]]
+            write_positions += np.bincount(chunk_nodes, minlength=number_of_nodes)
+
+        # 3. sort the neighbours of every node in blocks of nodes with at most 'chunk_size' edges
+        sort_csr_segments(offsets, csr_arrays, chunk_size)
+
+        for csr_array in csr_arrays:
+            csr_array.flush()
+
+    del edges
+    os.remove(raw_edges_path)
+
+    # the labels are saved ordered by their number
+    dictionaries = {'node_labels': pd.Series(node_label_index, dtype=object).tolist(),
+                    'edge_labels': pd.Series(edge_label_index, dtype=object).tolist()}
+    with open(os.path.join(path, DICTIONARIES_FILE), 'w') as dictionaries_file:
+        json.dump(dictionaries, dictionaries_file)
+
+
+def factorize_incrementally(label_index: pd.Index, labels: pd.Series) -> list:
+    """Method to factorize a chunk of labels. Labels which aren't already in 'label_index' get the next numbers in the
+    order of their first occurrence, so the result is the same as factorizing all chunks at once.
+
+    :param pd.Index label_index: The labels of the previous chunks (position = number)
+    :param pd.Series labels: The labels of the current chunk
+    :return: The extended label index and the numbers of the labels
+    :rtype: list[pd.Index, np.ndarray]
+    """
+    codes = label_index.get_indexer(labels)
+    new_labels = pd.unique(labels[codes < 0])
+
+    if len(new_labels) > 0:
+        label_index = label_index.append(pd.Index(new_labels))
+        codes = label_index.get_indexer(labels)
+
+    return [label_index, codes]
+
+
+def sort_csr_segments(offsets: np.ndarray, csr_arrays: list, chunk_size: int) -> None:
+    """Method to sort the neighbours of all nodes by (edge label, neighbour label, neighbour id), processing blocks of
+    consecutive nodes with at most 'chunk_size' edges at once (a single node with more edges forms its own block).
+
+    :param np.ndarray offsets: The CSR offsets
+    :param list csr_arrays: The neighbour ids, edge labels and neighbour labels
+    :param int chunk_size: The maximum number of edges per block
+    :return:
+    """
+    neighbours, edge_labels, neighbour_labels = csr_arrays
+    number_of_nodes = len(offsets) - 1
+    first_node = 0
+
+    while first_node < number_of_nodes:
+        # find the last node of the block
+        last_node = int(np.searchsorted(offsets, offsets[first_node] + chunk_size, side='right')) - 1
+        last_node = min(max(last_node, first_node + 1), number_of_nodes)
+        start, end = offsets[first_node], offsets[last_node]
+
+        if end > start:
+            block_nodes = np.repeat(np.arange(first_node, last_node), np.diff(offsets[first_node:last_node + 1]))
+            order = np.lexsort((neighbours[start:end], neighbour_labels[start:end], edge_labels[start:end],
+                                block_nodes))
+            for csr_array in csr_arrays:
+                csr_array[start:end] = csr_array[start:end][order]
+
+        first_node = last_node
+
+
+def open_array(path: str, name: str, dtype: type, length: int) -> np.memmap:
+    """Method to create a new memory mapped .npy file.
+
+    :param str path: The directory of the binary graph
+    :param str name: The name of the array
+    :param type dtype: The type of the array
+    :param int length: The length of the array
+    :return: The memory mapped array
+    :rtype: np.memmap
+    """
+    return np.lib.format.open_memmap(os.path.join(path, name + '.npy'), mode='w+', dtype=dtype, shape=(length,))
@@ -1,64 +1,348 @@
 from unittest import TestCase
+from itertools import permutations
+import numpy as np
 import pandas as pd
-from pasigram.controller.csp.frequency_calculator import FrequencyCalculator
-from pasigram.model.graph import Graph
+from distributed.pasigram.model.graph import Graph
+from distributed.pasigram.model.pattern import Pattern
+from distributed.pasigram.controller.csp.evaluator_utils import compute_potential_assigments, prune_domains, \
+    evaluate_candidates_chunk, calculate_frequency, release_instances
+from distributed.pasigram.controller.csp.matcher import match_instances, match_instances_until_support, count_support, \
+    count_minimum_images
+from distributed.pasigram.controller.csp.planner import get_matching_plan
+from distributed.pasigram.controller.candidate_generation.utils import create_initial_patterns, generate_new_subgraphs
+from distributed.pasigram.controller.candidate_generation.projection import generate_projected_subgraphs
+from distributed.pasigram.service.edges_service import get_frequent_edges
 
 
-class TestEvaluator(TestCase):
+class TestMatcher(TestCase):
 
-    def test_compute_candidate_frequency(self):
-        """Test to test the correct funtionality of the 'compute_candidate_frequency'-method of the
-        FrequencyCalculator-class.
+    def test_bitset_domains(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        csp_graph = graph.csp_graph
 
-        :return: True or False
-        :rtype: bool
-        """
-        # build the input graph
+        # candidate with one edge between the first two nodes of the graph
+        first_edge = graph.edges.iloc[0]
+        candidate = Pattern(tuple(csp_graph.label[[first_edge['source'], first_edge['target']]]),
+                            ((0, 1, first_edge['label']),))
+
+        potential_assignments = compute_potential_assigments(candidate.labels, candidate.edge_list, [], {}, csp_graph)
+        for node in [0, 1]:
+            domain = potential_assignments[node]
+            self.assertEqual((csp_graph.id_space,), domain.shape, msg="Test for the size of the bitset domain")
+            self.assertEqual(bool, domain.dtype, msg="Test for the type of the bitset domain")
+            candidate_node = candidate.csp_graph.loc[node]
+            expected = csp_graph.filter_by_signature(
+                csp_graph.domain(candidate_node['label'], candidate_node['indegree'], candidate_node['outdegree']),
+                candidate_node['ingoing_neighbours'], candidate_node['outgoing_neighbours'])
+            self.assertEqual(expected.tolist(), np.flatnonzero(domain).tolist(),
+                             msg="Test for the assignments of the domain")
+        self.assertIn(int(first_edge['source']), np.flatnonzero(potential_assignments[0]).tolist(),
+                      msg="Test if the source of the edge is a potential assignment")
+
+    def test_prune_domains(self):
         nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
         edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        label_sets = graph.edges.groupby(['source', 'target'])['label'].apply(lambda labels: tuple(sorted(set(labels))))
+
+        for i in range(len(graph.edges)):
+            edge = graph.edges.iloc[i]
+            candidate = Pattern(tuple(graph.csp_graph.label[[edge['source'], edge['target']]]),
+                                ((0, 1, edge['label']),))
+
+            potential_assignments = compute_potential_assigments(candidate.labels, candidate.edge_list, [], {},
+                                                                 graph.csp_graph)
+            # pairs of partner nodes: assignments which are connected with exactly the label of the candidate edge
+            partners = label_sets[(label_sets == (edge['label'],)) &
+                                  label_sets.index.get_level_values('source').isin(
+                                      np.flatnonzero(potential_assignments[0]).tolist()) &
+                                  label_sets.index.get_level_values('target').isin(
+                                      np.flatnonzero(potential_assignments[1]).tolist())].index
+            prune_domains(potential_assignments, candidate.edge_list, graph.csp_graph, graph.edge_index)
+
+            # only the assignments which are part of a pair of partner nodes are left
+            for node, level in [(0, 'source'), (1, 'target')]:
+                self.assertEqual(sorted(set(partners.get_level_values(level))),
+                                 np.flatnonzero(potential_assignments[node]).tolist(),
+                                 msg="Test for the pruned domain of node " + str(node) + " for edge " + str(i))
+
+    def test_match_instances(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
         graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        input_edges = graph.edges
+        node_labels = graph.csp_graph.label
 
-        # build the csp graph of the candidate
-        candidate_csp_graph = pd.DataFrame.from_dict({0: ['DB', 0, 2, [], [['a', 'DM', 1], ['b', 'IR', 2]]],
-                                                      1: ['DM', 1, 0, [['a', 'DB', 0]], []],
-                                                      2: ['IR', 1, 0, [['b', 'DB', 0]], []]
-                                                      }, orient='index',
-                                                     columns=['label', 'indegree', 'outdegree', 'ingoing_neighbours',
-                                                              'outgoing_neighbours'])
-
-        new_added_edge = {'parent_node_id': 0, 'child_node_id': 2, 'edge_label': 'b'}
-        frequency_calculator = FrequencyCalculator(graph.csp_graph, 2)
-
-        candidate_frequency = frequency_calculator.compute_candidate_frequency(candidate_csp_graph, 2, new_added_edge)
-        print(candidate_frequency)
-        self.assertEqual(2, candidate_frequency[0], msg="Test of frequency calculation")
-
-    def test_compute_candidate_frequency_with_given_instances(self):
-        """Test to test the correct funtionality of the 'compute_candidate_frequency_with_given_instances'-method of the
-        FrequencyCalculator-class.
-
-        :return: True or False
-        :rtype: bool
-        """
-        # build the input graph
+        def labels_between(edges_set, source, target):
+            return set(edges_set[(edges_set['source'] == source) & (edges_set['target'] == target)]['label'])
+
+        # candidates out of two adjacent edges of the input graph: 0 -> 1 and 1 -> 2
+        for i in range(len(input_edges)):
+            for j in range(len(input_edges)):
+                edge1, edge2 = input_edges.iloc[i], input_edges.iloc[j]
+                if i == j or edge1['target'] != edge2['source'] or edge2['target'] == edge1['source']:
+                    continue
+                candidate = Pattern(tuple(node_labels[[edge1['source'], edge1['target'], edge2['target']]]),
+                                    ((0, 1, edge1['label']), (1, 2, edge2['label'])))
+
+                potential_assignments = compute_potential_assigments(candidate.labels, candidate.edge_list, [], {},
+                                                                     graph.csp_graph, graph.edge_index)
+                instances = match_instances(potential_assignments, candidate.edge_list, graph.csp_graph,
+                                            graph.edge_index)
+
+                # all injective assignments, which are connected with exactly the labels of the candidate edges
+                expected = []
+                for assignment in permutations(range(len(node_labels)), 3):
+                    if list(node_labels[list(assignment)]) != list(candidate.nodes['label']):
+                        continue
+                    if all(labels_between(input_edges, assignment[source], assignment[target]) ==
+                           labels_between(candidate.edges, source, target) for source, target in [(0, 1), (1, 2)]):
+                        expected.append(list(assignment))
+
+                self.assertEqual(expected, instances.tolist(), msg="Test for the instances of edges " + str((i, j)))
+                self.assertIn([edge1['source'], edge1['target'], edge2['target']], instances.tolist(),
+                              msg="Test if the edges are an instance of the candidate")
+
+                # the instances of the first edge extended by the second edge (join with the CSR arrays)
+                new_added_edge = {'parent_node_id': 1, 'child_node_id': 2, 'edge_label': edge2['label'],
+                                  'edge_type': 'forward'}
+                parent_instances = match_instances({node: potential_assignments[node] for node in [0, 1]},
+                                                   candidate.edge_list[:1], graph.csp_graph, graph.edge_index)
+                extended_instances = match_instances(potential_assignments, candidate.edge_list, graph.csp_graph,
+                                                     graph.edge_index, parent_instances, new_added_edge)
+                self.assertEqual(np.int32, extended_instances.dtype, msg="Test for the type of the instance matrix")
+                self.assertEqual(expected, extended_instances.tolist(),
+                                 msg="Test for the extended instances of edges " + str((i, j)))
+
+    def test_matching_plan(self):
         nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
         edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
         graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        input_edges = graph.edges
+        node_labels = graph.csp_graph.label
+
+        # the statistics count the nodes per label and the neighbours per (label, direction, edge label, label)
+        label_counts, neighbour_counts = graph.csp_graph.statistics_index
+        self.assertEqual(np.bincount(node_labels).tolist(), label_counts.tolist(), msg="Test for the label counts")
+        for source, target, label in zip(input_edges['source'], input_edges['target'], input_edges['label']):
+            expected = len(input_edges[(node_labels[input_edges['source']] == node_labels[source]) &
+                                       (input_edges['label'] == label) &
+                                       (node_labels[input_edges['target']] == node_labels[target])])
+            self.assertEqual(expected, neighbour_counts[node_labels[source], 1, label, node_labels[target]],
+                             msg="Test for the outgoing neighbour counts")
+            self.assertEqual(expected, neighbour_counts[node_labels[target], 0, label, node_labels[source]],
+                             msg="Test for the ingoing neighbour counts")
+
+        # the whole input graph as candidate and an isomorphic candidate with the reversed numbering of the nodes
+        edge_list = tuple(zip(input_edges['source'], input_edges['target'], input_edges['label']))
+        candidate = Pattern(tuple(node_labels), edge_list)
+        reversed_ids = {node: len(node_labels) - 1 - node for node in range(len(node_labels))}
+        reversed_candidate = Pattern(tuple(reversed(node_labels)),
+                                     tuple((reversed_ids[source], reversed_ids[target], label)
+                                           for source, target, label in edge_list))
+        for pattern in [candidate, reversed_candidate]:
+            pattern.build_canonical_smallest_code()
+        self.assertEqual(candidate.canonical_code, reversed_candidate.canonical_code)
+
+        matching_plans = {}
+        for pattern, fixed_nodes in [(candidate, []), (candidate, [0, 1]), (reversed_candidate, [])]:
+            plan = get_matching_plan(pattern, fixed_nodes, graph.csp_graph, matching_plans)
+            self.assertEqual(plan, get_matching_plan(pattern, fixed_nodes, graph.csp_graph, matching_plans),
+                             msg="Test for the cached matching plan")
+            self.assertEqual(sorted(pattern.nodes_ids), sorted(node for node, _ in plan),
+                             msg="Test if every node is part of the plan")
+            self.assertEqual(fixed_nodes, [node for node, _ in plan][:len(fixed_nodes)],
+                             msg="Test if the fixed nodes are the first nodes of the plan")
+
+            # every node is extended along the edges to all of its adjacent nodes, which are bound before
+            adjacent = {(source, target) for source, target, _ in pattern.edge_list}
+            for i, (node, bound_neighbours) in enumerate(plan):
+                bound = [bound_node for bound_node, _ in plan[:i]]
+                expected = {neighbour for neighbour in bound
+                            if (node, neighbour) in adjacent or (neighbour, node) in adjacent}
+                self.assertEqual(expected, set(bound_neighbours), msg="Test for the bound neighbours")
+                if i >= max(len(fixed_nodes), 1):
+                    self.assertTrue(len(bound_neighbours) > 0, msg="Test if the plan extends along bound nodes")
+
+        # the isomorphic candidate uses the plan of the candidate (one plan per canonical code and fixed nodes)
+        self.assertEqual(2, len(matching_plans), msg="Test for the plans shared by isomorphic candidates")
+
+        potential_assignments = compute_potential_assigments(candidate.labels, candidate.edge_list, [], {},
+                                                             graph.csp_graph, graph.edge_index)
+        self.assertEqual(match_instances(potential_assignments, candidate.edge_list, graph.csp_graph,
+                                         graph.edge_index).tolist(),
+                         match_instances(potential_assignments, candidate.edge_list, graph.csp_graph, graph.edge_index,
+                                         order=get_matching_plan(candidate, [], graph.csp_graph)).tolist(),
+                         msg="Test for the instances found with the matching plan")
+
+    def test_support_measure(self):
+        instances = np.array([[0, 1, 2], [0, 3, 2], [4, 1, 2]], dtype=np.int32)
+        # candidate with the edges 0 -> 1 and 2 -> 1 (the canonical first edge is 0 -> 1)
+        first_edge_nodes = [0, 1]
+        self.assertEqual(3, count_support(instances, first_edge_nodes), msg="Test for the first edge support")
+        self.assertEqual(1, count_support(instances, first_edge_nodes, 'mni'), msg="Test for the MNI support")
+        self.assertEqual(0, count_minimum_images(np.empty((0, 3), dtype=np.int32)), msg="Test for MNI without instances")
+
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        frequent_edges = get_frequent_edges(graph.edges, graph.nodes, 2)
+        candidates_subgraphs = evaluate_candidates_chunk(create_initial_patterns(frequent_edges), 2, graph.csp_graph,
+                                                         graph.edge_index, 'mni')
+        projection_subgraphs = evaluate_candidates_chunk(create_initial_patterns(frequent_edges), 2, graph.csp_graph,
+                                                         graph.edge_index, 'mni')
+
+        # both mining modes find the same frequent subgraphs with the same minimum images on every size
+        while len(candidates_subgraphs) > 0:
+            for subgraph, frequency in zip(candidates_subgraphs['graph'], candidates_subgraphs['frequency']):
+                potential_assignments = compute_potential_assigments(subgraph.labels, subgraph.edge_list, [], {},
+                                                                     graph.csp_graph, graph.edge_index)
+                instances = match_instances(potential_assignments, subgraph.edge_list, graph.csp_graph,
+                                            graph.edge_index)
+                self.assertEqual(min(len(set(instances[:, node].tolist())) for node in subgraph.nodes.index),
+                                 frequency, msg="Test for the MNI support of the frequent subgraphs")
+
+            new_candidates = generate_new_subgraphs(frequent_edges, candidates_subgraphs)
+            candidates_subgraphs = evaluate_candidates_chunk(new_candidates, 2, graph.csp_graph, graph.edge_index,
+                                                             'mni')
+            projection_subgraphs = generate_projected_subgraphs(frequent_edges, 2, graph.csp_graph, graph.edge_index,
+                                                                projection_subgraphs, 'mni')
+            self.assertEqual(sorted(zip(candidates_subgraphs.index, candidates_subgraphs['frequency'])),
+                             sorted(zip(projection_subgraphs.index, projection_subgraphs['frequency'])),
+                             msg="Test for the MNI support with projection")
+
+    def test_isomorphic_support(self):
+        # random graph, on which the first edges of isomorphic candidates have different numbers of assignments
+        random_state = np.random.RandomState(1)
+        nodes = pd.DataFrame({'label': random_state.choice(['A', 'B', 'C'], 120)})
+        edges = pd.DataFrame({'source': random_state.randint(0, 120, 300), 'target': random_state.randint(0, 120, 300),
+                              'label': random_state.choice(['x', 'y'], 300)})
+        edges = edges[edges['source'] != edges['target']]
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        # the duplicated candidates are dropped -> all isomorphic candidates must have the same support
+        for support_measure in ['first_edge', 'mni']:
+            frequent_edges = get_frequent_edges(graph.edges, graph.nodes, 11)
+            candidates_subgraphs = evaluate_candidates_chunk(create_initial_patterns(frequent_edges), 11,
+                                                             graph.csp_graph, graph.edge_index, support_measure)
+            while len(candidates_subgraphs) > 0:
+                for subgraph, frequency in zip(candidates_subgraphs['graph'], candidates_subgraphs['frequency']):
+                    # isomorphic candidate with the reversed numbering of the nodes and the reversed order of the edges
+                    reversed_ids = {node: len(subgraph.labels) - 1 - node for node in subgraph.nodes_ids}
+                    reversed_subgraph = Pattern(tuple(reversed(subgraph.labels)),
+                                                tuple((reversed_ids[source], reversed_ids[target], label)
+                                                      for source, target, label in reversed(subgraph.edge_list)))
+                    reversed_subgraph.build_canonical_smallest_code()
+                    self.assertEqual(frequency,
+                                     calculate_frequency(reversed_subgraph, graph.csp_graph, graph.edge_index,
+                                                         support_measure=support_measure),
+                                     msg="Test for the support of isomorphic candidates (" + support_measure + ")")
+
+                new_candidates = generate_new_subgraphs(frequent_edges, candidates_subgraphs)
+                candidates_subgraphs = evaluate_candidates_chunk(new_candidates, 11, graph.csp_graph, graph.edge_index,
+                                                                 support_measure)
+
+    def test_early_exit(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        frequent_edges = get_frequent_edges(graph.edges, graph.nodes, 2)
+        exact_subgraphs = evaluate_candidates_chunk(create_initial_patterns(frequent_edges), 2, graph.csp_graph,
+                                                    graph.edge_index)
+        early_exit_subgraphs = evaluate_candidates_chunk(create_initial_patterns(frequent_edges), 2, graph.csp_graph,
+                                                         graph.edge_index, exact_frequency=False)
+        frequent_subgraphs = exact_subgraphs
+
+        # both find the same frequent subgraphs on every size, the frequencies with early exit are lower bounds of the
+        # exact frequencies, which meet the min_support
+        while len(exact_subgraphs) > 0:
+            self.assertEqual(sorted(exact_subgraphs.index), sorted(early_exit_subgraphs.index),
+                             msg="Test for the frequent subgraphs with early exit")
+            for code, frequency in early_exit_subgraphs['frequency'].items():
+                self.assertTrue(2 <= frequency <= exact_subgraphs['frequency'][code],
+                                msg="Test for the frequencies with early exit")
+
+            exact_subgraphs = evaluate_candidates_chunk(generate_new_subgraphs(frequent_edges, exact_subgraphs), 2,
+                                                        graph.csp_graph, graph.edge_index)
+            early_exit_subgraphs = evaluate_candidates_chunk(generate_new_subgraphs(frequent_edges,
+                                                                                    early_exit_subgraphs),
+                                                             2, graph.csp_graph, graph.edge_index,
+                                                             exact_frequency=False)
+            frequent_subgraphs = frequent_subgraphs.append(exact_subgraphs)
+
+        # the instances found with early exit are a subset of all instances
+        for subgraph in frequent_subgraphs['graph']:
+            potential_assignments = compute_potential_assigments(subgraph.labels, subgraph.edge_list, [], {},
+                                                                 graph.csp_graph, graph.edge_index)
+            instances = match_instances(potential_assignments, subgraph.edge_list, graph.csp_graph, graph.edge_index)
+            early_exit_instances, complete = match_instances_until_support(
+                potential_assignments, subgraph.edge_list, graph.csp_graph, graph.edge_index, 2,
+                first_edge_nodes=subgraph.first_edge_nodes)
+            self.assertTrue(set(map(tuple, early_exit_instances.tolist())) <= set(map(tuple, instances.tolist())),
+                            msg="Test for the instances with early exit")
+            self.assertTrue(count_support(early_exit_instances, subgraph.first_edge_nodes) >= 2,
+                            msg="Test for the support of the instances with early exit")
+            if complete:
+                self.assertTrue(np.array_equal(instances, early_exit_instances),
+                                msg="Test for the complete instances with early exit")
+
+            # without a min_support the (perhaps) incomplete instances aren't matched again
+            if subgraph.size == 1:
+                continue
+            subgraph.instances, subgraph.complete_instances = early_exit_instances, False
+            self.assertEqual(count_support(early_exit_instances, subgraph.first_edge_nodes),
+                             calculate_frequency(subgraph, graph.csp_graph, graph.edge_index),
+                             msg="Test for the frequency of incomplete instances without min_support")
+
+    def test_release_instances(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        frequent_edges = get_frequent_edges(graph.edges, graph.nodes, 2)
+        current_subgraphs = evaluate_candidates_chunk(create_initial_patterns(frequent_edges), 2, graph.csp_graph,
+                                                      graph.edge_index)
+
+        while len(current_subgraphs) > 0:
+            # the children reference the instances of their parents
+            parent_instances = [id(subgraph.instances) for subgraph in current_subgraphs['graph']]
+            new_candidates = generate_new_subgraphs(frequent_edges, current_subgraphs)
+            for candidate in new_candidates['graph']:
+                self.assertIn(id(candidate.instances), parent_instances, msg="Test for the inherited instances")
+            new_subgraphs = evaluate_candidates_chunk(new_candidates, 2, graph.csp_graph, graph.edge_index)
 
-        # build the csp graph of the candidate
-        candidate_csp_graph = pd.DataFrame.from_dict({0: ['DB', 0, 2, [], [['a', 'DM', 1], ['b', 'IR', 2]]],
-                                                      1: ['DM', 1, 0, [['a', 'DB', 0]], []],
-                                                      2: ['IR', 1, 0, [['b', 'DB', 0]], []]
-                                                      }, orient='index',
-                                                     columns=['label', 'indegree', 'outdegree', 'ingoing_neighbours',
-                                                              'outgoing_neighbours'])
-
-        new_added_edge = {'parent_node_id': 0, 'child_node_id': 2, 'edge_label': 'b'}
-        candidate_instances = [{2: 0, 3: 1}, {7: 0, 10: 1}]
-        frequency_calculator = FrequencyCalculator(graph.csp_graph, 2)
-
-        candidate_frequency = frequency_calculator.compute_candidate_frequency_with_given_instances(candidate_csp_graph,
-                                                                                                    candidate_instances,
-                                                                                                    2, new_added_edge)
-        print(candidate_frequency)
-        self.assertEqual(2, candidate_frequency[0], msg="Test of frequency calculation with given instances")
+            # the instances of a size are released once all of their children are evaluated
+            release_instances(current_subgraphs)
+            for subgraph in current_subgraphs['graph']:
+                self.assertEqual(0, len(subgraph.instances), msg="Test for the released instances of the subgraphs")
+            for subgraph in new_subgraphs['graph']:
+                self.assertTrue(len(subgraph.instances) > 0, msg="Test for the instances of the new subgraphs")
+            current_subgraphs = new_subgraphs
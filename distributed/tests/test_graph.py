@@ -1,7 +1,20 @@
-from unittest import TestCase
+from unittest import TestCase, skipUnless
+import importlib.util
+import os
+import pickle
+import tempfile
+from itertools import permutations
+import numpy as np
 import pandas as pd
-from pasigram.model.graph import Graph
-from pasigram.service.graph_service import build_csp_graph
+from distributed.pasigram.model.graph import Graph
+from distributed.pasigram.model.pattern import Pattern
+from distributed.pasigram.controller.csp.evaluator_utils import is_subset
+from distributed.pasigram.controller.candidate_generation.utils import add_new_forward_edge, add_new_backward_edge, \
+    add_candidate, is_known_candidate, candidate_set_to_frame
+from distributed.pasigram.service.graph_service import build_csp_graph, dictionary_compression, build_canonical_state, \
+    build_canonical_smallest_code, create_initial_csp_graph
+from distributed.pasigram.service.cache_service import evict_cache_entries
+from distributed.pasigram.service.stream_service import stream_csv_to_binary
 
 
 class TestGraph(TestCase):
@@ -11,11 +24,17 @@ class TestGraph(TestCase):
         nodes2 = pd.read_csv(r'../data/nodes2.csv', sep=';', index_col='id')
         edges1 = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
         edges2 = pd.read_csv(r'../data/edges2.csv', sep=';', index_col='id')
+        # the labels of the second graph are encoded as integers (in the sorted order of the labels of the first graph)
+        nodes2['label'] = nodes2['label'].map(dict(enumerate(sorted(nodes1['label'].unique()), 1)))
+        edges2['label'] = edges2['label'].map(dict(enumerate(sorted(edges1['label'].unique()), 1)))
 
         graph1 = Graph(nodes1, edges1)
         graph2 = Graph(nodes2, edges2)
+        graph1.build_canonical_smallest_code()
+        graph2.build_canonical_smallest_code()
         code1 = graph1.canonical_code
         code2 = graph2.canonical_code
+        self.assertIsNotNone(code1, msg="Test if the canonical code is built")
         self.assertEqual(code1, code2, msg="Test if the same graph in different order produces the same canonical code")
 
     def test_negative_canonical_code(self):
@@ -26,9 +45,110 @@ class TestGraph(TestCase):
 
         graph1 = Graph(nodes1, edges1)
         graph2 = Graph(nodes2, edges2)
+        graph1.build_canonical_smallest_code()
+        graph2.build_canonical_smallest_code()
         code1 = graph1.canonical_code
         code2 = graph2.canonical_code
-        self.assertIsNot(code1, code2, msg="Test if two different graphs produces different canonical codes")
+        self.assertIsNotNone(code1, msg="Test if the canonical code is built")
+        self.assertNotEqual(code1, code2, msg="Test if two different graphs produces different canonical codes")
+
+    def test_minimum_dfs_code(self):
+        def build_code(node_labels: list, graph_edges: list) -> str:
+            graph = Graph(pd.DataFrame({'label': node_labels}),
+                          pd.DataFrame(graph_edges, columns=['source', 'target', 'label']))
+            graph.build_canonical_smallest_code()
+            return graph.canonical_code
+
+        # both graphs have the same node labels, degrees and neighbour labels, but aren't isomorphic
+        code1 = build_code([1, 1, 0, 0], [(1, 0, 0), (2, 0, 1), (0, 3, 1), (2, 3, 1), (3, 1, 1)])
+        code2 = build_code([0, 0, 1, 1], [(0, 1, 1), (2, 1, 1), (3, 2, 0), (0, 3, 1), (1, 2, 1)])
+        self.assertNotEqual(code1, code2, msg="Test if two different graphs produce different canonical codes")
+
+        # every order of the nodes and edges produces the same canonical code
+        for permutation in permutations(range(4)):
+            node_labels = [0] * 4
+            for node, label in enumerate([1, 1, 0, 0]):
+                node_labels[permutation[node]] = label
+            graph_edges = [(permutation[source], permutation[target], label)
+                           for source, target, label in [(3, 1, 1), (2, 3, 1), (0, 3, 1), (2, 0, 1), (1, 0, 0)]]
+            self.assertEqual(code1, build_code(node_labels, graph_edges),
+                             msg="Test if isomorphic graphs produce the same canonical code")
+
+        # the direction of the edges is part of the code
+        self.assertEqual('(0,1,0,0,0,1)', build_code([0, 1], [(0, 1, 0)]), msg="Test for the code of an edge")
+        self.assertNotEqual(build_code([0, 0, 0], [(0, 1, 0), (1, 2, 0)]),
+                            build_code([0, 0, 0], [(0, 1, 0), (2, 1, 0)]),
+                            msg="Test for the direction of the edges")
+
+    def test_canonical_state(self):
+        parent = Pattern((0, 1), ((0, 1, 0),))
+        parent.build_canonical_smallest_code()
+        parent.root_node, parent.right_most_node, parent.right_most_path = 0, 1, [0, 1]
+        parent_state = parent.canonical_state
+
+        # the labels of the new edges are floats (like the rows of the frequent edges)
+        forward_child = add_new_forward_edge(parent, pd.Series({'source': 1.0, 'target': 0.0, 'label': 1.0}), 1)
+        backward_child = add_new_backward_edge(forward_child, pd.Series({'source': 0.0, 'target': 0.0, 'label': 2.0}))
+
+        for child in [forward_child, backward_child]:
+            self.assertEqual(build_canonical_state(child.nodes, child.edges), child.canonical_state,
+                             msg="Test if the extended canonical state is equal to the state built from scratch")
+            self.assertEqual(build_canonical_smallest_code(child.nodes, child.edges), child.canonical_code,
+                             msg="Test if the canonical code is equal to the code built from scratch")
+
+        self.assertIs(parent_state, parent.canonical_state)
+        self.assertEqual(1, len(parent.canonical_state['edges']), msg="Test if the state of the parent isn't modified")
+        self.assertEqual([(0, 1, 0, 0)], parent.canonical_state['adjacency'][0])
+
+    def test_pattern(self):
+        parent = Pattern((0, 1), ((0, 1, 0),))
+        parent.root_node, parent.right_most_node, parent.right_most_path = 0, 1, [0, 1]
+        pattern = add_new_backward_edge(add_new_forward_edge(parent, pd.Series({'source': 1, 'target': 2, 'label': 1}),
+                                                             1),
+                                        pd.Series({'source': 2, 'target': 0, 'label': 2}))
+        self.assertFalse(hasattr(pattern, '__dict__'), msg="Test if the pattern has no instance dict")
+        self.assertEqual((0, 1, 2), pattern.labels)
+        self.assertEqual(((0, 1, 0), (1, 2, 1), (2, 0, 2)), pattern.edge_list)
+        self.assertEqual(((0, 1, 0),), parent.edge_list, msg="Test if the parent isn't modified")
+        self.assertEqual([0, 2], pattern.right_most_path, msg="Test for the right most path (BFS)")
+        self.assertEqual(3, pattern.size)
+
+        # the DataFrame representations are built on demand out of the tuples
+        self.assertEqual([0, 1, 2], list(pattern.nodes['label']))
+        self.assertEqual([[0, 1, 0], [1, 2, 1], [2, 0, 2]], pattern.edges.values.tolist())
+        self.assertEqual(create_initial_csp_graph(pattern.nodes_ids, pattern.nodes, pattern.edges).values.tolist(),
+                         pattern.csp_graph.values.tolist(), msg="Test for the csp graph of a pattern")
+        self.assertEqual(build_canonical_smallest_code(pattern.nodes, pattern.edges), pattern.canonical_code)
+
+    def test_wl_hash(self):
+        def build_graph(node_labels: list, graph_edges: list) -> Pattern:
+            graph = Pattern(tuple(node_labels), tuple(graph_edges))
+            graph.build_canonical_smallest_code()
+            graph.build_wl_hash()
+            return graph
+
+        graph1 = build_graph([1, 1, 0, 0], [(1, 0, 0), (2, 0, 1), (0, 3, 1), (2, 3, 1), (3, 1, 1)])
+        graph2 = build_graph([0, 0, 1, 1], [(0, 1, 1), (2, 1, 1), (3, 2, 0), (0, 3, 1), (1, 2, 1)])
+        graph3 = build_graph([0, 0, 1, 1], [(1, 3, 1), (0, 1, 1), (2, 1, 1), (0, 2, 1), (3, 2, 0)])
+        self.assertEqual(graph1.canonical_code, graph3.canonical_code)
+        self.assertEqual(graph1.wl_hash, graph3.wl_hash, msg="Test if isomorphic graphs have the same hash")
+        self.assertNotEqual(build_graph([0, 0, 0], [(0, 1, 0), (1, 2, 0)]).wl_hash,
+                            build_graph([0, 0, 0], [(0, 1, 0), (2, 1, 0)]).wl_hash,
+                            msg="Test for the direction of the edges")
+
+        # the candidates with the same hash are compared by their canonical codes
+        graph2.wl_hash = graph1.wl_hash
+        candidate_set = {}
+        self.assertTrue(add_candidate(candidate_set, graph1))
+        self.assertTrue(add_candidate(candidate_set, graph2), msg="Test if a hash collision is no duplicate")
+        self.assertFalse(add_candidate(candidate_set, graph3), msg="Test if an isomorphic graph is a duplicate")
+        self.assertTrue(is_known_candidate(candidate_set, graph3.canonical_state, graph3.wl_hash)[0])
+        self.assertEqual(graph3.canonical_code,
+                         is_known_candidate(candidate_set, graph3.canonical_state, graph3.wl_hash)[1][0],
+                         msg="Test for the canonical code built for the comparison")
+        self.assertEqual([False, None], is_known_candidate(candidate_set, graph3.canonical_state, graph3.wl_hash + 1))
+        self.assertEqual([graph1.canonical_code, graph2.canonical_code],
+                         list(candidate_set_to_frame(candidate_set).index))
 
     def test_build_csp_graph(self):
         expected = pd.DataFrame.from_dict({1: ['node1', "1", "1", [["b", "node2", 2]], [["a", "node2", 2]]],
@@ -56,6 +176,246 @@ class TestGraph(TestCase):
 
         self.assertEqual(expected, result, msg="Test for the adjacency list")
 
+    def test_build_csr_graph(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        expected = build_csp_graph(graph.nodes, graph.edges)
+        result = graph.csp_graph.to_frame()
+
+        self.assertEqual(expected.values.tolist(), result.values.tolist(), msg="Test for the CSR csp graph")
+        self.assertEqual(list(expected.index), list(result.index), msg="Test for the node ids of the CSR csp graph")
+
+    def test_binary_graph(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        with tempfile.TemporaryDirectory() as path:
+            graph.to_binary(path)
+            binary_graph = Graph.from_binary(path)
+
+            self.assertEqual(graph.nodes.to_string(), binary_graph.nodes.to_string(), msg="Test for the binary nodes")
+            self.assertEqual(graph.edges.to_string(), binary_graph.edges.to_string(), msg="Test for the binary edges")
+            self.assertEqual(graph.node_dict, binary_graph.node_dict, msg="Test for the binary node dictionary")
+            self.assertEqual(graph.edge_dict, binary_graph.edge_dict, msg="Test for the binary edge dictionary")
+            self.assertEqual(list(graph.original_node_ids), list(binary_graph.original_node_ids),
+                             msg="Test for the binary original node ids")
+            self.assertEqual(graph.csp_graph.to_frame().to_string(), binary_graph.csp_graph.to_frame().to_string(),
+                             msg="Test for the binary csp graph")
+
+            # a memory mapped csp graph is pickled by its path
+            unpickled_csp_graph = pickle.loads(pickle.dumps(binary_graph.csp_graph))
+            self.assertEqual(path, unpickled_csp_graph.path, msg="Test for pickling the binary csp graph")
+            self.assertIsNotNone(unpickled_csp_graph.domain_index, msg="Test for pickling the domain index")
+            self.assertEqual(graph.csp_graph.to_frame().to_string(), unpickled_csp_graph.to_frame().to_string(),
+                             msg="Test for the unpickled binary csp graph")
+
+    def test_stream_csv_to_binary(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        with tempfile.TemporaryDirectory() as path:
+            # a small chunk size forces several chunks and blocks for every step
+            stream_csv_to_binary(r'../data/nodes.csv', r'../data/edges.csv', path, chunk_size=3)
+            streamed_graph = Graph.from_binary(path)
+
+            self.assertEqual(graph.nodes.to_string(), streamed_graph.nodes.to_string(),
+                             msg="Test for the streamed nodes")
+            self.assertEqual(graph.edges.to_string(), streamed_graph.edges.to_string(),
+                             msg="Test for the streamed edges")
+            self.assertEqual(graph.node_dict, streamed_graph.node_dict, msg="Test for the streamed node dictionary")
+            self.assertEqual(graph.edge_dict, streamed_graph.edge_dict, msg="Test for the streamed edge dictionary")
+            self.assertEqual(graph.csp_graph.to_frame().to_string(), streamed_graph.csp_graph.to_frame().to_string(),
+                             msg="Test for the streamed csp graph")
+            self.assertEqual(list(graph.original_node_ids), list(streamed_graph.original_node_ids),
+                             msg="Test for the streamed original node ids")
+            self.assertFalse(any(name.endswith('.raw') for name in os.listdir(path)),
+                             msg="Test if the temporary edge file is removed")
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_arrow_graph(self):
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        with tempfile.TemporaryDirectory() as path:
+            # an additional column which has to be skipped by the column projection
+            nodes_table = pyarrow.Table.from_pandas(nodes.assign(weight=1.0).reset_index())
+            edges_table = pyarrow.Table.from_pandas(edges.assign(weight=1.0).reset_index())
+            pyarrow.parquet.write_table(nodes_table, os.path.join(path, 'nodes.parquet'))
+            pyarrow.parquet.write_table(edges_table, os.path.join(path, 'edges.parquet'))
+            pyarrow.feather.write_feather(nodes_table, os.path.join(path, 'nodes.arrow'))
+            pyarrow.feather.write_feather(edges_table, os.path.join(path, 'edges.arrow'))
+
+            for extension in ['.parquet', '.arrow']:
+                arrow_graph = Graph.from_arrow(os.path.join(path, 'nodes' + extension),
+                                               os.path.join(path, 'edges' + extension))
+                self.assertEqual(['label'], list(arrow_graph.nodes.columns), msg="Test for the projected node columns")
+                arrow_graph.build_compressed_graph()
+                arrow_graph.build_csp_graph()
+
+                self.assertEqual(graph.nodes.to_string(), arrow_graph.nodes.to_string(),
+                                 msg="Test for the " + extension + " nodes")
+                self.assertEqual(graph.edges.to_string(), arrow_graph.edges.to_string(),
+                                 msg="Test for the " + extension + " edges")
+                self.assertEqual(graph.node_dict, arrow_graph.node_dict, msg="Test for the " + extension + " node dict")
+                self.assertEqual(graph.edge_dict, arrow_graph.edge_dict, msg="Test for the " + extension + " edge dict")
+                self.assertEqual(graph.csp_graph.to_frame().to_string(), arrow_graph.csp_graph.to_frame().to_string(),
+                                 msg="Test for the " + extension + " csp graph")
+
+    def test_domain_index(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        csp_graph = graph.csp_graph
+
+        self.assertIsNotNone(csp_graph.domain_index, msg="Test if the domain index is built with the csp graph")
+        for label in range(-1, len(graph.node_labels) + 1):
+            for indegree in range(0, 4):
+                for outdegree in range(0, 4):
+                    expected = np.flatnonzero((csp_graph.label == label) & (csp_graph.indegree >= indegree) &
+                                              (csp_graph.outdegree >= outdegree))
+                    self.assertEqual(expected.tolist(), csp_graph.domain(label, indegree, outdegree).tolist(),
+                                     msg="Test for the domain of " + str((label, indegree, outdegree)))
+
+    def test_signature_index(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        csp_graph = graph.csp_graph
+        positions = np.arange(len(csp_graph))
+
+        # use the neighbours of every node (and a part of them) as neighbours of a candidate node
+        for position in positions:
+            ingoing_neighbours = csp_graph.ingoing_neighbours(position)
+            outgoing_neighbours = csp_graph.outgoing_neighbours(position)
+            for candidate_neighbours in [[ingoing_neighbours, outgoing_neighbours],
+                                         [ingoing_neighbours[:1], outgoing_neighbours[1:]]]:
+                expected = [i for i in positions
+                            if is_subset(candidate_neighbours[0], csp_graph.ingoing_neighbours(i)) and
+                            is_subset(candidate_neighbours[1], csp_graph.outgoing_neighbours(i))]
+                self.assertEqual(expected, csp_graph.filter_by_signature(positions, *candidate_neighbours).tolist(),
+                                 msg="Test for the signature filter of the neighbours of node " + str(position))
+
+        # unknown labels can't be matched
+        self.assertEqual([], csp_graph.filter_by_signature(positions, [[len(graph.edge_labels), 0, 0]], []).tolist(),
+                         msg="Test for the signature filter with an unknown edge label")
+
+    def test_edge_index(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+        edge_index = graph.edge_index
+        input_edges = graph.edges
+
+        # the label set of every pair of nodes equals the labels of the edges between them
+        sources, targets = np.meshgrid(range(-1, len(nodes) + 1), range(-1, len(nodes) + 1))
+        label_set_ids = edge_index.lookup(sources.ravel(), targets.ravel())
+        for source, target, label_set_id in zip(sources.ravel(), targets.ravel(), label_set_ids):
+            labels = input_edges[(input_edges['source'] == source) & (input_edges['target'] == target)]['label']
+            expected = edge_index.label_set_id(labels) if len(labels) > 0 else -1
+            self.assertEqual(expected, label_set_id, msg="Test for the label set of " + str((source, target)))
+
+
+    def test_dictionary_compression(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+        original_nodes = nodes.to_string()
+
+        node_labels, edge_labels, compressed_nodes, compressed_edges = dictionary_compression(nodes, edges)
+
+        self.assertEqual(original_nodes, nodes.to_string(), msg="Test that the input nodes aren't modified")
+        self.assertEqual([0, 1, 2, 0, 0, 1, 1, 0, 0, 2], list(compressed_nodes['label']),
+                         msg="Test for the compressed node labels")
+        self.assertEqual('int16', compressed_nodes['label'].dtype.name, msg="Test for the compact label type")
+        self.assertEqual(list(nodes['label']), list(node_labels.take(compressed_nodes['label'])),
+                         msg="Test for decoding the node labels")
+
+    def test_decode_patterns(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes.copy(), edges.copy())
+        graph.build_compressed_graph()
+        patterns = pd.Series([Graph(graph.nodes, graph.edges)], index=['input'])
+
+        decoded_nodes, decoded_edges = graph.decode_patterns(patterns)
+
+        self.assertEqual(list(nodes['label']), list(decoded_nodes.loc['input']['label']),
+                         msg="Test for the decoded node labels")
+        self.assertEqual(list(edges['label']), list(decoded_edges.loc['input']['label']),
+                         msg="Test for the decoded edge labels")
+
+    def test_remap_node_ids(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes.copy(), edges.copy())
+        graph.build_compressed_graph()
+
+        self.assertEqual(list(range(len(nodes))), graph.nodes_ids, msg="Test for the dense node ids")
+        self.assertEqual(list(nodes.index), list(graph.original_node_ids), msg="Test for the original node ids")
+        self.assertEqual(list(edges['source']), list(graph.original_node_ids.take(graph.edges['source'])),
+                         msg="Test for the remapped sources")
+        self.assertEqual(list(edges['target']), list(graph.original_node_ids.take(graph.edges['target'])),
+                         msg="Test for the remapped targets")
+
+        # instances of a pattern are translated back into the original node ids
+        instances = np.array([[0, 1], [3, 2]], dtype=np.int32)
+        decoded_instances = graph.decode_instances(instances)
+        self.assertEqual([[nodes.index[0], nodes.index[1]], [nodes.index[3], nodes.index[2]]],
+                         decoded_instances.values.tolist(), msg="Test for the decoded instances")
+
+    def test_csp_graph_cache(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            graph = Graph(nodes.copy(), edges.copy())
+            graph.build_compressed_graph()
+            graph.build_csp_graph(cache_dir=cache_dir)
+            self.assertIsNone(graph.csp_graph.path, msg="Test for a cache miss")
+            self.assertEqual(1, len(os.listdir(cache_dir)), msg="Test for the new cache entry")
+
+            cached_graph = Graph(nodes.copy(), edges.copy())
+            cached_graph.build_compressed_graph()
+            cached_graph.build_csp_graph(cache_dir=cache_dir)
+            self.assertIsNotNone(cached_graph.csp_graph.path, msg="Test for a cache hit")
+            self.assertEqual(graph.csp_graph.to_frame().to_string(), cached_graph.csp_graph.to_frame().to_string(),
+                             msg="Test for the cached csp graph")
+
+            # the cache entries are deleted, if the cache is above its maximum size
+            evict_cache_entries(cache_dir, 0)
+            self.assertEqual(0, len(os.listdir(cache_dir)), msg="Test for the eviction of cache entries")
+
 
 """"def test_matrix(self):
         expected = pd.DataFrame.from_dict({"1": [float('nan'), "1"],
@@ -68,6 +428,3 @@ class TestGraph(TestCase):
         graph = Graph(nodes, edges)
         result = graph.adjacency_matrix.to_string()
         self.assertEqual(expected, result, msg="Test for the matrix")"""
-
-
-
@@ -0,0 +1,31 @@
+import pandas as pd
+from pasigram.model.graph import Graph
+from pasigram.service.graph_service import build_csp_graph, build_csr_csp_graph
+from timeit import default_timer as timer
+
+if __name__ == '__main__':
+    # number of repetitions for every build method (the best run is reported)
+    repetitions = 3
+
+    nodes = pd.read_csv(r'../data/flight_routes/nodes_clean.csv', sep=',', index_col='id')
+    edges = pd.read_csv(r'../data/flight_routes/edges_clean.csv', sep=',', index_col='id')
+    graph = Graph(nodes, edges)
+    graph.build_compressed_graph()
+    print('Benchmark csp graph build on ' + str(len(graph.nodes)) + ' nodes and ' + str(len(graph.edges)) + ' edges!')
+
+    build_methods = {'build_csp_graph (joins and python lists)': build_csp_graph,
+                     'build_csr_csp_graph (vectorized CSR)': build_csr_csp_graph}
+    build_times = {}
+
+    for name, build_method in build_methods.items():
+        times = []
+        for i in range(repetitions):
+            start = timer()
+            build_method(graph.nodes, graph.edges)
+            end = timer()
+            times.append(end - start)
+        build_times[name] = min(times)
+        print(name + ': ' + str(build_times[name]) + ' seconds')
+
+    times = list(build_times.values())
+    print('Speedup: ' + str(times[0] / times[1]))
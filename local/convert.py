@@ -0,0 +1,34 @@
+import argparse
+import pandas as pd
+from pasigram.model.graph import Graph
+from pasigram.service.stream_service import stream_csv_to_binary
+from timeit import default_timer as timer
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert an input graph (nodes.csv/edges.csv) into the binary graph '
+                                                 'format, which can be loaded with Graph.from_binary(path).')
+    parser.add_argument('nodes', help='csv file with the nodes of the graph (id|label)')
+    parser.add_argument('edges', help='csv file with the edges of the graph (id|source|target|label)')
+    parser.add_argument('output', help='directory in which the binary graph is stored')
+    parser.add_argument('--sep', default=';', help='separator of the csv files (default: ";")')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream the csv files in chunks of this many rows, for graphs larger than the memory')
+    args = parser.parse_args()
+
+    start = timer()
+    if args.chunksize is not None:
+        # the edges are never loaded completely into memory
+        print('Stream graph!')
+        stream_csv_to_binary(args.nodes, args.edges, args.output, sep=args.sep, chunk_size=args.chunksize)
+    else:
+        nodes = pd.read_csv(args.nodes, sep=args.sep, index_col='id')
+        edges = pd.read_csv(args.edges, sep=args.sep, index_col='id')
+        graph = Graph(nodes, edges)
+        print('Compress graph!')
+        graph.build_compressed_graph()
+        print('Build csp graph!')
+        graph.build_csp_graph()
+        print('Write binary graph!')
+        graph.to_binary(args.output)
+    end = timer()
+    print('Conversion time: ' + str(end - start) + ' seconds')
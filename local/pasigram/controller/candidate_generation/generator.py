@@ -2,8 +2,13 @@ import pandas as pd
 import numpy as np
 from local.pasigram.service.edges_service import get_frequent_edges
 from local.pasigram.controller.candidate_generation.utils import create_initial_patterns, generate_new_subgraphs
+from local.pasigram.controller.candidate_generation.projection import project_initial_patterns, \
+    generate_projected_subgraphs
+from local.pasigram.model.csp_graph import CSPGraph
+from local.pasigram.model.edge_index import EdgeIndex
 from local.pasigram.model.graph import Graph
 from pyspark import SparkContext
+from typing import Union
 
 
 class Generator:
@@ -58,11 +63,14 @@ class Generator:
 
         return initial_patterns
 
-    def generate_new_subgraphs(self, candidates: pd.DataFrame, execution_mode: str) -> pd.DataFrame:
+    def generate_new_subgraphs(self, candidates: pd.DataFrame, execution_mode: str,
+                               support_measure: str = 'first_edge') -> pd.DataFrame:
         """Method for generating new n+1-size graphs out of n-size frequent graphs
 
         :param candidates: The candidates which
         :param str execution_mode: Flag if we use single or multicore
+        :param str support_measure: The support measure ('first_edge' or 'mni', with 'mni' only the canonical
+            candidates are generated)
         :return: The set of n+1 size candidate graphs
         :rtype: pd.DataFrame
         """
@@ -70,8 +78,43 @@ class Generator:
         new_candidates = pd.DataFrame(columns=['graph', 'size'])
 
 
-        new_candidates = generate_new_subgraphs(self.frequent_edges, execution_mode, candidates)
+        new_candidates = generate_new_subgraphs(self.frequent_edges, execution_mode, candidates, support_measure)
 
         self.__current_max_size += 1
 
         return new_candidates
+
+    def project_initial_candidates(self, initial_candidates: pd.DataFrame, input_csp_graph: CSPGraph,
+                                   input_graph_edges: Union[pd.DataFrame, EdgeIndex]) -> None:
+        """Method to compute the instances of the initial candidates, which are needed to mine the next sizes by
+        projection (see 'generate_projected_subgraphs').
+
+        :param pd.DataFrame initial_candidates: The set of initial candidates of size 1
+        :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+        :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+        :return:
+        """
+        project_initial_patterns(initial_candidates, input_csp_graph, input_graph_edges)
+
+    def generate_projected_subgraphs(self, candidates: pd.DataFrame, min_support: int, execution_mode: str,
+                                     input_csp_graph: CSPGraph, input_graph_edges: Union[pd.DataFrame, EdgeIndex],
+                                     support_measure: str = 'first_edge') -> pd.DataFrame:
+        """Method for mining the frequent n+1-size graphs out of the instances of the n-size frequent graphs. The
+        extensions are counted in one scan of the instances of their parent, only the frequent ones are built.
+
+        :param pd.DataFrame candidates: The n-size frequent graphs (with their instances)
+        :param int min_support: The minimum support the new graphs have to meet
+        :param str execution_mode: Flag if we use single or multicore
+        :param CSPGraph input_csp_graph: The csp_graph representation of the input graph
+        :param pd.DataFrame input_graph_edges: The edges set of the input graph (or its EdgeIndex)
+        :param str support_measure: The support measure ('first_edge' or 'mni')
+        :return: The set of n+1 size frequent graphs
+        :rtype: pd.DataFrame
+        """
+        new_frequent_subgraphs = generate_projected_subgraphs(self.frequent_edges, min_support, input_csp_graph,
+                                                              input_graph_edges, execution_mode, candidates,
+                                                              support_measure)
+
+        self.__current_max_size += 1
+
+        return new_frequent_subgraphs
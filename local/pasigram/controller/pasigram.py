@@ -1,6 +1,7 @@
 import pandas as pd
 from local.pasigram.controller.candidate_generation.generator import Generator
 from local.pasigram.controller.csp.evaluator import Evaluator
+from local.pasigram.controller.csp.evaluator_utils import release_instances
 from local.pasigram.model.graph import Graph
 from local.pasigram.service.edges_service import compute_frequent_edges, get_frequent_edges
 from pyspark import SparkContext
@@ -10,26 +11,43 @@ class Pasigram:
     """Class to represent the PaSiGraM algorithm.
     """
 
-    def __init__(self, input_graph: Graph, min_support: int) -> None:
+    def __init__(self, input_graph: Graph, min_support: int, support_measure: str = 'first_edge',
+                 exact_frequency: bool = True, keep_instances: bool = False) -> None:
         """Constructor
 
         :param Graph input_graph: The input graph for PaSiGraM algorithm
         :param int min_support: The minimum support the candidates have to meet
+        :param str support_measure: The support measure: the number of distinct assignments of the first edge of a
+            candidate ('first_edge') or the minimum image based support ('mni')
+        :param bool exact_frequency: Count the exact frequencies (True) or stop the matching of a candidate once it
+            meets the min_support (False), the frequencies are then only lower bounds (only used by the 'candidates'
+            mining mode, the projection needs the complete instances)
+        :param bool keep_instances: Keep the instances of all frequent subgraphs (True) or release the instances of a
+            size of frequent subgraphs as soon as all of their children are evaluated (False)
         """
 
         self.__min_support = min_support
+        self.__support_measure = support_measure
+        self.__exact_frequency = exact_frequency
+        self.__keep_instances = keep_instances
         self.__input_graph = input_graph
         self.__frequent_subgraphs = pd.DataFrame(columns=['graph', 'size', 'frequency'])
         self.__current_max_size = 0
 
-    def execute(self, execution_mode: str = 'single_core') -> None:
+    def execute(self, execution_mode: str = 'single_core', mining_mode: str = 'candidates') -> None:
         """Method to execute the PaSiGraM algorithm
 
+        :param str execution_mode: Flag if we use single or multicore
+        :param str mining_mode: Generate and evaluate all candidates of a size ('candidates') or count the extensions
+            of the frequent subgraphs in their instances ('projection')
         :return:
         """
 
         input_csp_graph = self.__input_graph.csp_graph
-        input_graph_edges = self.__input_graph.edges
+        # the edge index is used to check the edges between assignments, if it was built with the csp graph
+        input_graph_edges = self.__input_graph.edge_index
+        if input_graph_edges is None:
+            input_graph_edges = self.__input_graph.edges
 
         print('Compute frequent edges!')
         frequent_edges = get_frequent_edges(self.__input_graph.edges, self.__input_graph.nodes, self.min_support)
@@ -38,13 +56,26 @@ class Pasigram:
         generator = Generator(frequent_edges)
 
         # initialize the evaluator, which evaluates if the candidates are above the predefined min_support
-        evaluator = Evaluator(self.min_support)
+        # the projection counts the extensions in the complete instances -> the frequencies are always exact
+        exact_frequency = self.exact_frequency or mining_mode == 'projection'
+        evaluator = Evaluator(self.min_support, self.support_measure, exact_frequency)
 
         # generate the initial size 1 candidates
         print('Generate initial candidates:')
         initial_candidates = generator.generate_initial_candidates(execution_mode)
         print('\t '+str(len(initial_candidates))+' initial candidates were found!')
 
+        # the frequency of the initial candidates is the number of their edges -> compute their minimum images
+        if self.support_measure == 'mni':
+            initial_candidates = evaluator.evaluate_candidates(initial_candidates, execution_mode, input_csp_graph,
+                                                               input_graph_edges)
+            evaluator.clear_matching_plans()
+            print('\t '+str(len(initial_candidates))+' initial candidates are frequent!')
+
+        # the projection counts the extensions in the instances of their parents
+        if mining_mode == 'projection':
+            generator.project_initial_candidates(initial_candidates, input_csp_graph, input_graph_edges)
+
         # append initial_candidates to frequent_subgraphs
         self.__frequent_subgraphs = self.__frequent_subgraphs.append(initial_candidates)
         self.__current_max_size += 1
@@ -59,17 +90,34 @@ class Pasigram:
             # set new_candidates_found boolean to False
             new_candidates_found = False
 
-            # generate the next n+1-size candidates
-            print('\t Generate patterns:')
-            new_subgraphs = generator.generate_new_subgraphs(
-                self.frequent_subgraphs[self.frequent_subgraphs['size'] == self.__current_max_size], execution_mode)
-            print('\t\t ' + str(len(new_subgraphs)) + ' new patterns were found!')
-
-            # evaluate which of the newly generated candidates are frequent/above the predefined min_support
-            print('\t Compute frequent candidates:')
-            new_frequent_subgraphs = evaluator.evaluate_candidates(new_subgraphs, execution_mode,
-                                                                   input_csp_graph, input_graph_edges)
-            print('\t\t '+str(len(new_frequent_subgraphs))+' frequent subgraphs were found!')
+            # the n-size frequent subgraphs, which are extended
+            current_subgraphs = self.frequent_subgraphs[self.frequent_subgraphs['size'] == self.__current_max_size]
+
+            if mining_mode == 'projection':
+                # count the extensions of the n-size frequent subgraphs and build the frequent ones
+                print('\t Project patterns:')
+                new_frequent_subgraphs = generator.generate_projected_subgraphs(
+                    current_subgraphs, self.min_support, execution_mode, input_csp_graph, input_graph_edges,
+                    self.support_measure)
+                print('\t\t '+str(len(new_frequent_subgraphs))+' frequent subgraphs were found!')
+            else:
+                # generate the next n+1-size candidates
+                print('\t Generate patterns:')
+                new_subgraphs = generator.generate_new_subgraphs(current_subgraphs, execution_mode,
+                                                                 self.support_measure)
+                print('\t\t ' + str(len(new_subgraphs)) + ' new patterns were found!')
+
+                # evaluate which of the newly generated candidates are frequent/above the predefined min_support
+                print('\t Compute frequent candidates:')
+                new_frequent_subgraphs = evaluator.evaluate_candidates(new_subgraphs, execution_mode,
+                                                                       input_csp_graph, input_graph_edges)
+                # the matching plans of a size are not used by the larger candidates -> release them
+                evaluator.clear_matching_plans()
+                print('\t\t '+str(len(new_frequent_subgraphs))+' frequent subgraphs were found!')
+
+            # all children of the n-size frequent subgraphs are evaluated -> release their instances
+            if not self.keep_instances:
+                release_instances(current_subgraphs)
 
             # if there are some new frequent subgraphs, execute if statements
             if len(new_frequent_subgraphs) > 0:
@@ -84,6 +132,14 @@ class Pasigram:
 
         print('Finished')
 
+    def decode_frequent_subgraphs(self) -> list:
+        """Method to decode the labels of all frequent subgraphs back into the original labels of the input graph.
+
+        :return: The nodes and edges of all frequent subgraphs (first index level = canonical code of the subgraph)
+        :rtype: list[pd.DataFrame, pd.DataFrame]
+        """
+        return self.__input_graph.decode_patterns(self.frequent_subgraphs['graph'])
+
     @property
     def input_graph(self) -> Graph:
         """The input graph for PaSiGraM algorithm
@@ -102,6 +158,34 @@ class Pasigram:
         """
         return self.__frequent_subgraphs
 
+    @property
+    def support_measure(self) -> str:
+        """The support measure which is used to compute the frequency of the candidates
+
+        :return: support_measure
+        :rtype: str
+        """
+        return self.__support_measure
+
+    @property
+    def exact_frequency(self) -> bool:
+        """Whether the exact frequencies of the frequent subgraphs are counted (otherwise only a lower bound, which
+        meets the min_support)
+
+        :return: exact_frequency
+        :rtype: bool
+        """
+        return self.__exact_frequency
+
+    @property
+    def keep_instances(self) -> bool:
+        """Whether the instances of all frequent subgraphs are kept after their children are evaluated
+
+        :return: keep_instances
+        :rtype: bool
+        """
+        return self.__keep_instances
+
     @property
     def min_support(self) -> int:
         """The minimum support the candidates have to meet
@@ -0,0 +1,323 @@
+import pandas as pd
+import numpy as np
+from local.pasigram.service.graph_service import build_canonical_embedding_from_state, build_pattern_canonical_state, \
+    build_pattern_csp_graph, extend_canonical_state, compute_wl_hash
+
+
+class Pattern:
+    """A class to represent a pattern (candidate or frequent subgraph) of the input graph: a small directed graph with
+    labels for the edges and nodes. Unlike Graph the nodes and edges are stored as tuples (node id = position of the
+    label) and the attributes are slots, so a pattern is cheap to build and to extend by one edge. The DataFrame
+    representations (nodes, edges and csp graph) are only built on demand.
+    """
+
+    __slots__ = ('__labels', '__edge_list', '__canonical_code', '__canonical_order', '__canonical_state', '__wl_hash',
+                 '__root_node', '__right_most_node', '__right_most_path', '__instances', '__complete_instances',
+                 '__new_added_edge', '__nodes', '__edges', '__csp_graph')
+
+    def __init__(self, labels: tuple, edge_list: tuple) -> None:
+        """Constructor
+
+        :param tuple labels: The labels of the nodes (position = node id)
+        :param tuple edge_list: The edges of the pattern (source id, target id, edge label)
+        """
+
+        # labels of the nodes and edges of the pattern
+        self.__labels: tuple = tuple(labels)
+        self.__edge_list: tuple = tuple((int(source), int(target), label) for source, target, label in edge_list)
+
+        # canonical code, canonical node order, canonical state and Weisfeiler-Lehman hash (prefilter for the comparison
+        # of the canonical codes)
+        self.__canonical_code: str = None
+        self.__canonical_order: list = None
+        self.__canonical_state: dict = None
+        self.__wl_hash: int = None
+
+        # root node, right-most-node and right-most-path of the right most extension
+        self.__root_node: int = None
+        self.__right_most_node: int = None
+        self.__right_most_path: list = []
+
+        # instances of the pattern in the input graph (int32 matrix: row = instance, column = node id)
+        self.__instances: np.ndarray = np.empty((0, 0), dtype=np.int32)
+        self.__complete_instances: bool = True
+
+        # the last added edge of the pattern
+        self.__new_added_edge: dict = {}
+
+        # DataFrame representations (built on demand)
+        self.__nodes: pd.DataFrame = None
+        self.__edges: pd.DataFrame = None
+        self.__csp_graph: pd.DataFrame = None
+
+    def extend(self, new_added_edge: dict, new_node_label=None, canonical_state: dict = None) -> 'Pattern':
+        """Method to extend the pattern by one edge (and perhaps a new node). The pattern itself isn't modified: the
+        new pattern inherits the instances of the pattern and its canonical state is extended by the new edge (see
+        'extend_canonical_state'), if the caller didn't already extend it. The root node, right most node and right
+        most path of the new pattern are set by the caller.
+
+        :param dict new_added_edge: The new edge (parent_node_id, child_node_id, edge_label)
+        :param new_node_label: The label of the new node (only for forward edges)
+        :param dict canonical_state: The canonical state of the new pattern (optionally, if it is already extended)
+        :return: The extended pattern
+        :rtype: Pattern
+        """
+        labels = self.__labels if new_node_label is None else self.__labels + (new_node_label,)
+        new_pattern = Pattern(labels, self.__edge_list + ((new_added_edge['parent_node_id'],
+                                                           new_added_edge['child_node_id'],
+                                                           new_added_edge['edge_label']),))
+
+        # Info: the instance matrix is never changed in place (the evaluation builds a new one) -> no copy needed
+        new_pattern.instances = self.__instances
+        new_pattern.complete_instances = self.__complete_instances
+        new_pattern.new_added_edge = new_added_edge
+
+        if canonical_state is not None:
+            new_pattern.canonical_state = canonical_state
+        elif self.__canonical_state is not None:
+            new_pattern.canonical_state = extend_canonical_state(self.__canonical_state, new_added_edge,
+                                                                 {len(self.__labels): new_node_label})
+
+        return new_pattern
+
+    def build_canonical_smallest_code(self, canonical_embedding: list = None) -> None:
+        """Method to build the canonical code (minimum DFS code, see 'build_canonical_smallest_code') and the canonical
+        node order out of the canonical state. Two patterns have the same canonical code, iff they are isomorphic.
+
+        :param list canonical_embedding: The canonical code and node order (optionally, if they are already built out
+            of the canonical state, see 'build_canonical_embedding_from_state')
+        """
+        if canonical_embedding is None:
+            canonical_embedding = build_canonical_embedding_from_state(self.canonical_state)
+        self.__canonical_code, self.__canonical_order = canonical_embedding
+
+    def build_wl_hash(self) -> None:
+        """Method to build the Weisfeiler-Lehman hash (see 'compute_wl_hash') out of the canonical state. Isomorphic
+        patterns have the same hash, so only patterns with the same hash have to be compared by their canonical codes.
+
+        """
+        self.__wl_hash = compute_wl_hash(self.canonical_state)
+
+    @property
+    def labels(self) -> tuple:
+        """The labels of the nodes (position = node id)
+
+        :return: labels
+        :rtype: tuple
+        """
+        return self.__labels
+
+    @property
+    def edge_list(self) -> tuple:
+        """The edges of the pattern (source id, target id, edge label)
+
+        :return: edge_list
+        :rtype: tuple
+        """
+        return self.__edge_list
+
+    @property
+    def size(self) -> int:
+        """The size of the pattern (number of edges)
+
+        :return: size
+        :rtype: int
+        """
+        return len(self.__edge_list)
+
+    @property
+    def nodes(self) -> pd.DataFrame:
+        """The nodes of the pattern (id, label), built on demand
+
+        :return: nodes
+        :rtype: pd.DataFrame
+        """
+        if self.__nodes is None:
+            self.__nodes = pd.DataFrame({'label': self.__labels}, index=range(len(self.__labels)))
+        return self.__nodes
+
+    @property
+    def nodes_ids(self) -> list:
+        """List of all ids of the nodes
+
+        :return: nodes_ids
+        :rtype: list
+        """
+        return list(range(len(self.__labels)))
+
+    @property
+    def edges(self) -> pd.DataFrame:
+        """The edges of the pattern (id, source, target, label), built on demand
+
+        :return: edges
+        :rtype: pd.DataFrame
+        """
+        if self.__edges is None:
+            self.__edges = pd.DataFrame(list(self.__edge_list), columns=['source', 'target', 'label'],
+                                        index=range(len(self.__edge_list)))
+        return self.__edges
+
+    @property
+    def csp_graph(self) -> pd.DataFrame:
+        """The CSP representation of the pattern, built on demand (see 'build_pattern_csp_graph')
+
+        :return: csp_graph
+        :rtype: pd.DataFrame
+        """
+        if self.__csp_graph is None:
+            self.__csp_graph = build_pattern_csp_graph(self.__labels, self.__edge_list)
+        return self.__csp_graph
+
+    @property
+    def canonical_code(self) -> str:
+        """The canonical code of the pattern
+
+        :return: canonical_code
+        :rtype: str
+        """
+        return self.__canonical_code
+
+    @property
+    def canonical_order(self) -> list:
+        """The nodes of the pattern in the order of their discovery times in the canonical code (None, if the code
+        wasn't built yet). Isomorphic patterns map their nodes to the same positions of the canonical code.
+
+        :return: canonical_order
+        :rtype: list
+        """
+        return self.__canonical_order
+
+    @property
+    def first_edge_nodes(self) -> list:
+        """The nodes of the first edge of the canonical code (the first two nodes of the canonical node order), whose
+        distinct assignments are the 'first_edge' support of the pattern (see 'count_support'). Unlike the first edge of
+        'edge_list' they don't depend on the numbering of the nodes, so all isomorphic patterns have the same support.
+        If the canonical code wasn't built yet, the nodes of the first edge of 'edge_list' are returned.
+
+        :return: first_edge_nodes
+        :rtype: list
+        """
+        if self.__canonical_order is None or len(self.__canonical_order) < 2:
+            return [self.__edge_list[0][0], self.__edge_list[0][1]]
+        return [self.__canonical_order[0], self.__canonical_order[1]]
+
+    @property
+    def canonical_state(self) -> dict:
+        """The node labels, edges and adjacency lists the canonical code is computed from (built on demand, if it
+        wasn't inherited and extended)
+
+        :return: canonical_state
+        :rtype: dict
+        """
+        if self.__canonical_state is None:
+            self.__canonical_state = build_pattern_canonical_state(self.__labels, self.__edge_list)
+        return self.__canonical_state
+
+    @property
+    def wl_hash(self) -> int:
+        """The Weisfeiler-Lehman hash of the pattern (None, if not built yet)
+
+        :return: wl_hash
+        :rtype: int
+        """
+        return self.__wl_hash
+
+    @property
+    def root_node(self) -> int:
+        """The root node of the pattern.
+        By default None.
+
+        :return: root_node
+        :rtype: int
+        """
+        return self.__root_node
+
+    @property
+    def right_most_node(self) -> int:
+        """The right-most-node of the pattern (last added node).
+        By default None.
+
+        :return: right_most_node
+        :rtype: int
+        """
+        return self.__right_most_node
+
+    @property
+    def right_most_path(self) -> list:
+        """A list with the ids of all nodes which are part of the right-most-path.
+        By default empty list.
+
+        :return: right_most_path
+        :rtype: list
+        """
+        return self.__right_most_path
+
+    @property
+    def right_most_path_labels(self) -> list:
+        """A list with the labels of all nodes which are part of the right-most-path
+
+        :return: right_most_path_labels
+        :rtype: list
+        """
+        return [self.__labels[node] for node in self.__right_most_path]
+
+    @property
+    def instances(self) -> np.ndarray:
+        """Instances of the pattern in the input graph (int32 matrix: row = instance, column = node id).
+        By default empty matrix.
+
+        :return: instances
+        :rtype: np.ndarray
+        """
+        return self.__instances
+
+    @property
+    def complete_instances(self) -> bool:
+        """Flag if the instances are all instances of the pattern in the input graph (False, if the matching stopped
+        once they met the min_support). By default True.
+
+        :return: complete_instances
+        :rtype: bool
+        """
+        return self.__complete_instances
+
+    @property
+    def new_added_edge(self) -> dict:
+        """The last added edge of the pattern
+
+        :return: new_added_edge
+        :rtype: dict
+        """
+        return self.__new_added_edge
+
+    @right_most_path.setter
+    def right_most_path(self, node_ids: list):
+        self.__right_most_path = node_ids
+
+    @root_node.setter
+    def root_node(self, node_id):
+        self.__root_node = node_id
+
+    @right_most_node.setter
+    def right_most_node(self, node_id):
+        self.__right_most_node = node_id
+
+    @instances.setter
+    def instances(self, instances: np.ndarray):
+        self.__instances = instances
+
+    @complete_instances.setter
+    def complete_instances(self, complete: bool):
+        self.__complete_instances = complete
+
+    @canonical_state.setter
+    def canonical_state(self, canonical_state: dict):
+        self.__canonical_state = canonical_state
+
+    @wl_hash.setter
+    def wl_hash(self, wl_hash: int):
+        self.__wl_hash = wl_hash
+
+    @new_added_edge.setter
+    def new_added_edge(self, new_edge: dict):
+        self.__new_added_edge = new_edge
@@ -7,20 +7,40 @@ from memory_monitor import get_size
 
 if __name__ == '__main__':
     execution_mode = 'single_core'
+    # 'candidates': generate and evaluate all candidates, 'projection': count the extensions in the parent instances
+    mining_mode = 'candidates'
+    # 'first_edge': distinct assignments of the first pattern edge, 'mni': minimum image based support
+    support_measure = 'first_edge'
+    # True: count the exact frequencies, False: stop the matching of a candidate once it meets the min_support
+    exact_frequency = True
+    # directory of a graph in the binary format (see convert.py), if None the csv files are used
+    binary_graph = None
+    # paths of the nodes and edges in Parquet/Arrow IPC format (requires pyarrow), if None the csv files are used
+    arrow_graph = None
+    # directory of the cache for built csp graphs, if None the csp graph is always built
+    csp_graph_cache = r'../data/.csp_cache'
 
-    nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
-    edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
     start = timer()
-    graph = Graph(nodes, edges)
-    print('Compress graph!')
-    graph.build_compressed_graph()
-    print('Build csp graph!')
-    graph.build_csp_graph()
+    if binary_graph is not None:
+        print('Load binary graph!')
+        graph = Graph.from_binary(binary_graph)
+    else:
+        if arrow_graph is not None:
+            print('Load arrow graph!')
+            graph = Graph.from_arrow(*arrow_graph)
+        else:
+            nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+            edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+            graph = Graph(nodes, edges)
+        print('Compress graph!')
+        graph.build_compressed_graph()
+        print('Build csp graph!')
+        graph.build_csp_graph(cache_dir=csp_graph_cache)
 
-    pasigram = Pasigram(graph, 2)
+    pasigram = Pasigram(graph, 2, support_measure, exact_frequency)
 
     print('Execute PaSiGraM!')
-    pasigram.execute(execution_mode=execution_mode)
+    pasigram.execute(execution_mode=execution_mode, mining_mode=mining_mode)
     end = timer()
     print('Execution time: ' + str(end - start) + ' seconds')
     print(len(pasigram.frequent_subgraphs), 'frequent subgraphs were found!')
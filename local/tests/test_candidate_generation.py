@@ -1,9 +1,18 @@
 from unittest import TestCase
+import numpy as np
 import pandas as pd
 from local.pasigram.controller.candidate_generation.utils \
     import compute_right_most_path_nodes, add_new_forward_edge, compute_relevant_forward_edges, \
-    compute_relevant_backward_edges
+    compute_relevant_backward_edges, candidate_set_to_frame, get_initial_patterns, generate_new_subgraph, \
+    generate_canonical_candidates, compute_frequent_edge_labels
+from local.pasigram.controller.csp.evaluator_utils import compute_potential_assigments
+from local.pasigram.controller.csp.matcher import match_instances
+from local.pasigram.controller.pasigram import Pasigram
 from local.pasigram.model.graph import Graph
+from local.pasigram.model.pattern import Pattern
+from local.pasigram.service.edges_service import get_frequent_edges
+from local.pasigram.service.graph_service import build_canonical_state, build_canonical_smallest_code, \
+    compute_minimum_dfs_embedding, is_minimum_dfs_code
 
 
 class TestRightMostPath(TestCase):
@@ -37,11 +46,7 @@ class TestRightMostPath(TestCase):
                          msg="Test for the relevant forward edges")
 
     def test_add_new_forward_edge(self):
-        edges = pd.DataFrame.from_dict({0: [0, 1, "b"]}, orient='index', columns=['source', 'target', 'label'])
-        nodes = pd.DataFrame.from_dict({0: ["DB"],
-                                        1: ["IR"]}, orient='index', columns=['label'])
-
-        graph = Graph(nodes, edges)
+        graph = Pattern(("DB", "IR"), ((0, 1, "b"),))
 
         graph.root_node = 0
 
@@ -74,3 +79,93 @@ class TestRightMostPath(TestCase):
 
         self.assertEqual(relevant_backward_edges.tolist(), expected.tolist(),
                          msg="Test for the relevant backward edges of a node")
+
+
+class TestPatternGeneration(TestCase):
+
+    def test_canonical_candidates(self):
+        canonical_state = build_canonical_state(pd.DataFrame({'label': [0, 1, 1]}),
+                                                pd.DataFrame([(0, 1, 0), (1, 2, 0), (2, 0, 1)],
+                                                             columns=['source', 'target', 'label']))
+        dfs_code = compute_minimum_dfs_embedding(canonical_state['node_labels'], canonical_state['edges'])[0]
+        self.assertTrue(is_minimum_dfs_code(canonical_state['node_labels'], canonical_state['edges'], dfs_code))
+        reversed_code = [(0, 1, 1, 0, 1, 0), (1, 2, 0, 1, 1, 1), (2, 0, 1, 0, 1, 1)]
+        self.assertFalse(is_minimum_dfs_code(canonical_state['node_labels'], canonical_state['edges'], reversed_code),
+                         msg="Test for a DFS code which isn't the minimum DFS code")
+
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+        frequent_edges = get_frequent_edges(edges, nodes, 1)
+        frequent_edge_labels = compute_frequent_edge_labels(frequent_edges)
+        candidates = first_edge_candidates = get_initial_patterns(frequent_edges)
+
+        for size in range(2, 4):
+            canonical_candidates = candidate_set_to_frame(generate_new_subgraph(candidates, frequent_edges, 'mni'))
+            first_edge_candidates = candidate_set_to_frame(generate_new_subgraph(first_edge_candidates,
+                                                                                 frequent_edges))
+            self.assertTrue(set(first_edge_candidates.index) <= set(canonical_candidates.index),
+                            msg="Test if all candidates are generated out of their canonical parents")
+
+            # every canonical candidate is generated out of exactly one parent
+            generated = sum(len(candidate_set_to_frame(generate_canonical_candidates(candidate, frequent_edge_labels)))
+                            for candidate in candidates['graph'])
+            self.assertEqual(len(canonical_candidates), generated, msg="Test for duplicated canonical candidates")
+            for code, candidate in zip(canonical_candidates.index, canonical_candidates['graph']):
+                self.assertEqual(code, build_canonical_smallest_code(candidate.nodes, candidate.edges))
+                self.assertEqual(size, len(candidate.edges))
+            candidates = canonical_candidates
+
+    def test_projection(self):
+        nodes = pd.read_csv(r'../data/nodes.csv', sep=';', index_col='id')
+        edges = pd.read_csv(r'../data/edges.csv', sep=';', index_col='id')
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        candidates_pasigram = Pasigram(graph, 2)
+        candidates_pasigram.execute()
+        projection_pasigram = Pasigram(graph, 2, keep_instances=True)
+        projection_pasigram.execute(mining_mode='projection')
+
+        # both mining modes find the same frequent subgraphs with the same frequencies
+        candidates_subgraphs = candidates_pasigram.frequent_subgraphs
+        projection_subgraphs = projection_pasigram.frequent_subgraphs
+        self.assertEqual(sorted(candidates_subgraphs.index), sorted(projection_subgraphs.index),
+                         msg="Test for the frequent subgraphs found by projection")
+        for canonical_code in candidates_subgraphs.index:
+            self.assertEqual(candidates_subgraphs.at[canonical_code, 'frequency'],
+                             projection_subgraphs.at[canonical_code, 'frequency'],
+                             msg="Test for the frequencies counted by projection")
+
+        # the projected instances are the instances the matcher finds for the extension
+        for subgraph in projection_subgraphs[projection_subgraphs['size'] > 1]['graph']:
+            potential_assignments = compute_potential_assigments(subgraph.labels, subgraph.edge_list, [], {},
+                                                                 graph.csp_graph, graph.edge_index)
+            self.assertEqual(match_instances(potential_assignments, subgraph.edge_list, graph.csp_graph,
+                                             graph.edge_index).tolist(), subgraph.instances.tolist(),
+                             msg="Test for the projected instances")
+
+    def test_first_edge_support(self):
+        # random graph, on which both mining modes keep different (isomorphic) representatives of some subgraphs
+        random_state = np.random.RandomState(1)
+        nodes = pd.DataFrame({'label': random_state.choice(['A', 'B', 'C'], 120)})
+        edges = pd.DataFrame({'source': random_state.randint(0, 120, 300), 'target': random_state.randint(0, 120, 300),
+                              'label': random_state.choice(['x', 'y'], 300)})
+        edges = edges[edges['source'] != edges['target']]
+
+        graph = Graph(nodes, edges)
+        graph.build_compressed_graph()
+        graph.build_csp_graph()
+
+        candidates_pasigram = Pasigram(graph, 11)
+        candidates_pasigram.execute()
+        projection_pasigram = Pasigram(graph, 11)
+        projection_pasigram.execute(mining_mode='projection')
+
+        # the first edge support is counted on the canonical first edge -> the same for every representative
+        self.assertEqual(dict(zip(candidates_pasigram.frequent_subgraphs.index,
+                                  candidates_pasigram.frequent_subgraphs['frequency'])),
+                         dict(zip(projection_pasigram.frequent_subgraphs.index,
+                                  projection_pasigram.frequent_subgraphs['frequency'])),
+                         msg="Test for the first edge support of both mining modes")